@@ -0,0 +1,288 @@
+"""
+Benchmark suite for the scrape -> filter -> summarize pipeline.
+
+Generates synthetic tweet corpora (cached on disk), times the hot paths of
+each stage and writes the results as JSON so runs can be compared between
+commits:
+
+    uv run bench.py --sizes 10k,1m --out bench_results.json
+    uv run bench.py --sizes 10k --compare bench_results.json
+
+Benchmarks:
+  normalize       filter_tweets.normalize_text_for_deduplication per tweet
+  score           filter_tweets.calculate_score per tweet
+  score_batch     filter_tweets.calculate_scores in SCORE_BATCH_LINES chunks
+  filter_main     filter_tweets.main on the whole corpus (default and --stream)
+  jsonl_writer    AsyncJsonlWriter appending tweet dicts
+  summary_prompt  summarizer prompt assembly (topic clustering, chunking, prompts)
+  scrape          main.search_with_backoff against the offline FakeClient
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import filter_tweets
+import main as scraper
+import summarizer
+from jsonl_writer import AsyncJsonlWriter
+from offline_client import FakeClient, synthetic_corpus
+from tweet_store import TweetStore
+
+DEFAULT_CORPUS_DIR = ".bench_corpus"
+DEFAULT_OUT_FILE = "bench_results.json"
+SIZE_SUFFIXES = {'k': 1_000, 'm': 1_000_000}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value[-1:] in SIZE_SUFFIXES:
+        return int(float(value[:-1]) * SIZE_SUFFIXES[value[-1]])
+    return int(value)
+
+
+def corpus_path(args, lines: int) -> str:
+    """Generates the corpus on first use and returns its path."""
+    name = f"corpus_{lines}_dup{args.dup_rate}_kw{args.keyword_density}_seed{args.seed}.jsonl"
+    path = os.path.join(args.corpus_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(args.corpus_dir, exist_ok=True)
+        print(f"[INFO] Generating {lines} synthetic tweets into '{path}'...")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for tweet in synthetic_corpus(lines, args.dup_rate, args.keyword_density, args.seed):
+                f.write(json.dumps(tweet, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, path)
+    return path
+
+
+def load_tweets(path: str, limit: int) -> list:
+    tweets = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if len(tweets) >= limit:
+                break
+            tweets.append(json.loads(line))
+    return tweets
+
+
+def timed(fn, repeat: int) -> float:
+    """Best wall-clock time of `repeat` runs, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def result(name: str, lines: int, items: int, seconds: float, **extra) -> dict:
+    entry = {
+        'name': name, 'lines': lines, 'items': items, 'seconds': round(seconds, 6),
+        'items_per_sec': round(items / seconds, 1) if seconds else None,
+    }
+    entry.update(extra)
+    print(f"  {name:<22} {lines:>10} lines  {seconds:9.3f}s  {entry['items_per_sec'] or 0:>12,.0f} items/s")
+    return entry
+
+
+# --- Benchmarks ---
+
+def bench_micro(tweets, lines, repeat):
+    texts = [tweet['text'] for tweet in tweets]
+    normalize = filter_tweets.normalize_text_for_deduplication
+    score = filter_tweets.calculate_score
+    chunk = filter_tweets.SCORE_BATCH_LINES
+    chunks = [texts[i:i + chunk] for i in range(0, len(texts), chunk)]
+    return [
+        result('normalize', lines, len(texts), timed(lambda: [normalize(t) for t in texts], repeat)),
+        result('score', lines, len(texts), timed(lambda: [score(t) for t in texts], repeat)),
+        result('score_batch', lines, len(texts),
+               timed(lambda: [filter_tweets.calculate_scores(c) for c in chunks], repeat)),
+    ]
+
+
+def run_filter_main(argv):
+    saved_argv = sys.argv
+    sys.argv = ['filter_tweets.py'] + argv
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            filter_tweets.main()
+    finally:
+        sys.argv = saved_argv
+
+
+def bench_filter_main(path, lines, repeat, tmp_dir):
+    out_path = os.path.join(tmp_dir, 'filtered.jsonl')
+    entries = []
+    for mode, extra in (('filter_main', []), ('filter_main_stream', ['--stream'])):
+        seconds = timed(lambda: run_filter_main([path, '--out', out_path] + extra), repeat)
+        entries.append(result(mode, lines, lines, seconds))
+    return entries, out_path
+
+
+def bench_jsonl_writer(tweets, lines, repeat, tmp_dir):
+    out_path = os.path.join(tmp_dir, 'writer.jsonl')
+
+    async def write_all():
+        async with AsyncJsonlWriter(out_path) as writer:
+            for tweet in tweets:
+                await writer.write(tweet)
+
+    def run():
+        if os.path.exists(out_path):
+            os.remove(out_path)
+        asyncio.run(write_all())
+
+    return result('jsonl_writer', lines, len(tweets), timed(run, repeat))
+
+
+def bench_summary_prompt(filtered_path, lines, repeat, limit):
+    tweets = load_tweets(filtered_path, limit)
+    options = argparse.Namespace(no_clusters=False, cluster_threshold=summarizer.DEFAULT_THRESHOLD,
+                                 representatives=summarizer.DEFAULT_REPRESENTATIVES)
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            texts = summarizer.prompt_texts(tweets, options)
+            chunks = summarizer.chunk_texts(texts, summarizer.DEFAULT_CHUNK_TOKENS)
+            prompts = [summarizer.build_summary_prompt(chunk, partial=len(chunks) > 1) for chunk in chunks]
+        return sum(map(len, prompts))
+
+    seconds = timed(run, repeat)
+    return result('summary_prompt', lines, len(tweets), seconds, prompt_chars=run())
+
+
+def bench_scrape(searches, repeat, tmp_dir):
+    keywords = scraper.KEYWORDS
+    out_path = os.path.join(tmp_dir, 'scraped.jsonl')
+    store_path = os.path.join(tmp_dir, 'scrape.db')
+
+    async def scrape():
+        client = FakeClient()
+        with TweetStore(store_path) as store:
+            async with AsyncJsonlWriter(out_path) as writer:
+                for i in range(searches):
+                    await scraper.search_with_backoff(client, keywords[i % len(keywords)], writer, store=store)
+        return client.requests
+
+    def run():
+        for path in (out_path, store_path):
+            if os.path.exists(path):
+                os.remove(path)
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(scrape())
+
+    scraper.PAUSES_ENABLED = False
+    try:
+        seconds = timed(run, repeat)
+    finally:
+        scraper.PAUSES_ENABLED = True
+    with open(out_path, 'r', encoding='utf-8') as f:
+        tweets = sum(1 for _ in f)
+    return result('scrape', searches, tweets, seconds, searches=searches)
+
+
+# --- Reporting ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['name'], r['lines']): r for r in json.load(f)['results']}
+    print(f"\n--- Compared with '{baseline_path}' ---")
+    regressions = 0
+    for entry in results:
+        old = baseline.get((entry['name'], entry['lines']))
+        if not old or not old['seconds']:
+            continue
+        ratio = entry['seconds'] / old['seconds']
+        flag = ''
+        if ratio > 1 + tolerance:
+            flag = '  <-- slower'
+            regressions += 1
+        print(f"  {entry['name']:<22} {entry['lines']:>10} lines  {old['seconds']:9.3f}s -> {entry['seconds']:9.3f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraping, filtering and summarization hot paths.")
+    parser.add_argument("--sizes", default="10k", help="Comma-separated corpus sizes, e.g. 10k,1m,10m.")
+    parser.add_argument("--dup-rate", type=float, default=0.1, help="Fraction of tweets repeating an earlier text.")
+    parser.add_argument("--keyword-density", type=float, default=1.0, help="Average scoring-dictionary terms per tweet.")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the best time is reported.")
+    parser.add_argument("--micro-limit", type=int, default=200_000, help="Tweets held in memory for the per-tweet benchmarks.")
+    parser.add_argument("--searches", type=int, default=50, help="Keyword searches in the offline scrape benchmark (0 to skip).")
+    parser.add_argument("--only", default=None, help="Comma-separated benchmark names to run (default: all).")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR, help="Where generated corpora are cached.")
+    parser.add_argument("--out", default=DEFAULT_OUT_FILE, help="JSON results file.")
+    parser.add_argument("--compare", default=None, help="Previous results file to compare against.")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Slowdown ratio above which --compare flags a regression.")
+    args = parser.parse_args()
+
+    only = set(args.only.split(',')) if args.only else None
+
+    def wanted(*names):
+        return only is None or any(name in only for name in names)
+
+    results = []
+
+    with tempfile.TemporaryDirectory(prefix="xscout-bench-") as tmp_dir:
+        for lines in map(parse_size, args.sizes.split(',')):
+            path = corpus_path(args, lines)
+            print(f"\n--- {lines} tweets ---")
+            tweets = load_tweets(path, min(lines, args.micro_limit))
+            if wanted('normalize', 'score', 'score_batch'):
+                results.extend(bench_micro(tweets, lines, args.repeat))
+            if wanted('jsonl_writer'):
+                results.append(bench_jsonl_writer(tweets, lines, args.repeat, tmp_dir))
+            if wanted('filter_main', 'summary_prompt'):
+                entries, filtered_path = bench_filter_main(path, lines, args.repeat, tmp_dir)
+                results.extend(entries)
+                if wanted('summary_prompt'):
+                    results.append(bench_summary_prompt(filtered_path, lines, args.repeat, args.micro_limit))
+
+        if args.searches and wanted('scrape'):
+            print("\n--- Offline scrape ---")
+            results.append(bench_scrape(args.searches, args.repeat, tmp_dir))
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'timestamp': int(time.time()),
+            'dup_rate': args.dup_rate,
+            'keyword_density': args.keyword_density,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[SUCCESS] Benchmark results saved to '{args.out}'.")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"[WARN] {regressions} benchmark(s) slower than the baseline by more than {args.tolerance:.0%}.")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,558 @@
+"""
+Long-running service mode: one logged-in client, hot-reloaded config and
+scheduled filter/summarize jobs.
+
+    uv run daemon.py --write-config          # writes daemon_config.json with the built-in lists
+    uv run daemon.py --store tweets.db
+
+The daemon loads the twikit session once and keeps scraping in human-like
+sessions (main.run_session) with a break between sessions, never exiting on
+its own. The keywords, the scoring dictionaries and the job schedule live in
+a JSON config file that is re-read whenever it changes; the new keywords and
+a rebuilt keyword matcher apply from the next search and the next filter run.
+An invalid config is reported and the previous one is kept. A config that
+changes while the filter job runs is applied when the job finishes, so one
+output file never mixes old and new weights.
+
+The filter and the summarizer run in-process in a worker thread, every
+`filter_every_minutes` / `summarize_every_minutes` (0 = on demand only),
+with the same options as their command-line tools.
+
+A control endpoint on localhost reports status and triggers work. It only
+answers requests whose Host (and Origin, if sent) is localhost, and POSTs
+must carry the token written to --control-token-file at startup in an
+X-Control-Token header:
+
+  GET  /status                        state, config, jobs and counters (JSON)
+  GET  /metrics                       all metrics in the Prometheus text format
+  POST /run/scrape|filter|summarize   start a session or job now
+  POST /reload                        re-read the config file now
+  POST /stop                          finish the current step and exit
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import random
+import secrets
+import signal
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import filter_tweets
+import main as scraper
+import summarizer
+from keyword_scheduler import KeywordScheduler
+from metrics import METRICS, add_metrics_arguments, configure as configure_metrics, export as export_metrics
+from pipeline import DEFAULT_FILTERED_FILE, DEFAULT_SUMMARY_FILE
+from tweet_store import TweetStore
+
+DEFAULT_CONFIG_FILE = "daemon_config.json"
+DEFAULT_CONTROL_PORT = 8765
+DEFAULT_TOKEN_FILE = "daemon_control.token"
+TOKEN_HEADER = "X-Control-Token"
+# Host and Origin names the control endpoint answers to; anything else may be
+# a web page or a DNS-rebound name reaching it through the browser.
+LOCAL_HOSTS = frozenset({'localhost', '127.0.0.1', '::1'})
+DEFAULT_RELOAD_INTERVAL = 2  # seconds
+
+# The lists the config falls back to for keys it leaves out.
+BUILTIN_SCORING = {
+    'useful_keywords': dict(filter_tweets.USEFUL_KEYWORDS),
+    'noise_keywords': dict(filter_tweets.NOISE_KEYWORDS),
+    'disqualifying_phrases': list(filter_tweets.DISQUALIFYING_PHRASES),
+}
+DEFAULT_CONFIG = {
+    'keywords': list(scraper.KEYWORDS),
+    **BUILTIN_SCORING,
+    'scrape': True,
+    'session_break_minutes': [30, 60],
+    'filter_every_minutes': 60,
+    'summarize_every_minutes': 360,
+    'filter_args': [],
+    'summarize_args': [],
+}
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate_config(data) -> dict:
+    """Checks a parsed config and fills in the defaults. Raises ValueError describing the first problem."""
+    if not isinstance(data, dict):
+        raise ValueError("the config must be a JSON object")
+    unknown = sorted(set(data) - set(DEFAULT_CONFIG))
+    if unknown:
+        raise ValueError(f"unknown keys: {', '.join(unknown)}")
+    config = {**DEFAULT_CONFIG, **data}
+
+    keywords = config['keywords']
+    if not isinstance(keywords, list) or not keywords or not all(isinstance(k, str) and k.strip() for k in keywords):
+        raise ValueError("'keywords' must be a non-empty list of strings")
+    for key in ('useful_keywords', 'noise_keywords'):
+        weights = config[key]
+        if not isinstance(weights, dict) or not all(isinstance(v, int) and not isinstance(v, bool) for v in weights.values()):
+            raise ValueError(f"'{key}' must map terms to integer weights")
+    for key in ('disqualifying_phrases', 'filter_args', 'summarize_args'):
+        if not isinstance(config[key], list) or not all(isinstance(v, str) for v in config[key]):
+            raise ValueError(f"'{key}' must be a list of strings")
+    if not isinstance(config['scrape'], bool):
+        raise ValueError("'scrape' must be true or false")
+    low_high = config['session_break_minutes']
+    if (not isinstance(low_high, list) or len(low_high) != 2 or not all(map(_is_number, low_high))
+            or not 0 <= low_high[0] <= low_high[1]):
+        raise ValueError("'session_break_minutes' must be [min, max] with 0 <= min <= max")
+    for key in ('filter_every_minutes', 'summarize_every_minutes'):
+        if not _is_number(config[key]) or config[key] < 0:
+            raise ValueError(f"'{key}' must be a number of minutes >= 0")
+    return config
+
+
+class ConfigFile:
+    """The daemon's JSON config, re-read when the file's modification time changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = dict(DEFAULT_CONFIG)
+        self.version = 0
+        self.loaded_at = None
+        self.error = None
+        self._stamp = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def exists(self) -> bool:
+        """Whether the file existed when it was last loaded."""
+        return self._stamp is not None
+
+    def changed(self) -> bool:
+        return self._stat() != self._stamp
+
+    def load(self) -> dict:
+        """Reads and validates the file (the defaults if it doesn't exist). Raises ValueError if it is invalid."""
+        stamp = self._stat()
+        self._stamp = stamp
+        if stamp is None:
+            return dict(DEFAULT_CONFIG)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return validate_config(json.load(f))
+        except (OSError, json.JSONDecodeError) as e:
+            raise ValueError(str(e)) from None
+
+    def write_defaults(self):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(DEFAULT_CONFIG, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+class Job:
+    """A filter or summarize run on a fixed interval, or on demand."""
+
+    def __init__(self, name: str, run):
+        self.name = name
+        self.run = run
+        self.interval = 0.0
+        self.requested = False
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_seconds = None
+        self.last_result = None
+        self.last_error = None
+        self.since = time.time()
+
+    def next_run(self):
+        """When the job is next due, or None if it only runs on demand."""
+        if not self.interval:
+            return None
+        return (self.last_finished or self.since) + self.interval
+
+    def due(self, now: float) -> bool:
+        next_run = self.next_run()
+        return self.requested or (next_run is not None and now >= next_run)
+
+    def status(self) -> dict:
+        return {
+            'interval_minutes': self.interval / 60, 'next_run': self.next_run(), 'requested': self.requested,
+            'running': self.running, 'runs': self.runs, 'failures': self.failures,
+            'last_started': self.last_started, 'last_finished': self.last_finished,
+            'last_seconds': self.last_seconds, 'last_result': self.last_result, 'last_error': self.last_error,
+        }
+
+
+class Daemon:
+    def __init__(self, args):
+        self.args = args
+        self.config = ConfigFile(args.config)
+        self.started = time.time()
+        self.state = 'starting'
+        self.sessions = 0
+        self.new_tweets = 0
+        self.next_session = None
+        self.scheduler = None
+        self.jobs = {
+            'filter': Job('filter', self._run_filter),
+            'summarize': Job('summarize', self._run_summarize),
+        }
+        self._pending_config = None
+        self._loop = None
+        self._stop = asyncio.Event()
+        self._scrape_now = asyncio.Event()
+        self._wake_jobs = asyncio.Event()
+
+    # --- Config ---
+
+    def _job_arguments(self, config) -> dict:
+        """The filter and summarizer command lines for a config."""
+        args = self.args
+        if args.store:
+            filter_argv = ['--store', args.store]
+            summarize_argv = ['--store', args.store]
+        else:
+            filter_argv = ['--archive', args.archive] if args.archive else [args.out]
+            filter_argv.append('--stream')
+            summarize_argv = ['--in', args.filtered_out]
+        return {
+            'filter': filter_argv + ['--out', args.filtered_out] + config['filter_args'],
+            'summarize': summarize_argv + ['--out', args.summary_out] + config['summarize_args'],
+        }
+
+    def _parse_job_arguments(self, name: str, argv: list):
+        module = filter_tweets if name == 'filter' else summarizer
+        parser = module.build_parser()
+        try:
+            job_args = parser.parse_args(argv)
+            module.check_arguments(parser, job_args)
+        except SystemExit:
+            raise ValueError(f"invalid {name} options: {' '.join(argv)}") from None
+        return job_args
+
+    def reload(self) -> bool:
+        """Loads the config file and applies it. On error the previous config stays in effect."""
+        try:
+            config = self.config.load()
+            for name, argv in self._job_arguments(config).items():
+                self._parse_job_arguments(name, argv)
+        except ValueError as e:
+            self.config.error = str(e)
+            print(f"[ERROR] Config '{self.config.path}' not applied: {e}")
+            METRICS.inc('daemon_config_errors_total')
+            return False
+
+        if self.jobs['filter'].running:
+            self._pending_config = config
+            print("[INFO] Config change will apply when the running filter job finishes.")
+            return True
+        self._apply(config)
+        return True
+
+    def _apply(self, config):
+        self._pending_config = None
+        filter_tweets.configure_scoring(config['useful_keywords'], config['noise_keywords'],
+                                        config['disqualifying_phrases'])
+        if self.scheduler is not None:
+            self.scheduler.set_keywords(config['keywords'])
+        self.jobs['filter'].interval = config['filter_every_minutes'] * 60
+        self.jobs['summarize'].interval = config['summarize_every_minutes'] * 60
+        self.config.data = config
+        self.config.version += 1
+        self.config.loaded_at = time.time()
+        self.config.error = None
+        METRICS.inc('daemon_config_reloads_total')
+        print(f"[INFO] Config v{self.config.version} applied: {len(config['keywords'])} keywords, "
+              f"{len(filter_tweets.MATCHER.weights)} scoring terms.")
+        if self._loop is not None:
+            self._wake_jobs.set()
+
+    async def _watch_config(self):
+        while True:
+            await asyncio.sleep(self.args.reload_interval)
+            if self.config.changed():
+                print(f"[INFO] '{self.config.path}' changed, reloading...")
+                self.reload()
+
+    # --- Scraping ---
+
+    async def _wait(self, event: asyncio.Event, timeout) -> bool:
+        """Waits until `event` is set or `timeout` seconds pass. Returns True if it was set (and clears it)."""
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        event.clear()
+        return True
+
+    async def _scrape_loop(self, client, writer, store):
+        while True:
+            if not self.config.data['scrape']:
+                self.state = 'paused'
+                self.next_session = None
+                # Only POST /run/scrape starts a session; re-check the config now and then.
+                if not await self._wait(self._scrape_now, 5):
+                    continue
+
+            self.state = 'scraping'
+            self.next_session = None
+            try:
+                if self.args.replay:
+                    new_tweets = await scraper.run_replay(client, writer, store, self.args)
+                else:
+                    new_tweets = await scraper.run_session(client, writer, store, self.scheduler, self.args)
+            except Exception as e:
+                print(f"[ERROR] Scraping session failed: {e}")
+                METRICS.inc('daemon_session_failures_total')
+            else:
+                self.sessions += 1
+                self.new_tweets += new_tweets
+                METRICS.inc('daemon_sessions_total')
+
+            low, high = self.config.data['session_break_minutes']
+            session_break = random.uniform(low, high) * 60
+            self.state = 'break'
+            self.next_session = time.time() + session_break
+            print(f"[INFO] Session done. Next session in {session_break / 60:.1f} minutes (or on POST /run/scrape).")
+            await self._wait(self._scrape_now, session_break)
+
+    # --- Jobs ---
+
+    def _run_filter(self) -> dict:
+        argv = self._job_arguments(self.config.data)['filter']
+        return filter_tweets.run_filter(self._parse_job_arguments('filter', argv))
+
+    def _run_summarize(self) -> dict:
+        args = self._parse_job_arguments('summarize', self._job_arguments(self.config.data)['summarize'])
+        summarizer.summarize(args)
+        return {'out': args.out}
+
+    async def _run_job(self, job: Job):
+        job.requested = False
+        job.running = True
+        job.last_started = time.time()
+        print(f"[INFO] Running the {job.name} job...")
+        try:
+            job.last_result = await asyncio.to_thread(job.run)
+            job.last_error = None
+            job.runs += 1
+            METRICS.inc('daemon_job_runs_total', job=job.name)
+        except (Exception, SystemExit) as e:
+            job.failures += 1
+            job.last_error = str(e) or type(e).__name__
+            print(f"[ERROR] The {job.name} job failed: {job.last_error}")
+            METRICS.inc('daemon_job_failures_total', job=job.name)
+        finally:
+            job.running = False
+            job.last_finished = time.time()
+            job.last_seconds = round(job.last_finished - job.last_started, 3)
+            METRICS.observe('daemon_job_seconds', job.last_seconds, job=job.name)
+            if self._pending_config is not None:
+                self._apply(self._pending_config)
+
+    async def _jobs_loop(self):
+        while True:
+            # Jobs run one at a time, filter first, so a summary sees the latest filter output.
+            for job in self.jobs.values():
+                if job.due(time.time()):
+                    await self._run_job(job)
+            upcoming = [job.next_run() for job in self.jobs.values() if job.next_run() is not None]
+            timeout = min(60.0, max(0.0, min(upcoming) - time.time())) if upcoming else 60.0
+            await self._wait(self._wake_jobs, timeout)
+
+    # --- Control ---
+
+    def request(self, action: str):
+        """Called from control server threads; hands the action to the event loop."""
+        if action == 'scrape':
+            self._loop.call_soon_threadsafe(self._scrape_now.set)
+        elif action in self.jobs:
+            self.jobs[action].requested = True
+            self._loop.call_soon_threadsafe(self._wake_jobs.set)
+        elif action == 'reload':
+            self._loop.call_soon_threadsafe(self.reload)
+        elif action == 'stop':
+            self._loop.call_soon_threadsafe(self.stop)
+        else:
+            raise KeyError(action)
+
+    def stop(self):
+        self.state = 'stopping'
+        self._stop.set()
+
+    def status(self) -> dict:
+        config = self.config.data
+        return {
+            'state': self.state,
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'sessions': self.sessions,
+            'new_tweets': self.new_tweets,
+            'next_session': self.next_session,
+            'rate_limited_for': round(self.scheduler.wait_time(), 1) if self.scheduler else 0,
+            'retry_queue': sorted(self.scheduler.retry_queue) if self.scheduler else [],
+            'config': {
+                'path': self.config.path, 'version': self.config.version, 'loaded_at': self.config.loaded_at,
+                'error': self.config.error, 'pending': self._pending_config is not None,
+                'keywords': len(config['keywords']),
+                'scoring_terms': len(filter_tweets.MATCHER.weights), 'scrape': config['scrape'],
+            },
+            'jobs': {name: job.status() for name, job in self.jobs.items()},
+        }
+
+    # --- Lifecycle ---
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        if not self.reload():
+            return
+        if not self.config.exists:
+            print(f"[WARN] No config file at '{self.config.path}', using the built-in lists "
+                  f"(create one with --write-config).")
+
+        client = scraper.make_client(self.args)
+        if client is None:
+            return
+        store = TweetStore(self.args.store) if self.args.store else None
+        self.scheduler = KeywordScheduler(self.config.data['keywords'], stats_path=self.args.keyword_stats,
+                                          exploration=self.args.explore)
+        writer = await scraper.make_raw_writer(self.args).start()
+        token = write_control_token(self.args.control_token_file)
+        print(f"[INFO] Control token written to '{self.args.control_token_file}'.")
+        server = start_control_server(self, self.args.control_host, self.args.control_port, token)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            self._loop.add_signal_handler(sig, self.stop)
+
+        tasks = [
+            asyncio.create_task(self._scrape_loop(client, writer, store)),
+            asyncio.create_task(self._jobs_loop()),
+            asyncio.create_task(self._watch_config()),
+        ]
+        try:
+            await self._stop.wait()
+        finally:
+            print("\n[INFO] Stopping the daemon...")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            server.shutdown()
+            server.server_close()
+            await writer.close()
+            if store:
+                store.close()
+            export_metrics(self.args, 'daemon')
+            print(f"[INFO] Daemon stopped after {self.sessions} sessions ({self.new_tweets} new tweets).")
+
+
+def write_control_token(path: str) -> str:
+    """Generates this run's control token and saves it where only the owner can read it."""
+    token = secrets.token_urlsafe(32)
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+        f.write(token + "\n")
+    os.chmod(path, 0o600)  # O_CREAT's mode only applies to a new file
+    return token
+
+
+class ControlHandler(BaseHTTPRequestHandler):
+    service: Daemon = None
+    token: str = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str = 'application/json; charset=utf-8'):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, obj, status: int = 200):
+        self._send(status, json.dumps(obj, indent=2).encode('utf-8'))
+
+    def _from_localhost(self) -> bool:
+        host = self.headers.get('Host')
+        origin = self.headers.get('Origin')
+        return (host is not None and urlsplit(f"//{host}").hostname in LOCAL_HOSTS
+                and (origin is None or urlsplit(origin).hostname in LOCAL_HOSTS))
+
+    def _authorized(self) -> bool:
+        token = self.headers.get(TOKEN_HEADER, '')
+        return hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8'))
+
+    def do_GET(self):
+        if not self._from_localhost():
+            self._send_json({'error': "Host and Origin must be localhost"}, 403)
+        elif self.path == '/status':
+            self._send_json(self.service.status())
+        elif self.path == '/metrics':
+            self._send(200, METRICS.to_prometheus().encode('utf-8'), 'text/plain; version=0.0.4')
+        else:
+            self._send_json({'error': f"Not found: {self.path}"}, 404)
+
+    def do_POST(self):
+        if not self._from_localhost():
+            self._send_json({'error': "Host and Origin must be localhost"}, 403)
+            return
+        if not self._authorized():
+            self._send_json({'error': f"Missing or wrong {TOKEN_HEADER} header"}, 401)
+            return
+        actions = {'run/scrape': 'scrape', 'reload': 'reload', 'stop': 'stop',
+                   **{f'run/{name}': name for name in self.service.jobs}}
+        action = actions.get(self.path.strip('/'))
+        if action is None:
+            self._send_json({'error': f"Not found: {self.path}"}, 404)
+            return
+        self.service.request(action)
+        self._send_json({'accepted': action}, 202)
+
+
+def start_control_server(service: Daemon, host: str, port: int, token: str) -> ThreadingHTTPServer:
+    ControlHandler.service = service
+    ControlHandler.token = token
+    server = ThreadingHTTPServer((host, port), ControlHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='control-server', daemon=True).start()
+    print(f"[INFO] Control endpoint at http://{host}:{server.server_address[1]}/status")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scraper as a long-lived service with scheduled filter and summary jobs.")
+    scraper.add_scrape_arguments(parser)
+    parser.add_argument("--config", default=DEFAULT_CONFIG_FILE, help="JSON config with keywords, scoring dictionaries and job schedule; reloaded when it changes.")
+    parser.add_argument("--write-config", action="store_true", help="Write the built-in config to --config (if it doesn't exist) and exit.")
+    parser.add_argument("--reload-interval", type=float, default=DEFAULT_RELOAD_INTERVAL, help="How often to check the config file for changes (seconds).")
+    parser.add_argument("--filtered-out", default=DEFAULT_FILTERED_FILE, help="Output file of the filter job.")
+    parser.add_argument("--summary-out", default=DEFAULT_SUMMARY_FILE, help="Output file of the summarize job.")
+    parser.add_argument("--control-host", default="127.0.0.1", help="Address of the control endpoint. It only answers requests addressed to localhost.")
+    parser.add_argument("--control-port", type=int, default=DEFAULT_CONTROL_PORT, help="Port of the control endpoint.")
+    parser.add_argument("--control-token-file", default=DEFAULT_TOKEN_FILE, help="Where to write the token POST requests must send in the X-Control-Token header (mode 0600).")
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    if args.write_config:
+        config = ConfigFile(args.config)
+        if os.path.exists(args.config):
+            print(f"[ERROR] '{args.config}' already exists.")
+            return
+        config.write_defaults()
+        print(f"[SUCCESS] Built-in config written to '{args.config}'.")
+        return
+
+    configure_metrics(args)
+    asyncio.run(Daemon(args).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,23 @@
 import json
 import argparse
+import contextlib
+import hashlib
+import heapq
+import itertools
+import os
 import re
+import time
+from collections import Counter, deque
+from typing import TYPE_CHECKING
+from keyword_matcher import KeywordMatcher, contains_digit, normalize_for_matching
+from near_duplicates import SimHashIndex
+from tweet_store import TweetStore
+from tweet_record import TweetRecord, dumps
+from tweet_archive import TweetArchive, filter_window, parse_time
+from metrics import METRICS, add_metrics_arguments, configure as configure_metrics, export as export_metrics, profile_stage
+
+if TYPE_CHECKING:
+    from keyword_hits import HitIndex  # imported where used, it needs NumPy
 
 # --- SCORING CONFIGURATION ---
 
@@ -46,6 +63,36 @@ DISQUALIFYING_PHRASES = [
 
 SCORE_THRESHOLD = 6 # Raised threshold slightly for higher quality signal
 
+# Whether terms also match their 's'/'es'/'ed'/'ing' forms (--inflections).
+INFLECTIONS = False
+
+# Built once from the dictionaries above; all scoring goes through it.
+MATCHER = KeywordMatcher.from_dictionaries(USEFUL_KEYWORDS, NOISE_KEYWORDS, DISQUALIFYING_PHRASES)
+
+def configure_scoring(useful_keywords=None, noise_keywords=None, disqualifying_phrases=None, inflections=None):
+    """
+    Replaces some of the scoring dictionaries at runtime (e.g. from the
+    daemon's config file) and rebuilds MATCHER. The dictionaries are updated
+    in place so modules that imported them see the new terms.
+    """
+    global MATCHER, INFLECTIONS
+    for current, new in ((USEFUL_KEYWORDS, useful_keywords), (NOISE_KEYWORDS, noise_keywords),
+                         (DISQUALIFYING_PHRASES, disqualifying_phrases)):
+        if new is not None:
+            current.clear()
+            current.update(new) if isinstance(current, dict) else current.extend(new)
+    if inflections is not None:
+        INFLECTIONS = inflections
+    MATCHER = KeywordMatcher.from_dictionaries(USEFUL_KEYWORDS, NOISE_KEYWORDS, DISQUALIFYING_PHRASES, INFLECTIONS)
+
+# How often each score was seen in this run (all scored tweets, kept or not).
+# Feeds the score histogram and the per-step counts in the metrics.
+SCORE_TALLY = Counter()
+# Seconds spent parsing, scoring and deduplicating tweets in this run
+# ('parse', 'score', 'dedup'), timed per batch of lines and per kept tweet.
+# Feeds the per-stage throughput in the metrics.
+STAGE_SECONDS = Counter()
+
 # --- DEDUPLICATION & FILTERING LOGIC ---
 
 def normalize_text_for_deduplication(text):
@@ -55,7 +102,50 @@ def normalize_text_for_deduplication(text):
     text = re.sub(r'\$\w+', '', text)
     return ' '.join(text.split()).lower()
 
+def score_components(tweet_text):
+    """The matched dictionary terms and the points from the other text rules."""
+    normalized = normalize_for_matching(tweet_text)
+    hits = MATCHER.find_terms(tweet_text, normalized)
+
+    adjustment = 0
+    if tweet_text.startswith('@') and len(tweet_text.split()) < 8:
+        adjustment -= 5
+    if tweet_text.count('#') > 6:
+        adjustment -= 7
+    if contains_digit(tweet_text, normalized):
+        adjustment += 1
+
+    return hits, adjustment
+
 def calculate_score(tweet_text):
+    hits, adjustment = score_components(tweet_text)
+    if MATCHER.is_disqualified(hits):
+        return -100
+    return MATCHER.weight_of(hits) + adjustment
+
+# Below this many texts the per-tweet matcher is used, so small inputs never
+# load NumPy; a batch of this size already scores several times faster
+# than the per-tweet matcher.
+BATCH_MIN_TEXTS = 1024
+
+def calculate_scores(texts):
+    """calculate_score for every text. Large lists are scored as one vectorized batch (keyword_batch)."""
+    compiled = MATCHER.compiled() if len(texts) >= BATCH_MIN_TEXTS else None
+    if compiled is None:
+        return [calculate_score(text) for text in texts]
+    from keyword_batch import TextBatch
+    batch = TextBatch(texts)
+    scores, disqualified = compiled.weigh(batch)
+    scores += batch.contains_digit()
+    scores[batch.count_byte(ord('#')) > 6] -= 7
+    for i in batch.first_byte_is(ord('@')).tolist():
+        if len(texts[i].split()) < 8:
+            scores[i] -= 5
+    scores[disqualified] = -100
+    return scores.tolist()
+
+def calculate_score_substring(tweet_text):
+    """The original substring scorer, kept as the reference for --parity."""
     lower_text = tweet_text.lower()
     for phrase in DISQUALIFYING_PHRASES:
         if phrase in lower_text:
@@ -78,53 +168,638 @@ def calculate_score(tweet_text):
         
     return score
 
-def main():
-    parser = argparse.ArgumentParser(description="Filter tweets for developer/security info.")
-    parser.add_argument("input_file", help="Input JSONL file (e.g., twikit_tweets.jsonl)")
-    parser.add_argument("--out", default="filtered_tweets.jsonl", help="Output file for useful tweets.")
-    parser.add_argument("--min-score", type=int, default=SCORE_THRESHOLD, help="The minimum score for a tweet to be kept.")
-    args = parser.parse_args()
+def report_parity(input_file):
+    """Scores every tweet with both scorers and reports where they disagree."""
+    total = differing = 0
+    term_counts = Counter()
+    examples = []
 
-    print(f"Filtering tweets from '{args.input_file}' with a minimum score of {args.min_score}...")
-    
-    useful_tweets = []
-    total_tweets = 0
-    seen_normalized_tweets = set()
-
-    with open(args.input_file, 'r', encoding='utf-8') as f_in:
+    with open(input_file, 'r', encoding='utf-8') as f_in:
         for line in f_in:
-            total_tweets += 1
             try:
-                tweet = json.loads(line)
-                tweet_text = tweet.get('text', '')
-                
-                normalized_text = normalize_text_for_deduplication(tweet_text)
-                if not normalized_text or normalized_text in seen_normalized_tweets:
-                    continue
-
-                score = calculate_score(tweet_text)
-                
-                if score >= args.min_score:
-                    tweet['filter_score'] = score
-                    useful_tweets.append(tweet)
-                    seen_normalized_tweets.add(normalized_text)
-
+                tweet_text = json.loads(line).get('text', '')
             except json.JSONDecodeError:
-                print(f"[WARN] Skipping a malformed line: {line.strip()}")
+                continue
+            total += 1
+            new_score = calculate_score(tweet_text)
+            old_score = calculate_score_substring(tweet_text)
+            if new_score == old_score:
+                continue
+
+            differing += 1
+            lower_text = tweet_text.lower()
+            substring_hits = {t for t in MATCHER.weights.keys() | MATCHER.disqualifying if t in lower_text}
+            word_hits = MATCHER.find_terms(tweet_text)
+            changed = sorted(substring_hits ^ word_hits)
+            term_counts.update(changed)
+            if len(examples) < 20:
+                examples.append((old_score, new_score, changed, tweet_text))
+
+    print("\n--- Scorer Parity Report ---")
+    print(f"Compared:  {total} tweets")
+    print(f"Differing: {differing} tweets")
+    if term_counts:
+        print("\nTerms responsible for most differences:")
+        for term, count in term_counts.most_common(15):
+            print(f"  {term!r}: {count}")
+    if examples:
+        print("\nExamples (old score -> new score):")
+        for old_score, new_score, changed, tweet_text in examples:
+            print(f"  {old_score} -> {new_score} {changed} {' '.join(tweet_text.split())[:120]}")
+
+def score_tweet(tweet, min_score, seen_normalized_tweets=()):
+    """
+    Scores one parsed tweet. Returns (normalized_text, score) if the tweet is
+    new and meets the threshold, otherwise None. The tweet is not modified.
+    """
+    tweet_text = tweet.get('text') or ''
+
+    normalized_text = normalize_text_for_deduplication(tweet_text)
+    if not normalized_text:
+        return None
+
+    # Only kept tweets are added to the dedup index, so scoring first gives the
+    # same result and skips the (possibly expensive) lookup for most tweets.
+    score = calculate_score(tweet_text)
+    SCORE_TALLY[score] += 1
+    if score < min_score or normalized_text in seen_normalized_tweets:
+        return None
+    return normalized_text, score
+
+# Lines parsed before their texts are scored together.
+SCORE_BATCH_LINES = 2048
+
+def score_lines(lines, min_score, seen_normalized_tweets=()):
+    """
+    Parses and scores JSONL lines (str or bytes) like score_tweet, yielding
+    (line, result) in input order. The result is (normalized_text,
+    TweetRecord) if the tweet is new and meets the threshold, None if not,
+    or the ValueError (json.JSONDecodeError for invalid JSON) of a malformed
+    line. Lines are scored SCORE_BATCH_LINES at a time with calculate_scores,
+    but the dedup lookup happens as each result is yielded, so it sees the
+    tweets the caller added to seen_normalized_tweets before.
+    """
+    lines = iter(lines)
+    while batch := list(itertools.islice(lines, SCORE_BATCH_LINES)):
+        started = time.perf_counter()
+        tweets = []
+        for line in batch:
+            try:
+                tweets.append(TweetRecord.from_json(line))
+            except ValueError as e:
+                tweets.append(e)
+        parsed_at = time.perf_counter()
+        parsed = [(line, tweet, None if isinstance(tweet, ValueError) else
+                   normalize_text_for_deduplication(tweet.get('text') or ''))
+                  for line, tweet in zip(batch, tweets)]
+        normalized_at = time.perf_counter()
+        scores = iter(calculate_scores([tweet.get('text') or '' for _, tweet, normalized_text in parsed if normalized_text]))
+        STAGE_SECONDS['parse'] += parsed_at - started
+        STAGE_SECONDS['dedup'] += normalized_at - parsed_at
+        STAGE_SECONDS['score'] += time.perf_counter() - normalized_at
+
+        for line, tweet, normalized_text in parsed:
+            if normalized_text is None:
+                yield line, tweet
+                continue
+            if not normalized_text:
+                yield line, None
+                continue
+            score = next(scores)
+            SCORE_TALLY[score] += 1
+            if score < min_score:
+                yield line, None
+                continue
+            started = time.perf_counter()
+            duplicate = normalized_text in seen_normalized_tweets
+            STAGE_SECONDS['dedup'] += time.perf_counter() - started
+            if duplicate:
+                yield line, None
+                continue
+            tweet.filter_score = score
+            yield line, (normalized_text, tweet)
+
+def iter_useful_tweets(lines, min_score, seen_normalized_tweets):
+    """Yields every unique tweet that meets the score threshold, in input order."""
+    for line, result in score_lines(lines, min_score, seen_normalized_tweets):
+        if isinstance(result, ValueError):
+            print(f"[WARN] Skipping a malformed line: {line.strip()}")
+            METRICS.inc('filter_malformed_lines_total')
+            continue
+
+        if result is not None:
+            normalized_text, tweet = result
+            started = time.perf_counter()
+            seen_normalized_tweets.add(normalized_text)
+            STAGE_SECONDS['dedup'] += time.perf_counter() - started
+            yield tweet
+
+# --- PARALLEL FILTERING ---
+
+CHUNK_BYTES = 4 * 1024 * 1024
+
+def find_chunks(path, workers):
+    """Splits the file into byte ranges that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    chunk_size = max(1, min(CHUNK_BYTES, -(-size // workers)))
+    bounds = [0]
+    with open(path, 'rb') as f:
+        while bounds[-1] < size:
+            f.seek(bounds[-1] + chunk_size)
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    return list(zip(bounds, bounds[1:]))
+
+def score_chunk(path, start, end, min_score):
+    """
+    Worker: parses, normalizes and scores one byte range of the input.
+    Tweets below the threshold never take part in dedup, so only the
+    candidates that meet it are sent back, in input order, along with the
+    chunk's score tally and stage times.
+    """
+    SCORE_TALLY.clear()
+    STAGE_SECONDS.clear()
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    raw_lines = data.split(b'\n')
+    if raw_lines and raw_lines[-1] == b'':
+        raw_lines.pop()
+
+    candidates = []
+    malformed = []
+    # Decoded by the JSON parser; kept tweets carry the raw bytes back for output.
+    for raw_line, result in score_lines(raw_lines, min_score):
+        if isinstance(result, ValueError):
+            malformed.append(raw_line.decode('utf-8', 'replace'))
+        elif result is not None:
+            candidates.append(result)
+
+    return len(raw_lines), candidates, malformed, dict(SCORE_TALLY), dict(STAGE_SECONDS)
+
+class ParallelScan:
+    """
+    Scores the input in a process pool and yields (normalized_text, tweet)
+    candidates in input order, so the global dedup in the parent process
+    gives exactly the same result as a serial run. Workers started with
+    spawn or forkserver import this module afresh, so they are handed the
+    scoring dictionaries in effect when the scan was created.
+    """
+
+    def __init__(self, path, min_score, workers):
+        self.path = path
+        self.min_score = min_score
+        self.workers = workers
+        self.scoring = (dict(USEFUL_KEYWORDS), dict(NOISE_KEYWORDS), list(DISQUALIFYING_PHRASES), INFLECTIONS)
+        self.count = 0
+
+    def __iter__(self):
+        from concurrent.futures import ProcessPoolExecutor
+        chunks = iter(find_chunks(self.path, self.workers))
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=configure_scoring,
+                                 initargs=self.scoring) as pool:
+            # Only keep a couple of chunks per worker in flight to bound memory.
+            pending = deque(
+                pool.submit(score_chunk, self.path, start, end, self.min_score)
+                for start, end in itertools.islice(chunks, self.workers * 2)
+            )
+            while pending:
+                count, candidates, malformed, scores, stage_seconds = pending.popleft().result()
+                next_chunk = next(chunks, None)
+                if next_chunk is not None:
+                    pending.append(pool.submit(score_chunk, self.path, *next_chunk, self.min_score))
+
+                self.count += count
+                SCORE_TALLY.update(scores)
+                STAGE_SECONDS.update(stage_seconds)
+                for line in malformed:
+                    print(f"[WARN] Skipping a malformed line: {line.strip()}")
+                    METRICS.inc('filter_malformed_lines_total')
+                yield from candidates
+
+def dedupe_candidates(candidates, seen_normalized_tweets):
+    for normalized_text, tweet in candidates:
+        started = time.perf_counter()
+        duplicate = normalized_text in seen_normalized_tweets
+        if not duplicate:
+            seen_normalized_tweets.add(normalized_text)
+        STAGE_SECONDS['dedup'] += time.perf_counter() - started
+        if not duplicate:
+            yield tweet
+
+def make_dedup_index(args, streaming):
+    """Exact text set by default, digests in --stream mode, SimHash for --near-dup-distance."""
+    if args.near_dup_distance is not None:
+        return SimHashIndex(args.near_dup_distance)
+    return DigestSet() if streaming else set()
+
+@contextlib.contextmanager
+def open_input(args):
+    """The input lines: archive segments with --archive, else the JSONL file, limited to --since/--until."""
+    if args.archive:
+        yield TweetArchive(args.archive).iter_lines(args.since, args.until)
+        return
+    with open(args.input_file, 'r', encoding='utf-8') as f_in:
+        yield filter_window(f_in, args.since, args.until)
+
+def open_useful_tweets(args, f_in, seen_normalized_tweets):
+    """Returns (counter, tweets): the kept tweets and an object whose .count is the lines read."""
+    if args.workers > 1:
+        scan = ParallelScan(args.input_file, args.min_score, args.workers)
+        return scan, dedupe_candidates(scan, seen_normalized_tweets)
+    counter = LineCounter(f_in)
+    return counter, iter_useful_tweets(counter, args.min_score, seen_normalized_tweets)
+
+class LineCounter:
+    """Iterates over lines while counting how many were read."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.count = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.count += 1
+            yield line
+
+def dedup_digest(normalized_text):
+    """Signed 64-bit digest of a normalized text (fits an SQLite INTEGER)."""
+    return int.from_bytes(hashlib.blake2b(normalized_text.encode('utf-8'), digest_size=8).digest(), signed=True)
+
+class DigestSet:
+    """Set of normalized texts that only stores a 64-bit digest of each one."""
+
+    def __init__(self):
+        self._digests = set()
+
+    def __contains__(self, text):
+        return dedup_digest(text) in self._digests
+
+    def add(self, text):
+        self._digests.add(dedup_digest(text))
+
+    def __len__(self):
+        return len(self._digests)
+
+class TopK:
+    """Bounded heap of the k highest-scoring tweets; ties keep input order."""
+
+    def __init__(self, k):
+        self.k = k
+        self._heap = []
+        self._seq = 0
+
+    def push(self, tweet):
+        entry = (tweet['filter_score'], -self._seq, tweet)
+        self._seq += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def items(self):
+        return [tweet for _, _, tweet in sorted(self._heap, key=lambda e: e[:2], reverse=True)]
+
+def external_sort_by_score(tweets, buffer_size, tmp_dir):
+    """
+    Yields tweets ordered by filter_score (highest first, ties in input order)
+    while holding at most `buffer_size` tweets in memory. Sorted runs are
+    spilled to `tmp_dir` and merged lazily.
+    """
+    run_paths = []
+    buffer = []
+
+    def spill():
+        buffer.sort(key=lambda e: (-e[0], e[1]))
+        path = os.path.join(tmp_dir, f"run-{len(run_paths):05d}.tsv")
+        with open(path, 'w', encoding='utf-8') as f_run:
+            for score, seq, tweet in buffer:
+                f_run.write(f"{score}\t{seq}\t{dumps(tweet)}\n")
+        run_paths.append(path)
+        buffer.clear()
+
+    for seq, tweet in enumerate(tweets):
+        buffer.append((tweet['filter_score'], seq, tweet))
+        if len(buffer) >= buffer_size:
+            spill()
+
+    if not run_paths:
+        buffer.sort(key=lambda e: (-e[0], e[1]))
+        for _, _, tweet in buffer:
+            yield tweet
+        return
+    if buffer:
+        spill()
+
+    def read_run(path):
+        with open(path, 'r', encoding='utf-8') as f_run:
+            for row in f_run:
+                score, seq, payload = row.split('\t', 2)
+                yield (-int(score), int(seq)), payload
+
+    for _, payload in heapq.merge(*(read_run(p) for p in run_paths), key=lambda e: e[0]):
+        yield TweetRecord.from_json(payload)
+
+def write_jsonl(f_out, tweets):
+    for tweet in tweets:
+        f_out.write(dumps(tweet) + '\n')
+
+def run_stream(args):
+    """Filters with flat memory: kept tweets are written as they are scored."""
+    top_five = TopK(5)
+    top_k = TopK(args.top_k) if args.top_k else None
+    found = 0
+
+    with open_input(args) as f_in, open(args.out, 'w', encoding='utf-8') as f_out:
+        counter, useful_tweets = open_useful_tweets(args, f_in, make_dedup_index(args, streaming=True))
+
+        def kept_tweets():
+            nonlocal found
+            for tweet in useful_tweets:
+                found += 1
+                top_five.push(tweet)
+                if top_k is not None:
+                    top_k.push(tweet)
+                yield tweet
+
+        if top_k is not None:
+            for _ in kept_tweets():
+                pass
+            write_jsonl(f_out, top_k.items())
+        elif args.sorted:
+            # Spill next to the output rather than into /tmp, which may be RAM-backed.
+            import tempfile
+            out_dir = os.path.dirname(os.path.abspath(args.out))
+            with tempfile.TemporaryDirectory(prefix=".filter-sort-", dir=out_dir) as tmp_dir:
+                write_jsonl(f_out, external_sort_by_score(kept_tweets(), args.sort_buffer, tmp_dir))
+        else:
+            write_jsonl(f_out, kept_tweets())
+
+    return counter.count, found, top_five.items()
+
+def filter_stored_tweet(store, seq, tweet, min_score, seen_normalized_tweets=()):
+    """
+    Scores one store row and records the result. The tweet is kept if it
+    meets the threshold and is neither a duplicate of a tweet the store has
+    already kept nor in `seen_normalized_tweets`, which the caller updates.
+    Returns (normalized_text, score) for a kept tweet, otherwise None.
+    The caller commits and advances the 'filter' checkpoint.
+    """
+    tweet_text = tweet.get('text') or ''
+    normalized_text = normalize_text_for_deduplication(tweet_text)
+    if not normalized_text:
+        store.set_filter_result(seq, None, None, kept=False)
+        return None
+
+    score = calculate_score(tweet_text)
+    SCORE_TALLY[score] += 1
+    dedup_key = dedup_digest(normalized_text)
+    kept = (score >= min_score and normalized_text not in seen_normalized_tweets
+            and not store.is_kept_duplicate(dedup_key))
+    store.set_filter_result(seq, score, dedup_key, kept)
+    return (normalized_text, score) if kept else None
+
+def run_from_store(args):
+    """
+    Incremental mode: scores only the rows added to the tweet store since the
+    last filter run, then exports every kept tweet in the store to --out.
+    """
+    top_five = TopK(5)
+    processed = found = 0
+
+    with TweetStore(args.store) as store:
+        last_seq = store.checkpoint('filter')
+        with store.conn:
+            for seq, tweet in store.iter_since(last_seq):
+                processed += 1
+                last_seq = seq
+                result = filter_stored_tweet(store, seq, tweet, args.min_score)
+                if result is not None:
+                    found += 1
+                    tweet['filter_score'] = result[1]
+                    top_five.push(tweet)
+            store.set_checkpoint('filter', last_seq)
+
+        with open(args.out, 'w', encoding='utf-8') as f_out:
+            write_jsonl(f_out, (tweet for _, tweet in store.iter_kept()))
+
+    return processed, found, top_five.items()
+
+def run_in_memory(args):
+    """The default mode: collects every kept tweet and sorts them in memory."""
+    with open_input(args) as f_in:
+        counter, useful_tweets = open_useful_tweets(args, f_in, make_dedup_index(args, streaming=False))
+        useful_tweets = list(useful_tweets)
 
     useful_tweets.sort(key=lambda x: x['filter_score'], reverse=True)
+    written = useful_tweets[:args.top_k] if args.top_k else useful_tweets
 
     with open(args.out, 'w', encoding='utf-8') as f_out:
-        for tweet in useful_tweets:
-            f_out.write(json.dumps(tweet, ensure_ascii=False) + '\n')
+        write_jsonl(f_out, written)
+
+    return counter.count, len(useful_tweets), useful_tweets[:5]
+
+# --- KEYWORD-HIT INDEX ---
+
+def input_fingerprint(args) -> dict:
+    """Identifies the input a hit index was built from, to detect when it changed."""
+    if args.archive:
+        segments = TweetArchive(args.archive).load_index()
+        return {'archive': os.path.abspath(args.archive), 'segments': [[s['file'], s['bytes']] for s in segments]}
+    stat = os.stat(args.input_file)
+    return {'file': os.path.abspath(args.input_file), 'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def build_hit_index(lines, source) -> 'HitIndex':
+    """Scans every line once and records its term hits, text-rule points and dedup digest."""
+    from keyword_hits import HitIndexBuilder, MALFORMED, EMPTY, SCORED
+    builder = HitIndexBuilder(sorted(MATCHER.weights.keys() | MATCHER.disqualifying))
+    for line in lines:
+        try:
+            tweet = TweetRecord.from_json(line)
+        except ValueError:
+            print(f"[WARN] Skipping a malformed line: {line.strip()}")
+            builder.add(MALFORMED)
+            continue
+        tweet_text = tweet.get('text') or ''
+        normalized_text = normalize_text_for_deduplication(tweet_text)
+        if not normalized_text:
+            builder.add(EMPTY)
+            continue
+        hits, adjustment = score_components(tweet_text)
+        builder.add(SCORED, hits, adjustment, dedup_digest(normalized_text))
+    return builder.build(source)
+
+def scan_new_terms(index, lines, terms):
+    """Adds dictionary terms the index was never scanned for, re-reading only the tweet text."""
+    from keyword_hits import SCORED
+    matcher = KeywordMatcher({term: MATCHER.weights.get(term, 0) for term in terms},
+                             [term for term in terms if term in MATCHER.disqualifying], MATCHER.inflections)
+    hits_by_row = {}
+    for row, line in enumerate(lines):
+        if index.status[row] != SCORED:
+            continue
+        found = matcher.find_terms(TweetRecord.from_json(line).get('text') or '')
+        if found:
+            hits_by_row[row] = found
+    index.add_terms(terms, hits_by_row)
+
+def load_hit_index(args) -> 'HitIndex':
+    """The hit index in --hits, built (or rebuilt if the input changed) and extended with new terms as needed."""
+    from keyword_hits import HitIndex
+    source = input_fingerprint(args)
+    index = HitIndex.load(args.hits) if os.path.exists(args.hits) else None
+    if index is not None and index.source != source:
+        print(f"[INFO] The input changed since '{args.hits}' was built, rebuilding it.")
+        index = None
+
+    if index is None:
+        with open_input(args) as f_in:
+            index = build_hit_index(f_in, source)
+        index.save(args.hits)
+        print(f"[INFO] Hit index of {len(index)} lines and {len(index.terms)} terms saved to '{args.hits}'.")
+        return index
+
+    new_terms = index.missing_terms(MATCHER.weights.keys() | MATCHER.disqualifying)
+    if new_terms:
+        print(f"[INFO] Scanning the tweet text for {len(new_terms)} new terms: {', '.join(new_terms)}")
+        with open_input(args) as f_in:
+            scan_new_terms(index, f_in, new_terms)
+        index.save(args.hits)
+    return index
+
+def run_rescore(args):
+    """
+    --hits mode: scores every tweet from the keyword-hit index with the
+    current weights and threshold, then reads back only the kept lines.
+    The output matches the in-memory mode (or --stream, which keeps input order).
+    """
+    from keyword_hits import MALFORMED, rank_by_score
+    index = load_hit_index(args)
+    scores = index.scores(MATCHER.weights, MATCHER.disqualifying)
+    SCORE_TALLY.update(index.score_counts(scores))
+    METRICS.inc('filter_malformed_lines_total', index.count(MALFORMED))
+
+    kept = index.select(scores, args.min_score)
+    ranked = rank_by_score(kept, scores)
+    written = kept if args.stream and not args.sorted and not args.top_k else ranked[:args.top_k]
+    top_five = ranked[:5]
+
+    wanted = set(written.tolist()) | set(top_five.tolist())
+    tweets = {}
+    with open_input(args) as f_in:
+        for row, line in enumerate(f_in):
+            if row in wanted:
+                tweet = TweetRecord.from_json(line)
+                tweet.filter_score = int(scores[row])
+                tweets[row] = tweet
+
+    with open(args.out, 'w', encoding='utf-8') as f_out:
+        write_jsonl(f_out, (tweets[row] for row in written.tolist()))
+
+    return len(index), len(kept), [tweets[row] for row in top_five.tolist()]
+
+def record_metrics(mode, processed, found, min_score, seconds):
+    """
+    Derives the per-step counts from the score tally instead of counting in
+    the hot loop: every scored tweet either fell below the threshold, was a
+    duplicate of a kept tweet, or was kept.
+    """
+    scored = sum(SCORE_TALLY.values())
+    passed = sum(count for score, count in SCORE_TALLY.items() if score >= min_score)
+    duplicates = passed - found
+    malformed = METRICS.value('filter_malformed_lines_total')
+
+    METRICS.inc('filter_lines_total', processed, mode=mode)
+    METRICS.inc('filter_empty_text_total', max(0, processed - scored - malformed), mode=mode)
+    METRICS.inc('filter_scored_total', scored, mode=mode)
+    METRICS.inc('filter_below_threshold_total', scored - passed, mode=mode)
+    METRICS.inc('filter_duplicates_total', duplicates, mode=mode)
+    METRICS.inc('filter_kept_total', found, mode=mode)
+    METRICS.set('filter_dedup_hit_ratio', round(duplicates / passed, 4) if passed else 0, mode=mode)
+    METRICS.set('filter_seconds', round(seconds, 3), mode=mode)
+    METRICS.set('filter_lines_per_second', round(processed / seconds, 1) if seconds else 0, mode=mode)
+    for stage, stage_seconds in STAGE_SECONDS.items():
+        METRICS.set('filter_stage_seconds', round(stage_seconds, 3), mode=mode, stage=stage)
+        METRICS.set('filter_stage_lines_per_second', round(processed / stage_seconds, 1) if stage_seconds else 0,
+                    mode=mode, stage=stage)
+    METRICS.observe_counts('filter_score', SCORE_TALLY, mode=mode)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Filter tweets for developer/security info.")
+    parser.add_argument("input_file", nargs="?", help="Input JSONL file (e.g., twikit_tweets.jsonl)")
+    parser.add_argument("--out", default="filtered_tweets.jsonl", help="Output file for useful tweets.")
+    parser.add_argument("--min-score", type=int, default=SCORE_THRESHOLD, help="The minimum score for a tweet to be kept.")
+    parser.add_argument("--parity", action="store_true", help="Compare the word-boundary scorer with the old substring scorer and exit.")
+    parser.add_argument("--inflections", action="store_true", help="Also match the 's', 'es', 'ed' and 'ing' forms of the scoring terms (e.g. 'exploits' for 'exploit').")
+    parser.add_argument("--stream", action="store_true", help="Write kept tweets as they are scored, with memory use independent of input size.")
+    parser.add_argument("--sorted", action="store_true", help="With --stream, write the output ordered by score using an on-disk merge sort.")
+    parser.add_argument("--sort-buffer", type=int, default=100_000, help="Tweets held in memory per sorted run with --stream --sorted.")
+    parser.add_argument("--workers", type=int, default=1, help="Parse and score the input in N processes. Output is identical to a serial run.")
+    parser.add_argument("--near-dup-distance", type=int, default=None, metavar="BITS", help="Also drop near-duplicates whose 64-bit SimHash differs by at most BITS bits (e.g. 3).")
+    parser.add_argument("--hits", metavar="FILE", default=None, help="Keep a keyword-hit index of the input in FILE (.npz) and score from it, so later runs with new weights or --min-score only re-rank.")
+    parser.add_argument("--top-k", type=int, default=None, help="Only write the K highest-scoring tweets.")
+    parser.add_argument("--store", help="Filter only the new rows of this tweet store (e.g. tweets.db) instead of a JSONL file.")
+    parser.add_argument("--archive", metavar="DIR", help="Read raw tweets from this archive (written by main.py --archive) instead of a JSONL file.")
+    parser.add_argument("--since", type=parse_time, default=None, help="Only tweets created at or after this time: 24h, 7d, a Unix timestamp or an ISO date.")
+    parser.add_argument("--until", type=parse_time, default=None, help="Only tweets created before this time (same formats as --since).")
+    add_metrics_arguments(parser)
+    return parser
+
+def check_arguments(parser, args):
+    if not args.input_file and not args.store and not args.archive:
+        parser.error("an input file, --archive or --store is required")
+    if args.store and (args.archive or args.since is not None or args.until is not None):
+        parser.error("--store can't be combined with --archive, --since or --until")
+    if args.store and (args.workers > 1 or args.stream or args.near_dup_distance is not None or args.top_k is not None):
+        parser.error("--store can't be combined with --workers, --stream, --near-dup-distance or --top-k")
+    if args.workers > 1 and (args.archive or args.since is not None or args.until is not None):
+        parser.error("--workers needs a plain JSONL input without --since/--until")
+    if args.hits and (args.store or args.workers > 1 or args.near_dup_distance is not None
+                      or args.since is not None or args.until is not None):
+        parser.error("--hits can't be combined with --store, --workers, --near-dup-distance, --since or --until")
+    if args.hits and args.inflections:
+        parser.error("--hits can't be combined with --inflections")
+
+def run_filter(args) -> dict:
+    """Filters the input named by `args` (see build_parser) and returns the run's counts."""
+    source = f"store '{args.store}'" if args.store else f"archive '{args.archive}'" if args.archive else f"'{args.input_file}'"
+    print(f"Filtering tweets from {source} with a minimum score of {args.min_score}...")
+
+    configure_scoring(inflections=args.inflections)
+    mode = 'store' if args.store else 'hits' if args.hits else 'stream' if args.stream else 'memory'
+    run = {'store': run_from_store, 'hits': run_rescore, 'stream': run_stream, 'memory': run_in_memory}[mode]
+    SCORE_TALLY.clear()
+    STAGE_SECONDS.clear()
+    started = time.perf_counter()
+    with profile_stage('filter'):
+        total_tweets, found, top_tweets = run(args)
+    elapsed = time.perf_counter() - started
+    record_metrics(mode, total_tweets, found, args.min_score, elapsed)
 
     print("\n--- Filtering Complete ---")
     print(f"Processed: {total_tweets} tweets")
-    print(f"Found:     {len(useful_tweets)} unique, high-value tweets")
+    print(f"Found:     {found} unique, high-value tweets")
+    print(f"Time:      {elapsed:.2f}s ({total_tweets / elapsed if elapsed else 0:,.0f} tweets/s)")
     print(f"Results saved to '{args.out}'")
     print("\n--- Top 5 Developer/Security Tweets ---")
-    for i, tweet in enumerate(useful_tweets[:5]):
+    for i, tweet in enumerate(top_tweets):
         print(f"{i+1}. (Score: {tweet['filter_score']}) {tweet['text']}")
+    return {'processed': total_tweets, 'found': found, 'seconds': round(elapsed, 3)}
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    check_arguments(parser, args)
+    configure_metrics(args)
+
+    if args.parity:
+        configure_scoring(inflections=args.inflections)
+        report_parity(args.input_file)
+        return
+
+    run_filter(args)
+    export_metrics(args, 'filter')
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,171 @@
+"""
+Batched, non-blocking JSONL writer for asyncio code.
+
+Producers `await writer.write(obj)`, which only enqueues the record. A single
+background task drains the queue in batches, serializes each batch and
+writes it through one long-lived file handle in a worker thread, so the
+event loop never blocks on file I/O.
+"""
+import asyncio
+import os
+import time
+
+from tweet_archive import DEFAULT_BUCKET_SECONDS, SegmentWriter, TweetArchive
+from tweet_record import dumps
+
+_CLOSE = object()
+
+
+class AsyncJsonlWriter:
+    """
+    Appends dicts to a JSONL file from coroutines.
+
+    A batch is written when `flush_every` records are pending or the oldest
+    pending record is `flush_interval` seconds old, whichever comes first.
+    With `fsync=True` every written batch is also fsync'ed. The queue is
+    bounded by `max_queue`, so fast producers wait instead of growing memory.
+    """
+
+    def __init__(self, path: str, flush_every: int = 100, flush_interval: float = 0.5,
+                 fsync: bool = False, max_queue: int = 10_000):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._file = None
+        self._task = None
+        # Stats
+        self.records_written = 0
+        self.batches_written = 0
+        self.max_queue_depth = 0
+        self.total_write_seconds = 0.0
+        self.max_write_seconds = 0.0
+
+    async def start(self):
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def write(self, obj: dict):
+        """Queues one record. Raises the background task's exception if it has died."""
+        await self._put(obj)
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    async def close(self):
+        """Writes everything still queued, then closes the file. Raises the background task's exception if it died."""
+        if self._task is None:
+            return
+        task = self._task
+        try:
+            if not task.done():
+                await self._put(_CLOSE)
+            await task
+        finally:
+            self._task = None
+            await asyncio.to_thread(self._close)
+
+    async def _put(self, item):
+        # A dead task would never drain the queue, so a full queue would block forever.
+        task = self._task
+        if task is not None and task.done():
+            task.result()
+            raise RuntimeError(f"writer for {self.path} is closed")
+        if task is None or not self._queue.full():
+            await self._queue.put(item)
+            return
+        put = asyncio.ensure_future(self._queue.put(item))
+        await asyncio.wait((put, task), return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            task.result()
+            raise RuntimeError(f"writer for {self.path} is closed")
+
+    def stats(self) -> dict:
+        batches = self.batches_written
+        return {
+            "records_written": self.records_written,
+            "batches_written": batches,
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "avg_write_ms": (self.total_write_seconds / batches * 1000) if batches else 0.0,
+            "max_write_ms": self.max_write_seconds * 1000,
+        }
+
+    # The file hooks below run in a worker thread; subclasses can write elsewhere.
+
+    def _open(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _close(self):
+        self._file.close()
+
+    def _write_batch(self, batch):
+        self._file.write(''.join(dumps(obj) + "\n" for obj in batch))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    async def _flush(self, batch):
+        started = time.perf_counter()
+        await asyncio.to_thread(self._write_batch, batch)
+        elapsed = time.perf_counter() - started
+        self.records_written += len(batch)
+        self.batches_written += 1
+        self.total_write_seconds += elapsed
+        self.max_write_seconds = max(self.max_write_seconds, elapsed)
+        batch.clear()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = None
+        closing = False
+        while not closing:
+            timeout = None if not batch else max(0.0, deadline - loop.time())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except TimeoutError:
+                item = None
+
+            # Take whatever else is already queued without waiting.
+            while item is not None:
+                if item is _CLOSE:
+                    closing = True
+                    break
+                if not batch:
+                    deadline = loop.time() + self.flush_interval
+                batch.append(item)
+                if len(batch) >= self.flush_every or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+
+            if batch and (closing or len(batch) >= self.flush_every or loop.time() >= deadline):
+                await self._flush(batch)
+
+
+class AsyncArchiveWriter(AsyncJsonlWriter):
+    """AsyncJsonlWriter that writes into a TweetArchive instead of a single file."""
+
+    def __init__(self, directory: str, bucket_seconds: int = DEFAULT_BUCKET_SECONDS, **options):
+        super().__init__(directory, **options)
+        self.archive = TweetArchive(directory, bucket_seconds)
+        self._segments = None
+
+    def _open(self):
+        self.archive.recover()
+        self._segments = SegmentWriter(self.archive, self.fsync)
+
+    def _close(self):
+        self._segments.close()
+
+    def _write_batch(self, batch):
+        self._segments.write(batch)
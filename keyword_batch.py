@@ -0,0 +1,219 @@
+"""
+Vectorized scoring of many tweets at once with the KeywordMatcher's rules.
+
+The per-tweet matcher costs a few microseconds of Python per tweet just to
+split the text into words. Here a whole batch of texts is joined into one
+buffer and every step runs as a NumPy operation over all of it:
+
+  * word boundaries come from comparing the normalized bytes with spaces;
+  * each word of up to 16 bytes is read as two little-endian 64-bit
+    integers (through an overlapping uint64 view of the buffer, masked to
+    the word's length) and looked up in a collision-free hash table of the
+    dictionary's words, then compared exactly with the word found there;
+  * a term of n words is a base-V number of its word ids, so every run of
+    n dictionary words that follow each other in the same tweet is looked
+    up in one sorted array per term length;
+  * the (tweet, term) hits are marked in a bitmap, so each term counts once
+    per tweet, and summed per tweet with bincount.
+
+The result is the same as KeywordMatcher.find_terms + weight_of for every
+tweet. A dictionary with a word longer than 16 bytes, or with terms too long
+to number in 63 bits, can't be compiled; the caller falls back to the
+per-tweet matcher.
+"""
+import numpy as np
+
+from keyword_matcher import NORMALIZE_TABLE, normalize_for_matching
+
+KEY_BYTES = 16
+# Mixes the two halves of a word into one key for the hash table.
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+# _LOW_BYTES[n] keeps the first n bytes of a little-endian uint64.
+_LOW_BYTES = np.array([(1 << (8 * n)) - 1 for n in range(9)], dtype=np.uint64)
+
+
+class TextBatch:
+    """
+    Texts joined by single spaces into one buffer, with a space at each end
+    and padding after it. The buffer is read as UTF-32 code points and
+    non-ASCII characters become one '?' byte each, so text i starts at
+    `starts[i]` in both the raw and the normalized bytes.
+    """
+
+    def __init__(self, texts: list):
+        self.texts = texts
+        code_points = np.frombuffer(' '.join(['', *texts, ' ' * KEY_BYTES]).encode('utf-32-le', 'surrogatepass'),
+                                    dtype='<u4')
+        self.non_ascii = np.flatnonzero(code_points > 127)
+        self.non_ascii_code_points = code_points[self.non_ascii]
+        raw = code_points.astype(np.uint8)
+        raw[self.non_ascii] = ord('?')
+        self.raw = raw
+        normalized = raw.tobytes().translate(NORMALIZE_TABLE)
+        self.normalized = np.frombuffer(normalized, dtype=np.uint8)
+        # Element i is the 8 bytes starting at byte i.
+        self.words_at = np.ndarray((len(normalized) - 7,), dtype='<u8', buffer=normalized, strides=(1,))
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+        self.starts = np.cumsum(lengths) - lengths + 1
+
+    def __len__(self):
+        return len(self.texts)
+
+    def text_of(self, positions):
+        """The index of the text each byte position falls in."""
+        return np.searchsorted(self.starts, positions, side='right') - 1
+
+    def count_byte(self, byte: int):
+        """How often `byte` occurs in each raw text."""
+        return np.bincount(self.text_of(np.flatnonzero(self.raw == byte)), minlength=len(self))
+
+    def first_byte_is(self, byte: int):
+        """Indexes of the texts whose raw first byte is `byte`."""
+        return np.flatnonzero(self.raw[self.starts] == byte)
+
+    def contains_digit(self):
+        """keyword_matcher.contains_digit for every text, as a bool array."""
+        is_digit = self.normalized - np.uint8(48) < 10
+        # Non-ASCII characters are '?' in the buffer; test each distinct one
+        # with str.isdigit and map the result back to their positions.
+        code_points, positions = np.unique(self.non_ascii_code_points, return_inverse=True)
+        digits = np.fromiter(map(str.isdigit, map(chr, code_points.tolist())), dtype=bool, count=len(code_points))
+        is_digit[self.non_ascii[digits[positions]]] = True
+        return np.logical_or.reduceat(is_digit, self.starts) if len(self) else is_digit[:0]
+
+    def words(self):
+        """(start, end) byte positions of every word in the normalized buffer."""
+        is_word = self.normalized != 32
+        edges = np.flatnonzero(is_word[1:] != is_word[:-1]) + 1
+        return edges[0::2], edges[1::2]
+
+
+class BatchMatcher:
+    """A KeywordMatcher's terms compiled to arrays for scoring a TextBatch."""
+
+    def __init__(self, terms: list, weights: dict, disqualifying: frozenset, suffixes=(b'',)):
+        vocabulary = {}
+
+        def word_id(word):
+            return vocabulary.setdefault(word, len(vocabulary))
+
+        # Every accepted word sequence of each term (the last word may be
+        # inflected), as word ids, grouped by length.
+        sequences = {}
+        for term_id, term in enumerate(terms):
+            words = normalize_for_matching(term).split()
+            if words:
+                first = [word_id(word) for word in words[:-1]]
+                for suffix in suffixes:
+                    sequences.setdefault(len(words), []).append((first + [word_id(words[-1] + suffix)], term_id))
+
+        longest = max(map(len, vocabulary), default=0)
+        if longest > KEY_BYTES:
+            raise ValueError(f"dictionary words are limited to {KEY_BYTES} bytes, got {longest}")
+        self.base = len(vocabulary)
+        if self.base ** max(sequences, default=1) >= 1 << 63:
+            raise ValueError(f"terms of {max(sequences)} words can't be numbered with {self.base} words")
+
+        # The words' halves, indexed by word id, plus a row no word matches
+        # (normalized text has no 0xff bytes) that empty table slots point to.
+        halves = np.frombuffer(b''.join(word.ljust(KEY_BYTES, b'\0') for word in vocabulary)
+                               + b'\xff' * KEY_BYTES, dtype='<u8').reshape(-1, 2)
+        self.low, self.high = halves[:, 0].copy(), halves[:, 1].copy()
+        self._build_table(self.low[:-1] ^ (self.high[:-1] * _MIX))
+
+        # All accepted sequences' terms in one array: first the single-word
+        # terms by word id (CSR, from word_term_start), then for each longer
+        # term length the terms by sequence number, which `sequences` maps to
+        # (sorted sequence numbers, offset of their terms in match_terms).
+        singles = sorted((ids[0], term) for ids, term in sequences.pop(1, ()))
+        match_terms = [np.array([term for _, term in singles], dtype=np.int64)]
+        self.word_term_start = np.searchsorted(np.array([word for word, _ in singles], dtype=np.int64),
+                                               np.arange(self.base + 1))
+        self.sequences = {}
+        offset = len(singles)
+        for length, entries in sorted(sequences.items()):
+            numbers = np.array([self.number(ids) for ids, _ in entries], dtype=np.int64)
+            order = np.argsort(numbers, kind='stable')
+            self.sequences[length] = (numbers[order], offset)
+            match_terms.append(np.array([term for _, term in entries], dtype=np.int64)[order])
+            offset += len(entries)
+        self.match_terms = np.concatenate(match_terms)
+
+        self.term_weights = np.array([weights.get(term, 0) for term in terms], dtype=np.float64)
+        self.term_disqualifies = np.array([term in disqualifying for term in terms], dtype=bool)
+
+    def number(self, word_ids):
+        """The base-V number of a sequence of word ids."""
+        return sum(word * self.base ** position for position, word in enumerate(reversed(word_ids)))
+
+    def _build_table(self, keys):
+        """Picks a multiplier and table size under which no two words share a slot."""
+        rng = np.random.default_rng(0)
+        bits = max(8, 2 * len(keys).bit_length())
+        while bits <= 24:
+            for multiplier in rng.integers(1, 1 << 63, size=16, dtype=np.uint64) | np.uint64(1):
+                slots = (keys * multiplier) >> np.uint64(64 - bits)
+                if len(np.unique(slots)) == len(keys):
+                    self.multiplier, self.shift = multiplier, np.uint64(64 - bits)
+                    self.table = np.full(1 << bits, len(keys), dtype=np.intp)
+                    self.table[slots.astype(np.intp)] = np.arange(len(keys))
+                    return
+            bits += 1
+        raise ValueError("no collision-free hash table for the dictionary words")
+
+    def lookup(self, batch: TextBatch):
+        """
+        (word start positions, indexes of the dictionary words among them,
+        their word ids) for the batch. Words of up to 8 bytes are keyed by
+        their bytes alone, so the second half is only read for longer words
+        and for the few that land on a dictionary word's slot.
+        """
+        starts, ends = batch.words()
+        lengths = ends - starts
+        keys = batch.words_at[starts] & _LOW_BYTES[np.minimum(lengths, 8)]
+        long = np.flatnonzero(lengths > 8)
+        keys[long] ^= (batch.words_at[starts[long] + 8] & _LOW_BYTES[np.minimum(lengths[long] - 8, 8)]) * _MIX
+        ids = self.table[(keys * self.multiplier) >> self.shift]
+
+        # A slot holds the only dictionary word that can match; confirm it.
+        found = np.flatnonzero(ids != len(self.low) - 1)
+        ids, first, length = ids[found], starts[found], lengths[found]
+        match = ((self.low[ids] == batch.words_at[first] & _LOW_BYTES[np.minimum(length, 8)])
+                 & (self.high[ids] == batch.words_at[first + 8] & _LOW_BYTES[np.clip(length - 8, 0, 8)])
+                 & (length <= KEY_BYTES))
+        return starts, found[match], ids[match]
+
+    def weigh(self, batch: TextBatch):
+        """(summed term weights as int64, disqualified as bool) for every text in the batch."""
+        starts, hit_words, hit_ids = self.lookup(batch)
+        hit_texts = batch.text_of(starts[hit_words])
+
+        # Single-word terms: every term of every matched word.
+        first = self.word_term_start[hit_ids]
+        texts, firsts, counts = [hit_texts], [first], [self.word_term_start[hit_ids + 1] - first]
+        for length, (numbers, offset) in self.sequences.items():
+            # Runs of `length` dictionary words that directly follow each
+            # other within one text, numbered like the terms.
+            count = max(len(hit_ids) - length + 1, 0)
+            runs = np.flatnonzero((hit_words[length - 1:] - hit_words[:count] == length - 1)
+                                  & (hit_texts[length - 1:] == hit_texts[:count]))
+            number = hit_ids[runs]
+            for position in range(1, length):
+                number = number * self.base + hit_ids[runs + position]
+            first = np.searchsorted(numbers, number)
+            texts.append(hit_texts[runs])
+            firsts.append(first + offset)
+            counts.append(np.searchsorted(numbers, number, side='right') - first)
+
+        # Every term of every match, marked in a (text, term) bitmap so that
+        # each term counts once per text.
+        texts, first, counts = np.concatenate(texts), np.concatenate(firsts), np.concatenate(counts)
+        ends = np.cumsum(counts)
+        index = np.arange(ends[-1] if len(ends) else 0) + np.repeat(first - (ends - counts), counts)
+        pairs = np.repeat(texts, counts) * len(self.term_weights) + self.match_terms[index]
+        seen = np.zeros(len(batch) * len(self.term_weights), dtype=bool)
+        seen[pairs] = True
+        texts, terms = np.divmod(np.flatnonzero(seen), len(self.term_weights))
+        weights = np.bincount(texts, weights=self.term_weights[terms], minlength=len(batch))
+        disqualified = np.bincount(texts[self.term_disqualifies[terms]], minlength=len(batch)) > 0
+        return np.rint(weights).astype(np.int64), disqualified
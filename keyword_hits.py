@@ -0,0 +1,173 @@
+"""
+Persistent keyword-hit index for rescoring tweets without re-reading them.
+
+A tweet's filter score is the sum of the weights of the dictionary terms it
+contains plus a few text rules (short replies, hashtag spam, digits), or
+-100 if it contains a disqualifying phrase. The hit index stores, for every
+input line, which terms matched (a sparse lines x terms matrix as CSR arrays),
+the text-rule adjustment and the dedup digest, in one `.npz` file. New
+weights or a new threshold are then applied as a sparse matrix-vector
+product over the stored hits:
+
+    scores = hits @ weights + adjustment
+
+Terms added to the dictionaries after the index was built are the only
+thing that needs the tweet text again: they are scanned for and merged in
+as new columns.
+"""
+import json
+import os
+from array import array
+
+import numpy as np
+
+FORMAT_VERSION = 1
+DISQUALIFIED_SCORE = -100
+
+# Row status: a line that could not be parsed, a tweet with no text left to
+# deduplicate on (never scored, like in the filter), or a scored tweet.
+MALFORMED, EMPTY, SCORED = 0, 1, 2
+
+
+class HitIndexBuilder:
+    """
+    Collects one row per input line, in input order. `terms` are the terms
+    the lines are matched against; the index covers them even if they never match.
+    """
+
+    def __init__(self, terms=()):
+        self.columns = {term: column for column, term in enumerate(terms)}
+        self.status = array('b')
+        self.adjustment = array('i')
+        self.digest = array('q')
+        self.indices = array('i')
+        self.indptr = array('q', [0])
+
+    def add(self, status: int, hits=(), adjustment: int = 0, digest: int = 0):
+        columns = self.columns
+        for term in hits:
+            column = columns.get(term)
+            if column is None:
+                column = columns[term] = len(columns)
+            self.indices.append(column)
+        self.indptr.append(len(self.indices))
+        self.status.append(status)
+        self.adjustment.append(adjustment)
+        self.digest.append(digest)
+
+    def build(self, source: dict) -> 'HitIndex':
+        return HitIndex(
+            terms=list(self.columns),
+            indptr=np.frombuffer(self.indptr, dtype=np.int64),
+            indices=np.frombuffer(self.indices, dtype=np.int32),
+            status=np.frombuffer(self.status, dtype=np.int8),
+            adjustment=np.frombuffer(self.adjustment, dtype=np.int32),
+            digest=np.frombuffer(self.digest, dtype=np.int64),
+            source=source,
+        )
+
+
+class HitIndex:
+    """The term hits, adjustments and dedup digests of every input line."""
+
+    def __init__(self, terms, indptr, indices, status, adjustment, digest, source: dict):
+        self.terms = list(terms)
+        self.indptr = indptr
+        self.indices = indices
+        self.status = status
+        self.adjustment = adjustment
+        self.digest = digest
+        self.source = source
+        self._rows = None
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    def count(self, status: int) -> int:
+        return int(np.count_nonzero(self.status == status))
+
+    # --- Storage ---
+
+    @classmethod
+    def load(cls, path: str) -> 'HitIndex':
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            if meta.get('version') != FORMAT_VERSION:
+                raise ValueError(f"unsupported hit index version {meta.get('version')!r}")
+            return cls(data['terms'].tolist(), data['indptr'], data['indices'], data['status'],
+                       data['adjustment'], data['digest'], meta['source'])
+
+    def save(self, path: str):
+        """Writes the index atomically (a temporary file is renamed over `path`)."""
+        meta = json.dumps({'version': FORMAT_VERSION, 'source': self.source})
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, meta=np.array(meta), terms=np.array(self.terms, dtype=str), indptr=self.indptr,
+                     indices=self.indices, status=self.status, adjustment=self.adjustment, digest=self.digest)
+        os.replace(tmp_path, path)
+
+    # --- New terms ---
+
+    def missing_terms(self, terms) -> list:
+        """The terms the index has never been scanned for."""
+        known = set(self.terms)
+        return sorted(term for term in terms if term not in known)
+
+    def add_terms(self, terms, hits_by_row: dict):
+        """
+        Records that the index now covers `terms`. `hits_by_row` maps row
+        numbers to the new terms found in that row.
+        """
+        columns = {term: len(self.terms) + i for i, term in enumerate(terms)}
+        new_rows = array('q')
+        new_columns = array('i')
+        for row, found in hits_by_row.items():
+            for term in found:
+                new_rows.append(row)
+                new_columns.append(columns[term])
+
+        rows = np.concatenate([self._row_ids(), np.frombuffer(new_rows, dtype=np.int64)])
+        order = np.argsort(rows, kind='stable')
+        self.indices = np.concatenate([self.indices, np.frombuffer(new_columns, dtype=np.int32)])[order]
+        counts = np.bincount(rows, minlength=len(self))
+        self.indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        self.terms.extend(terms)
+        self._rows = None
+
+    # --- Scoring ---
+
+    def _row_ids(self) -> np.ndarray:
+        """The row number of every stored hit (the CSR indptr expanded)."""
+        if self._rows is None:
+            self._rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.indptr))
+        return self._rows
+
+    def scores(self, weights: dict, disqualifying=()) -> np.ndarray:
+        """Every row's score under the given term weights (only meaningful for SCORED rows)."""
+        column_weights = np.array([weights.get(term, 0) for term in self.terms], dtype=np.float64)
+        column_disqualifying = np.array([term in disqualifying for term in self.terms], dtype=np.float64)
+        rows = self._row_ids()
+        scores = np.bincount(rows, weights=column_weights[self.indices], minlength=len(self))
+        scores = scores.astype(np.int64) + self.adjustment
+        disqualified = np.bincount(rows, weights=column_disqualifying[self.indices], minlength=len(self)) > 0
+        scores[disqualified] = DISQUALIFIED_SCORE
+        return scores
+
+    def score_counts(self, scores: np.ndarray) -> dict:
+        """{score: number of scored tweets}, like the filter's score tally."""
+        values, counts = np.unique(scores[self.status == SCORED], return_counts=True)
+        return dict(zip(values.tolist(), counts.tolist()))
+
+    def select(self, scores: np.ndarray, min_score: int) -> np.ndarray:
+        """
+        The rows the filter would keep, in input order: scored rows that meet
+        `min_score`, minus later rows with the same dedup digest.
+        """
+        candidates = np.flatnonzero((self.status == SCORED) & (scores >= min_score))
+        _, first = np.unique(self.digest[candidates], return_index=True)
+        return np.sort(candidates[first])
+
+
+def rank_by_score(rows: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """The rows ordered by score, highest first; ties keep input order, like list.sort()."""
+    return rows[np.argsort(-scores[rows], kind='stable')]
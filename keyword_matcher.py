@@ -0,0 +1,130 @@
+"""
+Precompiled, single-pass keyword matcher for the tweet scoring engine.
+
+The matcher is built once from the scoring dictionaries. Scoring a tweet then
+costs one C-level normalisation pass over the text plus a set intersection,
+instead of one substring scan per dictionary entry.
+
+Matching rules:
+  * Terms only match on word boundaries, so 'ath' no longer fires inside
+    'path' and 'rsi' no longer fires inside 'versions'.
+  * Word characters are ASCII letters, digits and '_'. Everything else
+    (punctuation, emoji, curly quotes, ...) acts as a separator.
+  * With inflections=True the last word of a term may also carry a common
+    inflection ('s', 'es', 'ed', 'ing'), so 'exploit' matches 'exploits' and
+    'exploited'. It is off by default: the substring scorer never matched
+    those forms, so --parity only reports what the word boundaries change.
+  * Multi-word terms match across any run of separators, so '0-day' also
+    matches '0 day' and 'fast & trusted recovery' matches 'fast & trusted  recovery'.
+
+Large batches of tweets are scored with keyword_batch instead (see
+compiled()), which gives the same weights without a per-tweet Python pass.
+"""
+
+INFLECTION_SUFFIXES = (b'', b's', b'es', b'ed', b'ing')
+
+# Maps every ASCII word byte to itself (lower-cased) and everything else to a
+# space. Non-ASCII characters are replaced with '?' before the translation,
+# so they also become separators.
+_WORD_BYTES = frozenset(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_')
+NORMALIZE_TABLE = bytes(
+    (c | 0x20 if 65 <= c <= 90 else c) if c in _WORD_BYTES else 32
+    for c in range(256)
+)
+# Everything except ASCII digits, used to test for digits without a Python loop.
+_NON_DIGIT_BYTES = bytes(c for c in range(256) if not 48 <= c <= 57)
+
+
+def normalize_for_matching(text: str) -> bytes:
+    """Lower-cases the text and turns every non-word character into a space."""
+    return text.encode('ascii', 'replace').translate(NORMALIZE_TABLE)
+
+
+def contains_digit(text: str, normalized: bytes = None) -> bool:
+    """Same result as any(c.isdigit() for c in text), without a Python loop."""
+    if normalized is None:
+        normalized = normalize_for_matching(text)
+    if normalized.translate(None, _NON_DIGIT_BYTES):
+        return True
+    # Non-ASCII digits (e.g. '²', '٣') were replaced by the normalisation.
+    return not text.isascii() and any(map(str.isdigit, text))
+
+
+class KeywordMatcher:
+    """Finds every dictionary term in a tweet in a single pass."""
+
+    def __init__(self, weights: dict, disqualifying=(), inflections: bool = False):
+        self.weights = dict(weights)
+        self.disqualifying = frozenset(disqualifying)
+        self.inflections = inflections
+        self._suffixes = INFLECTION_SUFFIXES if inflections else (b'',)
+        self._compiled = None
+        # First token -> [(term, needles)]. Single-word terms are indexed under
+        # every inflected form and need no further check (needles is None).
+        # Multi-word terms are verified against the padded, normalised text.
+        self._index = {}
+        self.terms = sorted(set(self.weights) | self.disqualifying)
+        for term in self.terms:
+            tokens = normalize_for_matching(term).split()
+            if not tokens:
+                continue
+            if len(tokens) == 1:
+                for suffix in self._suffixes:
+                    self._index.setdefault(tokens[0] + suffix, []).append((term, None))
+            else:
+                body = b' ' + b' '.join(tokens)
+                needles = tuple(body + suffix + b' ' for suffix in self._suffixes)
+                self._index.setdefault(tokens[0], []).append((term, needles))
+        self._first_tokens = frozenset(self._index)
+
+    @classmethod
+    def from_dictionaries(cls, useful: dict, noise: dict, disqualifying=(), inflections: bool = False):
+        """Builds a matcher from the positive, negative and disqualifying lists."""
+        weights = dict(useful)
+        for term, points in noise.items():
+            weights[term] = weights.get(term, 0) + points
+        return cls(weights, disqualifying, inflections)
+
+    def find_terms(self, text: str, normalized: bytes = None) -> set:
+        """Returns the set of dictionary terms that occur in the text."""
+        if normalized is None:
+            normalized = normalize_for_matching(text)
+        tokens = normalized.split()
+        candidates = self._first_tokens.intersection(tokens)
+        hits = set()
+        if not candidates:
+            return hits
+        padded = None
+        for token in candidates:
+            for term, needles in self._index[token]:
+                if needles is None:
+                    hits.add(term)
+                    continue
+                if padded is None:
+                    padded = b' ' + b' '.join(tokens) + b' '
+                for needle in needles:
+                    if needle in padded:
+                        hits.add(term)
+                        break
+        return hits
+
+    def compiled(self):
+        """
+        The terms compiled for keyword_batch (which imports NumPy), built on
+        first use. None if a dictionary word is too long for it.
+        """
+        if self._compiled is None:
+            from keyword_batch import BatchMatcher
+            try:
+                self._compiled = BatchMatcher(self.terms, self.weights, self.disqualifying, self._suffixes)
+            except ValueError:
+                self._compiled = False
+        return self._compiled or None
+
+    def is_disqualified(self, hits: set) -> bool:
+        return not self.disqualifying.isdisjoint(hits)
+
+    def weight_of(self, hits: set) -> int:
+        """Sums the weights of the matched terms."""
+        weights = self.weights
+        return sum(weights[term] for term in hits if term in weights)
@@ -0,0 +1,161 @@
+"""
+Yield-driven keyword scheduler for the scraper.
+
+Keeps per-keyword statistics across runs (requests made, new tweets, tweets
+that pass the filter's score threshold, time of the last fetch) and spends
+each session's request budget on the keywords expected to return the most
+new, useful tweets. The policy is UCB1 over "useful new tweets per request",
+scaled down for keywords fetched very recently (their backlog of unseen
+tweets has not refilled yet). Keywords that have never been searched are
+always tried first.
+
+Keywords whose search failed (rate limit retries used up, network or API
+errors) are kept in a retry queue in the same file and picked before any
+other keyword once they are due. A keyword leaves the queue when a search
+for it succeeds.
+"""
+import json
+import math
+import os
+import random
+import time
+
+DEFAULT_STATS_FILE = "keyword_stats.json"
+# A failed keyword is retried after RETRY_DELAY seconds, doubling with every
+# further failure up to MAX_RETRY_DELAY (a rate limit's reset time wins).
+RETRY_DELAY = 600
+MAX_RETRY_DELAY = 24 * 3600
+
+class KeywordScheduler:
+    """Ranks keywords by expected yield and persists what it learns."""
+
+    def __init__(self, keywords, stats_path: str = DEFAULT_STATS_FILE, exploration: float = 1.0,
+                 refill_seconds: float = 6 * 3600, decay: float = 0.9):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.stats_path = stats_path
+        self.exploration = exploration
+        self.refill_seconds = refill_seconds
+        # Older observations are discounted so the ranking follows topic drift.
+        self.decay = decay
+        self.blocked_until = 0.0
+        self.stats = {}
+        self.retry_queue = {}
+        self.load()
+
+    # --- Persistence ---
+
+    def load(self):
+        if not self.stats_path or not os.path.exists(self.stats_path):
+            return
+        try:
+            with open(self.stats_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[WARN] Could not read keyword stats from '{self.stats_path}': {e}")
+            return
+        self.stats = data.get('keywords', {})
+        self.blocked_until = data.get('blocked_until', 0.0)
+        self.retry_queue = data.get('retry_queue', {})
+
+    def save(self):
+        if not self.stats_path:
+            return
+        tmp_path = self.stats_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'keywords': self.stats, 'blocked_until': self.blocked_until, 'retry_queue': self.retry_queue},
+                      f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.stats_path)
+
+    def set_keywords(self, keywords):
+        """Replaces the keyword list (e.g. on a config reload). Stats of removed keywords are kept."""
+        self.keywords = list(dict.fromkeys(keywords))
+
+    # --- Policy ---
+
+    def _entry(self, keyword):
+        return self.stats.setdefault(keyword, {
+            'requests': 0.0, 'new_tweets': 0.0, 'useful_tweets': 0.0,
+            'total_requests': 0, 'last_fetch': 0.0,
+        })
+
+    def priority(self, keyword, now=None) -> float:
+        entry = self.stats.get(keyword)
+        if not entry or not entry['requests']:
+            return math.inf
+        now = time.time() if now is None else now
+        searched = [e for e in self.stats.values() if e['requests']]
+        total = sum(e['requests'] for e in searched)
+        # Yields are tweet counts, not [0, 1] rewards, so the exploration bonus
+        # is scaled by the best yield seen so far.
+        scale = max(max(e['useful_tweets'] / e['requests'] for e in searched), 1.0)
+        mean_yield = entry['useful_tweets'] / entry['requests']
+        bonus = self.exploration * scale * math.sqrt(math.log(total + 1) / entry['requests'])
+        freshness = min(1.0, (now - entry['last_fetch']) / self.refill_seconds) if self.refill_seconds else 1.0
+        return (mean_yield + bonus) * freshness
+
+    def pick(self, count: int) -> list:
+        """
+        Returns `count` keywords: the queued retries that are due (longest
+        queued first), then those with the highest priority (random order
+        among ties). Queued keywords that are not due yet are left out.
+        """
+        now = time.time()
+        retries = [k for k in self.due_retries(now) if k in self.keywords][:count]
+        candidates = [k for k in self.keywords if k not in self.retry_queue]
+        random.shuffle(candidates)
+        candidates.sort(key=lambda k: self.priority(k, now), reverse=True)
+        return retries + candidates[:count - len(retries)]
+
+    def record(self, keyword, requests: int, new_tweets: int, useful_tweets: int):
+        """Adds the outcome of one search and saves the stats."""
+        entry = self._entry(keyword)
+        for field, value in (('requests', requests), ('new_tweets', new_tweets), ('useful_tweets', useful_tweets)):
+            entry[field] = entry[field] * self.decay + value
+        entry['total_requests'] += requests
+        entry['last_fetch'] = time.time()
+        self.retry_queue.pop(keyword, None)
+        self.save()
+
+    # --- Rate limits ---
+
+    def record_rate_limit(self, reset_at: float):
+        """Blocks all searches until `reset_at` (Unix time), e.g. from a 429 response."""
+        self.blocked_until = max(self.blocked_until, reset_at)
+        self.save()
+
+    def wait_time(self) -> float:
+        """Seconds to wait before the next search is allowed."""
+        return max(0.0, self.blocked_until - time.time())
+
+    # --- Retry queue ---
+
+    def queue_retry(self, keyword, reason: str, not_before: float = None):
+        """
+        Queues a keyword whose search failed. It is due again at `not_before`
+        (Unix time, e.g. a rate limit's reset), or else after the retry delay.
+        """
+        now = time.time()
+        entry = self.retry_queue.get(keyword) or {'attempts': 0, 'queued_at': now}
+        entry['attempts'] += 1
+        entry['reason'] = reason
+        if not_before is None:
+            not_before = now + min(RETRY_DELAY * 2 ** (entry['attempts'] - 1), MAX_RETRY_DELAY)
+        entry['not_before'] = not_before
+        self.retry_queue[keyword] = entry
+        self.save()
+
+    def due_retries(self, now=None) -> list:
+        """Queued keywords that may be retried now, longest queued first."""
+        now = time.time() if now is None else now
+        due = [(entry['queued_at'], keyword) for keyword, entry in self.retry_queue.items() if entry['not_before'] <= now]
+        return [keyword for _, keyword in sorted(due)]
+
+    def summary(self, limit: int = 10) -> list:
+        """(keyword, useful per request, new per request, total requests) for the best keywords."""
+        rows = []
+        for keyword, entry in self.stats.items():
+            if entry['requests']:
+                rows.append((keyword, entry['useful_tweets'] / entry['requests'],
+                             entry['new_tweets'] / entry['requests'], entry['total_requests']))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows[:limit]
@@ -5,16 +5,17 @@ import os
 import random
 import atexit
 import time
-from twikit import Client
-from dotenv import load_dotenv
 from session_manager import HumanSession
+from tweet_store import TweetStore, parse_created_at
+from jsonl_writer import AsyncArchiveWriter, AsyncJsonlWriter
+from tweet_archive import DEFAULT_BUCKET_SECONDS
+from keyword_scheduler import KeywordScheduler, DEFAULT_STATS_FILE
+from offline_client import RecordingClient, ReplayClient
+from filter_tweets import calculate_score, SCORE_THRESHOLD
+from tweet_record import TweetRecord
+from metrics import METRICS, add_metrics_arguments, configure as configure_metrics, export as export_metrics, profile_stage
 
 # ---------- CONFIG ----------
-# Load credentials from the .env file
-load_dotenv()
-AUTH_TOKEN = os.getenv('TWITTER_AUTH_TOKEN')
-CT0 = os.getenv('TWITTER_CT0')
-
 # This will be the name of the temporary cookie file we create
 TEMP_COOKIE_FILE = "temp_cookies.json"
 
@@ -47,11 +48,34 @@ KEYWORDS = [
 
 DEFAULT_OUT_FILE = "twikit_tweets.jsonl"
 
+# Pagination limits per keyword search
+DEFAULT_MAX_PAGES = 5
+DEFAULT_PAGE_TIME_BUDGET = 120  # seconds
+
+# Set to False to skip every pause (benchmarks and offline runs)
+PAUSES_ENABLED = True
+# Fraction of results randomly left out, as a human skimming the feed would
+RANDOM_SKIP_RATE = 0.05
+
+# Retry waits (seconds). A 429 waits until the reset time it reports, plus a
+# margin for clock skew; without one it backs off exponentially from
+# RATE_LIMIT_BASE_WAIT. Timeouts, 5xx and network errors back off from
+# TRANSIENT_BASE_WAIT.
+RATE_LIMIT_MARGIN = 1.0
+RATE_LIMIT_BASE_WAIT = 60
+MAX_RATE_LIMIT_WAIT = 3600
+TRANSIENT_BASE_WAIT = 5
+
 # ---------- UTILITIES ----------
 def create_temp_cookie_file():
-    if not AUTH_TOKEN or not CT0:
+    # Load credentials from the .env file
+    from dotenv import load_dotenv
+    load_dotenv()
+    auth_token = os.getenv('TWITTER_AUTH_TOKEN')
+    ct0 = os.getenv('TWITTER_CT0')
+    if not auth_token or not ct0:
         return False
-    cookie_data = {"auth_token": AUTH_TOKEN, "ct0": CT0}
+    cookie_data = {"auth_token": auth_token, "ct0": ct0}
     with open(TEMP_COOKIE_FILE, "w") as f:
         json.dump(cookie_data, f)
     return True
@@ -63,41 +87,47 @@ def cleanup_temp_cookie_file():
 
 atexit.register(cleanup_temp_cookie_file)
 
-def append_to_jsonl(path: str, obj: dict):
-    with open(path, "a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+async def pause(seconds: float):
+    """Sleeps for `seconds`, unless pauses are disabled."""
+    if PAUSES_ENABLED:
+        await asyncio.sleep(seconds)
 
-def format_tweet_data(tweet) -> dict:
+async def human_pause(low: float, high: float):
+    """A random human-like pause between `low` and `high` seconds."""
+    await pause(random.uniform(low, high))
+
+def format_tweet_data(tweet) -> TweetRecord:
     """
     Formats the tweet data, prioritizing the 'full_text' attribute
     to prevent truncated content.
     """
     tweet_text = tweet.full_text if hasattr(tweet, 'full_text') and tweet.full_text else tweet.text
     
-    return {
-        'id': tweet.id,
-        'text': tweet_text,
-        'created_at': tweet.created_at,
-        'user_id': tweet.user.id,
-        'user_name': tweet.user.name,
-        'user_screen_name': tweet.user.screen_name,
-        'retweet_count': tweet.retweet_count,
-        'favorite_count': tweet.favorite_count,
-        'lang': tweet.lang,
-        'keyword_searched': getattr(tweet, 'keyword_searched', None)
-    }
+    return TweetRecord(
+        id=tweet.id,
+        text=tweet_text,
+        created_at=tweet.created_at,
+        user_id=tweet.user.id,
+        user_name=tweet.user.name,
+        user_screen_name=tweet.user.screen_name,
+        retweet_count=tweet.retweet_count,
+        favorite_count=tweet.favorite_count,
+        lang=tweet.lang,
+        keyword_searched=getattr(tweet, 'keyword_searched', None),
+    )
+
+SEARCH_QUALIFIERS = ["latest", "new", "recent", "top", "best"]
+SEARCH_TOPIC_TERMS = ["news", "update", "guide", "tutorial", "article"]
 
 def generate_search_variations(keyword):
     """Generate human-like variations of search keywords."""
     variations = [keyword]
     
-    qualifiers = ["latest", "new", "recent", "top", "best"]
     if random.random() < 0.15:
-        variations.append(f"{random.choice(qualifiers)} {keyword}")
+        variations.append(f"{random.choice(SEARCH_QUALIFIERS)} {keyword}")
     
-    industry_terms = ["news", "update", "guide", "tutorial", "article"]
     if random.random() < 0.1:
-        variations.append(f"{keyword} {random.choice(industry_terms)}")
+        variations.append(f"{keyword} {random.choice(SEARCH_TOPIC_TERMS)}")
         
     if random.random() < 0.02 and len(keyword) > 5:
         typo_pos = random.randint(1, len(keyword)-1)
@@ -106,132 +136,430 @@ def generate_search_variations(keyword):
     
     return random.choice(variations)
 
+def base_keyword(query, keywords=KEYWORDS):
+    """
+    The keyword that generate_search_variations turned into `query`, so a
+    replayed search is stored under the same keyword as the live one.
+    `query` itself if it is no variation of any keyword.
+    """
+    if query in keywords:
+        return query
+    first, _, rest = query.partition(' ')
+    if first in SEARCH_QUALIFIERS and rest in keywords:
+        return rest
+    head, _, last = query.rpartition(' ')
+    if last in SEARCH_TOPIC_TERMS and head in keywords:
+        return head
+    for keyword in keywords:
+        if len(keyword) == len(query) + 1 and len(keyword) > 5 and any(
+                keyword[:i] + keyword[i + 1:] == query for i in range(1, len(keyword))):
+            return keyword
+    return query
+
 # ---------- CORE TWIKIT FUNCTIONS ----------
-async def search_by_keyword(client: Client, keyword: str, out_file: str):
-    """Human-like search behavior with micro-pauses and variations."""
-    print(f"\n[INFO] Searching for latest tweets with keyword: '{keyword}'")
-    await asyncio.sleep(random.uniform(0.5, 3.5))
+def should_stop_paging(tweets, keyword: str, sort_choice: str, store: TweetStore, newest_stored) -> bool:
+    """
+    True once a page reaches tweets we already stored for this keyword, either
+    by id or, for 'Latest' results, by being no newer than `newest_stored`
+    (the newest stored timestamp from before this search started).
+    """
+    if not store or not tweets:
+        return False
+    if store.known_ids((tweet.id for tweet in tweets), keyword=keyword):
+        return True
+    if sort_choice == 'Latest' and newest_stored is not None:
+        page_times = [parse_created_at(tweet.created_at) for tweet in tweets]
+        return any(ts is not None and ts <= newest_stored for ts in page_times)
+    return False
+
+async def search_by_keyword(client, keyword: str, writer: AsyncJsonlWriter, store: TweetStore = None,
+                            max_pages: int = DEFAULT_MAX_PAGES, time_budget: float = DEFAULT_PAGE_TIME_BUDGET,
+                            product: str = None, query: str = None, max_retries: int = 0, scheduler=None):
+    """
+    Human-like search behavior with micro-pauses and variations. Follows the
+    result cursor for up to `max_pages` pages / `time_budget` seconds, and
+    stops early once a page reaches tweets already stored for this keyword.
+    `query` is the text sent to search (a variation of `keyword`, default
+    `keyword` itself); tweets are stored, checked against the store and
+    counted in the metrics under `keyword`.
+    `product` forces 'Latest' or 'Top' instead of picking one at random.
+    Each request is retried up to `max_retries` times (see request_with_backoff),
+    so a rate limit on a later page resumes from the same cursor.
+    Returns {'requests', 'new_tweets', 'useful_tweets', 'error'} for the
+    scheduler. If the first request fails its error is raised; if a later page
+    fails, paging stops and 'error' is that error, with the stats of the pages
+    before it (whose tweets are already written). Otherwise 'error' is None.
+    """
+    query = query or keyword
+    print(f"\n[INFO] Searching for latest tweets with keyword: '{query}'")
+    await human_pause(0.5, 3.5)
 
     try:
         # Using the keyword directly as complex filters can cause 404 errors
-        actual_query = keyword
+        actual_query = query
         
         sort_options = ['Latest', 'Top']
-        sort_choice = random.choices(sort_options, weights=[0.8, 0.2])[0]
-        
-        tweets = await client.search_tweet(actual_query, sort_choice)
-        
-        await asyncio.sleep(random.uniform(1.5, 5))
-        
-        result_phrases = [
-            f"Found {len(tweets)} tweets for '{keyword}'.",
-            f"Search returned {len(tweets)} results for '{keyword}'.",
-            f"Got {len(tweets)} matching tweets for '{keyword}'."
-        ]
-        print(random.choice(result_phrases))
-        
-        for tweet in tweets:
-            if random.random() < 0.05:
-                continue
+        sort_choice = product or random.choices(sort_options, weights=[0.8, 0.2])[0]
+
+        started = time.monotonic()
+        newest_stored = store.latest_created_ts(keyword) if store else None
+        tweets = await request_with_backoff(keyword, lambda: client.search_tweet(actual_query, sort_choice),
+                                            max_retries, scheduler)
+        pages = 1
+        new_tweets = []
+        skipped = 0
+        error = None
+
+        while True:
+            await human_pause(1.5, 5)
+
+            result_phrases = [
+                f"Found {len(tweets)} tweets for '{query}' (page {pages}).",
+                f"Search returned {len(tweets)} results for '{query}' (page {pages}).",
+                f"Got {len(tweets)} matching tweets for '{query}' (page {pages})."
+            ]
+            print(random.choice(result_phrases))
+            METRICS.inc('scrape_tweets_returned_total', len(tweets), keyword=keyword)
+
+            # Decide before saving: the page's tweets are about to become "known".
+            reached_known = should_stop_paging(tweets, keyword, sort_choice, store, newest_stored)
+
+            known_ids = store.known_ids(tweet.id for tweet in tweets) if store else set()
+            skipped += len(known_ids)
+            page_tweets = []
+            for tweet in tweets:
+                if random.random() < RANDOM_SKIP_RATE:
+                    continue
+                if tweet.id in known_ids:
+                    continue
+
+                tweet.keyword_searched = keyword
+                tweet_data = format_tweet_data(tweet)
+                await writer.write(tweet_data)
+                page_tweets.append(tweet_data)
                 
-            tweet.keyword_searched = keyword
-            append_to_jsonl(out_file, format_tweet_data(tweet))
-            
-            if random.random() < 0.2:
-                await asyncio.sleep(random.uniform(0.1, 0.3))
+                if random.random() < 0.2:
+                    await human_pause(0.1, 0.3)
+
+            if store and page_tweets:
+                store.add_tweets(page_tweets)
+            new_tweets.extend(page_tweets)
+
+            if reached_known:
+                print(f"[INFO] Reached tweets already stored for '{keyword}', not paging further.")
+                break
+            if not len(tweets) or not getattr(tweets, 'next_cursor', None):
+                break
+            if pages >= max_pages or time.monotonic() - started >= time_budget:
+                print(f"[INFO] Page budget for '{keyword}' used up after {pages} pages.")
+                break
+
+            await human_pause(2, 6)
+            try:
+                tweets = await request_with_backoff(keyword, tweets.next, max_retries, scheduler)
+            except Exception as e:
+                print(f"[WARN] Stopped paging '{keyword}' after {pages} pages: {type(e).__name__}: {e}")
+                error = e
+                break
+            pages += 1
+
+        if skipped:
+            print(f"[INFO] Skipped {skipped} tweets already in {store.path}.")
         
-        if tweets:
-            print(f"[SUCCESS] Saved tweets to {out_file}")
+        if new_tweets:
+            print(f"[SUCCESS] Queued {len(new_tweets)} new tweets for {writer.path}")
+        useful = sum(1 for t in new_tweets if calculate_score(t.text or '') >= SCORE_THRESHOLD)
+        METRICS.inc('scrape_requests_total', pages, keyword=keyword)
+        METRICS.inc('scrape_new_tweets_total', len(new_tweets), keyword=keyword)
+        METRICS.inc('scrape_skipped_known_total', skipped, keyword=keyword)
+        return {'requests': pages, 'new_tweets': len(new_tweets), 'useful_tweets': useful, 'error': error}
     except Exception as e:
-        print(f"[ERROR] An error occurred for keyword '{keyword}': {e}")
+        print(f"[ERROR] An error occurred for keyword '{query}': {e}")
         raise
 
-async def search_with_backoff(client, keyword, out_file, max_retries=3):
-    """Search with exponential backoff for rate limits."""
+def classify_error(e: Exception) -> str:
+    """
+    'rate_limit' for a 429, 'transient' for timeouts, server and network
+    errors (worth retrying soon), else 'fatal'.
+    """
+    # twikit (and its httpx) are already loaded whenever a live search fails.
+    import httpx
+    from twikit.errors import RequestTimeout, ServerError, TooManyRequests
+    if isinstance(e, TooManyRequests):
+        return 'rate_limit'
+    if isinstance(e, (RequestTimeout, ServerError, httpx.TransportError, TimeoutError, ConnectionError)):
+        return 'transient'
+    return 'fatal'
+
+def rate_limit_reset(e: Exception):
+    """The Unix time at which the rate limit that raised `e` resets, or None if the response didn't say."""
+    reset = getattr(e, 'rate_limit_reset', None)
+    if reset is None and getattr(e, 'headers', None):
+        reset = e.headers.get('x-rate-limit-reset')
+    try:
+        return float(reset) if reset is not None else None
+    except ValueError:
+        return None
+
+def backoff_wait(e: Exception, kind: str, retry: int) -> float:
+    """
+    Seconds to wait before retry number `retry`: until the rate limit's
+    reported reset (plus a margin for clock skew), else exponential backoff.
+    """
+    if kind == 'rate_limit':
+        reset = rate_limit_reset(e)
+        if reset is not None:
+            return min(max(0.0, reset - time.time()) + RATE_LIMIT_MARGIN, MAX_RATE_LIMIT_WAIT)
+        base_wait = RATE_LIMIT_BASE_WAIT
+    else:
+        base_wait = TRANSIENT_BASE_WAIT
+    return base_wait * (2 ** (retry - 1)) * (0.5 + random.random())
+
+async def request_with_backoff(keyword, request, max_retries=3, scheduler=None):
+    """
+    Awaits `request()` (one search request for `keyword`), retrying rate limits
+    (waiting until the reported reset), timeouts, server and network errors
+    up to `max_retries` times. Rate limits are reported to `scheduler`.
+    Raises the error if it is fatal or the retries run out.
+    """
     retry = 0
-    base_wait = 60
-    
-    while retry <= max_retries:
+
+    while True:
         try:
-            await search_by_keyword(client, keyword, out_file)
-            return
+            with METRICS.timer('scrape_request_seconds', keyword=keyword):
+                return await request()
         except Exception as e:
-            if "rate limit" in str(e).lower() or "429" in str(e):
-                retry += 1
-                if retry > max_retries:
-                    print(f"[ERROR] Max retries exceeded for '{keyword}'")
-                    return
-                
-                wait_time = base_wait * (2 ** (retry - 1)) * (0.5 + random.random())
-                print(f"[WARN] Rate limited. Waiting {wait_time:.1f}s before retry {retry}/{max_retries}")
-                await asyncio.sleep(wait_time)
+            kind = classify_error(e)
+            if kind == 'fatal' or retry >= max_retries:
+                raise
+
+            retry += 1
+            wait_time = backoff_wait(e, kind, retry)
+            if kind == 'rate_limit':
+                METRICS.inc('scrape_rate_limited_total')
+                if scheduler:
+                    scheduler.record_rate_limit(time.time() + wait_time)
+                until_reset = " until the limit resets" if rate_limit_reset(e) is not None else ""
+                print(f"[WARN] Rate limited. Waiting {wait_time:.1f}s{until_reset} before retry {retry}/{max_retries}")
             else:
-                print(f"[ERROR] Non-rate-limit error for '{keyword}': {e}")
-                return
+                print(f"[WARN] {type(e).__name__} for '{keyword}'. Waiting {wait_time:.1f}s before retry {retry}/{max_retries}")
+            METRICS.inc('scrape_retries_total', reason=kind)
+            METRICS.inc('scrape_backoff_seconds_total', round(wait_time, 3))
+            await pause(wait_time)
+
+def record_failed_search(keyword, e: Exception, scheduler=None, max_retries=3):
+    """
+    Logs and counts a search that failed with `e`, and queues `keyword` in
+    `scheduler` to be searched again. A rate limit also blocks every search
+    until it resets, since the block set by the earlier retries has expired.
+    """
+    kind = classify_error(e)
+    if kind == 'fatal':
+        print(f"[ERROR] Search for '{keyword}' failed: {type(e).__name__}: {e}")
+    else:
+        print(f"[ERROR] Max retries exceeded for '{keyword}'")
+    reason = kind if kind != 'fatal' else type(e).__name__
+    METRICS.inc('scrape_failed_searches_total', reason=reason)
+    if scheduler:
+        reset = rate_limit_reset(e) if kind == 'rate_limit' else None
+        if kind == 'rate_limit':
+            scheduler.record_rate_limit(reset or time.time() + backoff_wait(e, kind, max_retries))
+        scheduler.queue_retry(keyword, reason, not_before=reset)
+        print(f"[INFO] Queued '{keyword}' to be searched again in a later session.")
+
+async def search_with_backoff(client, keyword, writer, max_retries=3, store=None, scheduler=None, **search_options):
+    """
+    Searches `keyword` (see search_by_keyword for the options), retrying each
+    request on rate limits (waiting until the reported reset), timeouts,
+    server and network errors. Returns the search stats, or None if the first
+    request failed; if a later page failed, the stats of the pages before it.
+    The stats, complete or partial, are recorded in `scheduler`, rate limits
+    are reported to it, and a failed search is put in its retry queue under
+    `keyword` instead of being dropped.
+    """
+    try:
+        result = await search_by_keyword(client, keyword, writer, store, max_retries=max_retries,
+                                         scheduler=scheduler, **search_options)
+    except Exception as e:
+        record_failed_search(keyword, e, scheduler, max_retries)
+        return None
+
+    if scheduler:
+        scheduler.record(keyword, result['requests'], result['new_tweets'], result['useful_tweets'])
+    if result['error'] is not None:
+        record_failed_search(keyword, result['error'], scheduler, max_retries)
+    return result
 
 # ---------- MAIN EXECUTION ----------
-async def main():
-    parser = argparse.ArgumentParser(description="Automated Twitter scraper for security/dev info.")
-    parser.add_argument("--out", default=DEFAULT_OUT_FILE, help="Output JSONL file.")
-    args = parser.parse_args()
+async def run_session(client, writer, store, scheduler, args) -> int:
+    """One human-like session of scheduled keyword searches. Returns the number of new tweets."""
+    session = HumanSession()
 
-    # Clear previous raw tweets before starting a new run
-    if os.path.exists(args.out):
-        print(f"[INFO] Clearing previous raw tweets from {args.out}...")
-        os.remove(args.out)
+    session_keywords_count = random.randint(min(5, len(scheduler.keywords)), min(12, len(scheduler.keywords)))
+    session_keywords = scheduler.pick(session_keywords_count)
+    new_tweets = 0
+
+    print(f"[INFO] Starting session with {len(session_keywords)} keywords.")
+
+    for keyword in session_keywords:
+        if not session.should_continue():
+            print("[INFO] Session time limit reached, ending session.")
+            break
+
+        blocked_for = scheduler.wait_time()
+        if blocked_for:
+            print(f"[WARN] Rate limit still active. Waiting {blocked_for:.1f}s before searching again...")
+            await pause(blocked_for)
+
+        search_term = generate_search_variations(keyword)
+
+        result = await search_with_backoff(
+            client, keyword, writer, store=store, scheduler=scheduler, query=search_term,
+            max_pages=args.max_pages, time_budget=args.page_time_budget,
+        )
+        if result:
+            new_tweets += result['new_tweets']
+
+        if session.should_take_break():
+            break_duration = session.get_break_duration()
+            print(f"[INFO] Taking a short break for {break_duration:.1f} seconds...")
+            await pause(break_duration)
+        else:
+            delay = session.get_next_delay()
+            print(f"[INFO] Waiting {delay:.1f} seconds before next search...")
+            await pause(delay)
+    return new_tweets
+
+async def run_sessions(client, writer, store, scheduler, args):
+    """Live scraping: human-like sessions of scheduled keyword searches with breaks in between."""
+    while True:
+        await run_session(client, writer, store, scheduler, args)
+
+        if random.random() < 0.3:
+            print("[INFO] Ending scraping for now.")
+            return
+        
+        session_break = random.uniform(1800, 3600)
+        print(f"[INFO] Session completed. Taking a long break ({session_break/60:.1f} minutes).")
+        await pause(session_break)
+
+async def run_replay(client: ReplayClient, writer, store, args) -> int:
+    """
+    Feeds every recorded search back through search_with_backoff, in recorded
+    order, storing its tweets under the keyword the recorded query was a
+    variation of. Returns the new tweets.
+    """
+    print(f"[INFO] Replaying {len(client.recorded)} recorded searches from '{args.replay}'.")
+    started = time.perf_counter()
+    new_tweets = 0
+    for query, product in client.recorded:
+        result = await search_with_backoff(
+            client, base_keyword(query), writer, store=store, product=product, query=query,
+            max_pages=args.max_pages, time_budget=args.page_time_budget,
+        )
+        if result:
+            new_tweets += result['new_tweets']
+    elapsed = time.perf_counter() - started
+    print(f"[SUCCESS] Replayed {len(client.recorded)} searches ({new_tweets} new tweets) in {elapsed:.2f}s.")
+    return new_tweets
+
+def make_client(args):
+    """
+    The search client for this run: a ReplayClient for --replay (pauses and
+    random skips off), otherwise a logged-in twikit Client, wrapped in a
+    RecordingClient for --record. Returns None if login fails.
+    """
+    if args.replay:
+        global PAUSES_ENABLED, RANDOM_SKIP_RATE
+        PAUSES_ENABLED = False
+        RANDOM_SKIP_RATE = 0.0
+        return ReplayClient(args.replay)
 
     if not create_temp_cookie_file():
         print("[ERROR] .env file not found or is missing tokens. Run 'make setup' first.")
-        return
+        return None
 
+    from twikit import Client
     client = Client('en-US', user_agent=random.choice(USER_AGENTS))
     try:
-        print(f"[INFO] Loading session from temporary cookie file...")
+        print("[INFO] Loading session from temporary cookie file...")
         client.load_cookies(TEMP_COOKIE_FILE)
         print("[INFO] Login successful.")
     except Exception as e:
         print(f"[ERROR] Failed to log in with cookies. Error: {e}")
+        return None
+    if args.record:
+        client = RecordingClient(client, args.record)
+        print(f"[INFO] Recording raw search results to '{args.record}'.")
+    return client
+
+def add_scrape_arguments(parser):
+    """The scraper options, shared with the fused pipeline (pipeline.py)."""
+    parser.add_argument("--out", default=DEFAULT_OUT_FILE, help="Output JSONL file.")
+    parser.add_argument("--archive", metavar="DIR", default=None, help="Write raw tweets into gzip-compressed, time-bucketed segments in DIR instead of --out. The archive is kept across runs.")
+    parser.add_argument("--archive-bucket", type=float, default=DEFAULT_BUCKET_SECONDS / 60, metavar="MINUTES", help="Start a new archive segment every this many minutes.")
+    parser.add_argument("--store", default=None, help="Persistent tweet store (e.g. tweets.db). Tweets already stored are skipped.")
+    parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES, help="Maximum result pages to follow per keyword search.")
+    parser.add_argument("--page-time-budget", type=float, default=DEFAULT_PAGE_TIME_BUDGET, help="Stop following result pages for a keyword after this many seconds.")
+    parser.add_argument("--flush-every", type=int, default=100, help="Write raw tweets to disk once this many are queued.")
+    parser.add_argument("--flush-ms", type=int, default=500, help="Write queued raw tweets at least this often (milliseconds).")
+    parser.add_argument("--fsync", action="store_true", help="fsync the raw output after every written batch.")
+    parser.add_argument("--keyword-stats", default=DEFAULT_STATS_FILE, help="Per-keyword yield statistics used to choose which keywords to search.")
+    parser.add_argument("--explore", type=float, default=1.0, help="How strongly the scheduler favours rarely searched keywords over proven ones.")
+    capture = parser.add_mutually_exclusive_group()
+    capture.add_argument("--record", metavar="DIR", default=None, help="Also save every raw search result page to DIR (one JSONL file per query).")
+    capture.add_argument("--replay", metavar="DIR", default=None, help="Re-run the searches recorded in DIR offline, with no pauses or random skips.")
+
+def make_raw_writer(args):
+    """The raw tweet sink (not started yet): archive segments with --archive, else the --out file."""
+    options = dict(flush_every=args.flush_every, flush_interval=args.flush_ms / 1000, fsync=args.fsync)
+    if args.archive:
+        return AsyncArchiveWriter(args.archive, bucket_seconds=int(args.archive_bucket * 60), **options)
+    return AsyncJsonlWriter(args.out, **options)
+
+async def main():
+    parser = argparse.ArgumentParser(description="Automated Twitter scraper for security/dev info.")
+    add_scrape_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args)
+
+    # Clear previous raw tweets before starting a new run (the archive is kept)
+    if not args.archive and os.path.exists(args.out):
+        print(f"[INFO] Clearing previous raw tweets from {args.out}...")
+        os.remove(args.out)
+
+    client = make_client(args)
+    if client is None:
         return
 
+    store = TweetStore(args.store) if args.store else None
+    scheduler = KeywordScheduler(KEYWORDS, stats_path=args.keyword_stats, exploration=args.explore)
+    writer = await make_raw_writer(args).start()
+
     try:
-        while True:
-            session = HumanSession()
-            
-            session_keywords_count = random.randint(5, min(12, len(KEYWORDS)))
-            session_keywords = random.sample(KEYWORDS, session_keywords_count)
-            
-            print(f"[INFO] Starting session with {len(session_keywords)} keywords.")
-            
-            for keyword in session_keywords:
-                if not session.should_continue():
-                    print("[INFO] Session time limit reached, ending session.")
-                    break
-                
-                search_term = generate_search_variations(keyword)
-                
-                await search_with_backoff(client, search_term, args.out)
-                
-                if session.should_take_break():
-                    break_duration = session.get_break_duration()
-                    print(f"[INFO] Taking a short break for {break_duration:.1f} seconds...")
-                    await asyncio.sleep(break_duration)
-                else:
-                    delay = session.get_next_delay()
-                    print(f"[INFO] Waiting {delay:.1f} seconds before next search...")
-                    await asyncio.sleep(delay)
-            
-            if random.random() < 0.3:
-                print("[INFO] Ending scraping for now.")
-                break
-            
-            session_break = random.uniform(1800, 3600)
-            print(f"[INFO] Session completed. Taking a long break ({session_break/60:.1f} minutes).")
-            await asyncio.sleep(session_break)
+        with profile_stage('scrape'):
+            if args.replay:
+                await run_replay(client, writer, store, args)
+            else:
+                await run_sessions(client, writer, store, scheduler, args)
     except KeyboardInterrupt:
         print("\n[INFO] Script interrupted by user. Shutting down gracefully...")
     except Exception as e:
         print(f"\n[FATAL] An unexpected error occurred: {e}")
     finally:
+        await writer.close()
+        stats = writer.stats()
+        print(f"[INFO] Raw writer: {stats['records_written']} tweets in {stats['batches_written']} batches, "
+              f"max queue depth {stats['max_queue_depth']}, "
+              f"write latency avg {stats['avg_write_ms']:.2f}ms / max {stats['max_write_ms']:.2f}ms.")
+        METRICS.set('writer_max_queue_depth', stats['max_queue_depth'])
+        METRICS.set('writer_max_write_ms', stats['max_write_ms'])
+        if store:
+            store.close()
+        for keyword, useful_rate, new_rate, requests in scheduler.summary(5):
+            print(f"[INFO] Keyword '{keyword}': {useful_rate:.1f} useful / {new_rate:.1f} new tweets per request ({requests} requests).")
+        export_metrics(args, 'scrape')
         print("\n[INFO] All scraping sessions complete.")
 
 if __name__ == "__main__":
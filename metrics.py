@@ -0,0 +1,260 @@
+"""
+Lightweight metrics and profiling hooks shared by the pipeline stages.
+
+`METRICS` is a process-wide registry of counters, gauges and histograms,
+each optionally labelled (e.g. per keyword). It is thread-safe and has no
+dependencies. At the end of a run it can be written as a Prometheus textfile
+(for node_exporter's textfile collector) and/or as a JSON run report.
+
+Profiling is off by default. `profile_stage(name)` and `@profiled(name)`
+then cost a single flag check; with `--profile DIR` each named stage is run
+under cProfile and its stats are written to DIR/<stage>.pstats.
+"""
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+PREFIX = "xscout_"
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SCORE_BUCKETS = (-50, 0, 2, 4, 6, 8, 10, 15, 20, 30, 50)
+SIZE_BUCKETS = (1_000, 5_000, 20_000, 50_000, 100_000, 250_000, 500_000, 1_000_000)
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value) -> str:
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value: float, occurrences: int = 1):
+        i = 0
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                break
+        else:
+            i = len(self.buckets)
+        self.counts[i] += occurrences
+        self.count += occurrences
+        self.sum += value * occurrences
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count, 'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else None,
+            'min': self.min, 'max': self.max,
+            'buckets': {str(b): c for b, c in zip(self.buckets + ('+Inf',), self.counts)},
+        }
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        with self._lock:
+            self.gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name: str, value: float, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def observe_counts(self, name: str, counts: dict, buckets=SCORE_BUCKETS, **labels):
+        """Adds a {value: occurrences} tally to a histogram in one call."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            for value, occurrences in counts.items():
+                histogram.observe(value, occurrences)
+
+    @contextlib.contextmanager
+    def timer(self, name: str, buckets=LATENCY_BUCKETS, **labels):
+        """Observes the duration of the `with` block in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, buckets, **labels)
+
+    def value(self, name: str, **labels):
+        """Current counter or gauge value (0 if never set)."""
+        key = (name, _label_key(labels))
+        return self.counters.get(key, self.gauges.get(key, 0))
+
+    # --- Export ---
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, key), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+                        typed.add(name)
+                    lines.append(f"{PREFIX}{name}{_format_labels(key)} {_format_value(value)}")
+            typed = set()
+            for (name, key), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_format_labels(key, (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                lines.append(f"{PREFIX}{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def report(self) -> dict:
+        def series(items, convert=lambda v: v):
+            grouped = {}
+            for (name, key), value in sorted(items):
+                grouped.setdefault(name, []).append({'labels': dict(key), 'value': convert(value)})
+            return grouped
+
+        with self._lock:
+            return {
+                'started': self.started,
+                'duration_seconds': round(time.time() - self.started, 3),
+                'counters': series(self.counters.items()),
+                'gauges': series(self.gauges.items()),
+                'histograms': series(self.histograms.items(), Histogram.to_dict),
+            }
+
+METRICS = Metrics()
+
+# --- Profiling hooks ---
+
+_profile_dir = None
+_profilers = {}
+# cProfile allows one active profiler per process, so nested stages are
+# attributed to the outermost one.
+_active_stage = None
+_profile_lock = threading.Lock()
+
+def enable_profiling(directory: str):
+    global _profile_dir
+    os.makedirs(directory, exist_ok=True)
+    _profile_dir = directory
+
+def profile_stage(name: str):
+    """Context manager running the block under cProfile when profiling is on, else a no-op."""
+    if _profile_dir is None:
+        return contextlib.nullcontext()
+    return _profiled_block(name)
+
+@contextlib.contextmanager
+def _profiled_block(name):
+    global _active_stage
+    import cProfile
+    with _profile_lock:
+        if _active_stage is not None:
+            profiler = None
+        else:
+            _active_stage = name
+            profiler = _profilers.setdefault(name, cProfile.Profile())
+            profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _active_stage = None
+
+def profiled(name: str):
+    """
+    Decorator form of profile_stage for plain and async functions. For a
+    coroutine the profile also covers other tasks running while it awaits.
+    """
+    import inspect
+
+    def decorate(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with profile_stage(name):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _profile_dir is None:
+                return fn(*args, **kwargs)
+            with _profiled_block(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def write_profiles():
+    for name, profiler in _profilers.items():
+        path = os.path.join(_profile_dir, f"{name}.pstats")
+        profiler.dump_stats(path)
+        print(f"[INFO] Profile for '{name}' saved to '{path}' (view with: python -m pstats {path}).")
+
+# --- CLI integration ---
+
+def add_metrics_arguments(parser):
+    parser.add_argument("--metrics-file", default=None, help="Write metrics in Prometheus textfile format to this path at the end of the run.")
+    parser.add_argument("--report", default=None, help="Write a JSON run report with all metrics to this path.")
+    parser.add_argument("--profile", default=None, metavar="DIR", help="Profile the main stages with cProfile and save .pstats files to DIR.")
+
+def configure(args):
+    if getattr(args, 'profile', None):
+        enable_profiling(args.profile)
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def export(args, stage: str):
+    """Writes the outputs requested on the command line."""
+    METRICS.set('run_duration_seconds', round(time.time() - METRICS.started, 3), stage=stage)
+    METRICS.set('run_finished_timestamp_seconds', int(time.time()), stage=stage)
+    if getattr(args, 'metrics_file', None):
+        _write_atomic(args.metrics_file, METRICS.to_prometheus())
+        print(f"[INFO] Metrics written to '{args.metrics_file}'.")
+    if getattr(args, 'report', None):
+        report = METRICS.report()
+        report['stage'] = stage
+        _write_atomic(args.report, json.dumps(report, indent=2))
+        print(f"[INFO] Run report written to '{args.report}'.")
+    if _profile_dir is not None:
+        write_profiles()
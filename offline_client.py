@@ -0,0 +1,296 @@
+"""
+Offline stand-ins for twikit, used by the benchmarks and record/replay.
+
+`synthetic_tweet` produces tweet dicts shaped like `main.format_tweet_data`
+output, with a tunable density of scoring-dictionary keywords. `FakeClient`
+implements the part of `twikit.Client` the scraper uses (`search_tweet` and
+result paging via `next()`), serving deterministic synthetic tweets with no
+network access, and can simulate rate limits.
+
+`RecordingClient` wraps a real client and saves every result page it returns
+to one JSONL file per query. `ReplayClient` serves those pages back, so a
+captured scrape can be rerun through the same code path without network
+access or pauses.
+"""
+import glob
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+
+from filter_tweets import USEFUL_KEYWORDS, NOISE_KEYWORDS
+
+# Common English words make up the body of every synthetic tweet.
+FILLER_WORDS = (
+    "the of and to in is you that it was for on are as with they at be this have from or one had by "
+    "but not what all were we when your can said there use each which she do how their if will up other "
+    "about out many then them these so some would make like into time has look two more write see number "
+    "way could people than first been who now find long down day did get come made may part today just"
+).split()
+HASHTAGS = ["#infosec", "#web3", "#crypto", "#security", "#defi", "#bugbounty", "#ethereum", "#solana"]
+EMOJI = ["🚨", "🔥", "🚀", "⚠️", "👀", "💰"]
+TWIKIT_TIME_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+_USEFUL_TERMS = list(USEFUL_KEYWORDS)
+_NOISE_TERMS = list(NOISE_KEYWORDS)
+
+
+def synthetic_text(rng: random.Random, keyword_density: float = 1.0, noise_ratio: float = 0.3) -> str:
+    """
+    A tweet-like text of 8-40 filler words with on average `keyword_density`
+    dictionary terms mixed in, `noise_ratio` of them from the noise dictionary.
+    """
+    words = rng.choices(FILLER_WORDS, k=rng.randint(8, 40))
+    terms = 0
+    # Poisson-ish number of terms with the requested mean.
+    while rng.random() < keyword_density / (keyword_density + 1):
+        terms += 1
+    for _ in range(terms):
+        pool = _NOISE_TERMS if rng.random() < noise_ratio else _USEFUL_TERMS
+        words.insert(rng.randrange(len(words) + 1), rng.choice(pool))
+    if rng.random() < 0.3:
+        words.append(rng.choice(HASHTAGS))
+    if rng.random() < 0.2:
+        words.insert(0, rng.choice(EMOJI))
+    if rng.random() < 0.5:
+        words.append(f"https://t.co/{rng.getrandbits(40):x}")
+    text = ' '.join(words)
+    return text[0].upper() + text[1:]
+
+
+def vary_text(rng: random.Random, text: str) -> str:
+    """A copy of `text` that only differs in case, spacing or punctuation (an exact duplicate for the filter)."""
+    choice = rng.randrange(3)
+    if choice == 0:
+        return text.upper()
+    if choice == 1:
+        return text.replace(' ', '  ', 1) + '!!'
+    return text
+
+
+def synthetic_tweet(rng: random.Random, tweet_id: int, created_ts: float, keyword: str = None,
+                    text: str = None, keyword_density: float = 1.0) -> dict:
+    user_id = rng.randrange(1, 50_000)
+    return {
+        'id': str(tweet_id),
+        'text': text if text is not None else synthetic_text(rng, keyword_density),
+        'created_at': datetime.fromtimestamp(created_ts, timezone.utc).strftime(TWIKIT_TIME_FORMAT),
+        'user_id': str(user_id),
+        'user_name': f"User {user_id}",
+        'user_screen_name': f"user{user_id}",
+        'retweet_count': int(rng.expovariate(0.2)),
+        'favorite_count': int(rng.expovariate(0.05)),
+        'lang': 'en',
+        'keyword_searched': keyword,
+    }
+
+
+def synthetic_corpus(lines: int, dup_rate: float = 0.1, keyword_density: float = 1.0, seed: int = 0,
+                     keywords=("web3 security", "defi exploit", "bug bounty")):
+    """Yields `lines` tweet dicts, a `dup_rate` fraction of them repeating an earlier text."""
+    rng = random.Random(seed)
+    recent = []
+    now = time.time()
+    for i in range(lines):
+        if recent and rng.random() < dup_rate:
+            text = vary_text(rng, rng.choice(recent))
+        else:
+            text = synthetic_text(rng, keyword_density)
+            if len(recent) < 10_000:
+                recent.append(text)
+            else:
+                recent[rng.randrange(len(recent))] = text
+        yield synthetic_tweet(rng, 10**15 + i, now - (lines - i), rng.choice(keywords), text)
+
+
+# ---------- twikit stand-ins ----------
+class FakeUser:
+    def __init__(self, data: dict):
+        self.id = data['user_id']
+        self.name = data['user_name']
+        self.screen_name = data['user_screen_name']
+
+
+class FakeTweet:
+    """The attributes of `twikit.Tweet` that `format_tweet_data` reads."""
+
+    def __init__(self, data: dict):
+        self.id = data['id']
+        self.text = data['text']
+        self.full_text = data['text']
+        self.created_at = data['created_at']
+        self.user = FakeUser(data)
+        self.retweet_count = data['retweet_count']
+        self.favorite_count = data['favorite_count']
+        self.lang = data['lang']
+
+
+class FakeResult(list):
+    """A page of search results; `await result.next()` fetches the following page."""
+
+    def __init__(self, tweets, fetch_next=None, next_cursor=None):
+        super().__init__(tweets)
+        self.next_cursor = next_cursor
+        self._fetch_next = fetch_next
+
+    async def next(self):
+        if self._fetch_next is None:
+            return FakeResult([])
+        return await self._fetch_next()
+
+
+class FakeClient:
+    """
+    Serves synthetic search results. Every query has its own timeline: each
+    search reveals `new_per_search` tweets newer than the last search, and
+    pages walk back through older tweets, so repeated searches overlap like
+    live ones. Every `rate_limit_every`-th request raises TooManyRequests,
+    reporting a reset `rate_limit_reset` seconds later.
+    """
+
+    def __init__(self, page_size: int = 20, new_per_search: int = 40, timeline_length: int = 400,
+                 keyword_density: float = 1.0, rate_limit_every: int = None, rate_limit_reset: float = 60,
+                 seed: int = 0):
+        self.page_size = page_size
+        self.new_per_search = new_per_search
+        self.timeline_length = timeline_length
+        self.keyword_density = keyword_density
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_reset = rate_limit_reset
+        self.seed = seed
+        self.requests = 0
+        self._heads = {}
+        self._started = time.time()
+
+    def _tweet(self, query: str, position: int) -> FakeTweet:
+        base = int.from_bytes(hashlib.blake2b(query.encode('utf-8'), digest_size=4).digest()) * 10**7
+        rng = random.Random(f"{self.seed}:{query}:{position}")
+        return FakeTweet(synthetic_tweet(rng, base + position, self._started + position,
+                                         keyword_density=self.keyword_density))
+
+    def _count_request(self):
+        self.requests += 1
+        if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+            from twikit.errors import TooManyRequests
+            reset = int(time.time() + self.rate_limit_reset)
+            raise TooManyRequests("Rate limit exceeded (429)", headers={
+                'x-rate-limit-limit': str(self.rate_limit_every), 'x-rate-limit-remaining': '0',
+                'x-rate-limit-reset': str(reset),
+            })
+
+    def _page(self, query: str, newest: int):
+        oldest = max(0, newest - self.page_size)
+        tweets = [self._tweet(query, position) for position in range(newest - 1, oldest - 1, -1)]
+
+        async def fetch_next():
+            self._count_request()
+            return self._page(query, oldest)
+
+        return FakeResult(tweets, fetch_next, next_cursor=str(oldest) if oldest else None)
+
+    async def search_tweet(self, query: str, product: str, count: int = 20, cursor: str = None):
+        self._count_request()
+        head = self._heads.get(query, self.timeline_length - self.new_per_search) + self.new_per_search
+        self._heads[query] = head
+        return self._page(query, head)
+
+
+# ---------- Record / replay ----------
+def tweet_snapshot(tweet) -> dict:
+    """The fields the scraper reads from a twikit Tweet, plus its raw API payload when available."""
+    return {
+        'id': tweet.id,
+        'text': tweet.full_text if getattr(tweet, 'full_text', None) else tweet.text,
+        'created_at': tweet.created_at,
+        'user_id': tweet.user.id,
+        'user_name': tweet.user.name,
+        'user_screen_name': tweet.user.screen_name,
+        'retweet_count': tweet.retweet_count,
+        'favorite_count': tweet.favorite_count,
+        'lang': tweet.lang,
+        'raw': getattr(tweet, '_data', None),
+    }
+
+
+def recording_file(directory: str, query: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '-', query.lower()).strip('-')[:60] or 'query'
+    digest = hashlib.blake2b(query.encode('utf-8'), digest_size=4).hexdigest()
+    return os.path.join(directory, f"{slug}-{digest}.jsonl")
+
+
+class RecordingClient:
+    """Passes searches through to `client` and appends every result page to `directory`."""
+
+    def __init__(self, client, directory: str):
+        self.client = client
+        self.directory = directory
+        self.searches = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _record(self, search_id: str, page: int, query: str, product: str, result):
+        entry = {
+            'search': search_id, 'page': page, 'query': query, 'product': product,
+            'recorded_at': time.time(), 'next_cursor': getattr(result, 'next_cursor', None),
+            'tweets': [tweet_snapshot(tweet) for tweet in result],
+        }
+        with open(recording_file(self.directory, query), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def _wrap(self, result, search_id: str, page: int, query: str, product: str):
+        self._record(search_id, page, query, product, result)
+
+        async def fetch_next():
+            return self._wrap(await result.next(), search_id, page + 1, query, product)
+
+        return FakeResult(list(result), fetch_next, next_cursor=getattr(result, 'next_cursor', None))
+
+    async def search_tweet(self, query: str, product: str, count: int = 20, cursor: str = None):
+        result = await self.client.search_tweet(query, product, count=count, cursor=cursor)
+        self.searches += 1
+        search_id = f"{int(time.time() * 1000)}-{self.searches}"
+        return self._wrap(result, search_id, 1, query, product)
+
+
+class ReplayClient:
+    """
+    Serves recorded searches. Each `search_tweet(query)` call returns the next
+    unreplayed recording of that query (page by page via `next()`), or an
+    empty result once they are used up.
+    """
+
+    def __init__(self, directory: str):
+        searches = {}
+        for path in sorted(glob.glob(os.path.join(directory, '*.jsonl'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        searches.setdefault(entry['search'], []).append(entry)
+        ordered = sorted(searches.values(), key=lambda pages: pages[0]['recorded_at'])
+        self._pending = {}
+        for pages in ordered:
+            pages.sort(key=lambda entry: entry['page'])
+            self._pending.setdefault(pages[0]['query'], []).append(pages)
+        self.recorded = [(pages[0]['query'], pages[0]['product']) for pages in ordered]
+        self.requests = 0
+
+    def _page(self, pages, index: int):
+        if index >= len(pages):
+            return FakeResult([])
+        entry = pages[index]
+
+        async def fetch_next():
+            self.requests += 1
+            return self._page(pages, index + 1)
+
+        return FakeResult([FakeTweet(tweet) for tweet in entry['tweets']], fetch_next, entry['next_cursor'])
+
+    async def search_tweet(self, query: str, product: str, count: int = 20, cursor: str = None):
+        self.requests += 1
+        pending = self._pending.get(query)
+        if not pending:
+            return FakeResult([])
+        return self._page(pending.pop(0), 0)
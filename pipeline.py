@@ -0,0 +1,317 @@
+"""
+Fused scrape -> filter -> summarize pipeline in a single process.
+
+Instead of three processes handing JSONL files to each other, tweets flow
+through in-memory asyncio stages connected by bounded queues:
+
+  search_by_keyword (format) -> filter stage (score, dedup) -> sinks
+
+The scraper formats every tweet and hands it to the pipeline, which appends
+it to the raw JSONL and queues it for the filter stage. Kept tweets are
+appended to the filtered JSONL within `--flush-ms`, so `serve.py` (which
+re-indexes the file when it changes) shows them while the scrape is still
+running. The summary is rebuilt in a worker thread every `--summary-every`
+kept tweets or `--summary-interval` seconds, whichever comes first, and once
+more at shutdown. Thanks to the summary cache only the chunks with new
+tweets are sent to the model again.
+
+With --store the filter stage works on the store like `filter_tweets.py
+--store` and `summarizer.py --store`: each tweet's score is recorded in its
+row, tweets the store already kept count as duplicates, and the 'filter' and
+'summarizer' checkpoints advance as tweets are filtered and summarized. Rows
+no filter has processed yet are filtered before scraping starts.
+
+    uv run pipeline.py --store tweets.db
+    uv run pipeline.py --replay captures/ --backend stub --summary-every 100
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import main as scraper
+import summarizer
+from filter_tweets import SCORE_THRESHOLD, filter_stored_tweet, make_dedup_index, record_metrics, score_tweet
+from jsonl_writer import AsyncJsonlWriter
+from keyword_scheduler import KeywordScheduler
+from metrics import METRICS, add_metrics_arguments, configure as configure_metrics, export as export_metrics, profile_stage
+from tweet_store import TweetStore
+
+DEFAULT_FILTERED_FILE = "filtered_tweets.jsonl"
+DEFAULT_SUMMARY_FILE = "summary.txt"
+DEFAULT_SUMMARY_EVERY = 200
+DEFAULT_SUMMARY_INTERVAL = 1800  # seconds
+_CLOSE = object()
+
+
+class SummaryRefresher:
+    """
+    Rebuilds the summary of every tweet kept so far. `add()` collects kept
+    tweets; a background task summarizes them once `every` new tweets are
+    pending or `interval` seconds have passed with at least one pending.
+    Triggers that arrive while a summary is running are coalesced into one.
+    With a `store`, a saved summary advances its 'summarizer' checkpoint to
+    the 'filter' checkpoint at the time the summary started.
+    """
+
+    def __init__(self, args, out_path: str, every: int, interval: float, store: TweetStore = None):
+        self.args = args
+        self.store = store
+        self.out_path = out_path
+        self.every = max(1, every)
+        self.interval = interval
+        self.tweets = []
+        self.summarized = 0  # tweets in the last saved summary
+        self.attempted = 0   # tweets in the last attempt, saved or not
+        self.summaries = 0
+        self._backend = summarizer.make_backend(args)
+        self._cache = summarizer.make_cache(args)
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._task = None
+
+    def start(self):
+        if self._backend is None:
+            print("[WARN] No summarizer backend available, the pipeline will only scrape and filter.")
+            return self
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    def add(self, tweet: dict):
+        self.tweets.append(tweet)
+        # Counted from the last attempt, so a failing model is retried after
+        # `every` more tweets (or the interval) rather than on every tweet.
+        if len(self.tweets) - self.attempted >= self.every:
+            self._wake.set()
+
+    async def close(self):
+        """Writes a final summary if tweets were kept since the last one."""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wake.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if len(self.tweets) > self.summarized:
+                await self._refresh()
+            # On close, loop once more if tweets arrived during the last refresh.
+            if self._closing and len(self.tweets) == self.attempted:
+                return
+
+    async def _refresh(self):
+        tweets = list(self.tweets)
+        self.attempted = len(tweets)
+        filtered_until = self.store.checkpoint('filter') if self.store else None
+        print(f"[INFO] Refreshing the summary with {len(tweets)} kept tweets...")
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._summarize, tweets)
+        except Exception as e:
+            # Keep the previous summary; the tweets are picked up by the next refresh.
+            print(f"[ERROR] Failed to refresh the summary: {e}")
+            METRICS.inc('pipeline_summary_failures_total')
+            return
+        self.summarized = len(tweets)
+        self.summaries += 1
+        if self.store:
+            with self.store.conn:
+                self.store.set_checkpoint('summarizer', filtered_until)
+        METRICS.inc('pipeline_summaries_total')
+        METRICS.observe('pipeline_summary_seconds', time.perf_counter() - started)
+        print(f"[SUCCESS] Summary of {len(tweets)} tweets saved to '{self.out_path}'.")
+
+    def _summarize(self, tweets):
+        texts = summarizer.prompt_texts(tweets, self.args)
+        summary = summarizer.summarize_texts(texts, self._backend, self.args.chunk_tokens,
+                                             self.args.concurrency, self._cache)
+        tmp_path = self.out_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f_out:
+            f_out.write(summary)
+        # Atomic, so the viewer never reads a half-written summary.
+        os.replace(tmp_path, self.out_path)
+
+
+class StreamingPipeline:
+    """
+    Takes the place of the scraper's raw writer (`await pipeline.write(tweet)`).
+    Every tweet is appended to `raw_writer` and queued for the filter stage,
+    which scores it, drops it if it is below `min_score` or a duplicate of a
+    kept tweet, and passes kept tweets to `filtered_writer` and `refresher`.
+    With a `store`, results and the 'filter' checkpoint are recorded there.
+    """
+
+    def __init__(self, raw_writer: AsyncJsonlWriter, filtered_writer: AsyncJsonlWriter, dedup_index,
+                 refresher: SummaryRefresher = None, min_score: int = SCORE_THRESHOLD, max_queue: int = 10_000,
+                 store: TweetStore = None):
+        self.path = raw_writer.path
+        self.raw_writer = raw_writer
+        self.filtered_writer = filtered_writer
+        self.seen = dedup_index
+        self.refresher = refresher
+        self.min_score = min_score
+        self.store = store
+        self.received = 0
+        self.kept = 0
+        self.caught_up = 0
+        self._filtered_seq = store.checkpoint('filter') if store else 0
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._filter_stage())
+        return self
+
+    async def write(self, tweet: dict):
+        await self.raw_writer.write(tweet)
+        await self._queue.put(tweet)
+
+    async def close(self):
+        """Drains the filter stage. The writers and refresher are closed by their owner."""
+        if self._task is None:
+            return
+        await self._queue.put(_CLOSE)
+        await self._task
+        self._task = None
+
+    async def catch_up(self):
+        """
+        With a store, queues the kept tweets not summarized yet for the summary
+        and filters the rows no filter has processed yet. Call it before
+        scraping starts.
+        """
+        if self.store is None:
+            return
+        if self.refresher:
+            for _, tweet in self.store.iter_kept(self.store.checkpoint('summarizer'), self._filtered_seq):
+                self.refresher.add(tweet)
+        with self.store.conn:
+            for seq, tweet in self.store.iter_since(self._filtered_seq):
+                self.caught_up += 1
+                kept = self._filter_stored(seq, tweet)
+                if kept is not None:
+                    await self._keep(kept)
+        if self.caught_up:
+            print(f"[INFO] Filtered {self.caught_up} tweets left in '{self.store.path}' by earlier runs.")
+
+    def _filter_stored(self, seq, tweet):
+        """Scores a store row and advances the checkpoint. Returns the kept copy or None. The caller commits."""
+        result = filter_stored_tweet(self.store, seq, tweet, self.min_score, self.seen)
+        if seq > self._filtered_seq:
+            self._filtered_seq = seq
+            self.store.set_checkpoint('filter', seq)
+        if result is None:
+            return None
+        normalized_text, score = result
+        self.seen.add(normalized_text)
+        return tweet.replace(filter_score=score)
+
+    def _filter_new(self, tweet):
+        """Scores a tweet from the scraper. Returns the kept copy or None."""
+        if self.store is None:
+            result = score_tweet(tweet, self.min_score, self.seen)
+            if result is None:
+                return None
+            normalized_text, score = result
+            self.seen.add(normalized_text)
+            # The raw writer still holds `tweet`, so the kept copy gets the score.
+            return tweet.replace(filter_score=score)
+        seq = self.store.seq_of(tweet.get('id'))
+        if seq is None:
+            # The scraper stores a page only after queueing all of its tweets.
+            self.store.add_tweets([tweet])
+            seq = self.store.seq_of(tweet.get('id'))
+        with self.store.conn:
+            return self._filter_stored(seq, tweet)
+
+    async def _keep(self, kept):
+        self.kept += 1
+        # Before the write yields, so a summary started meanwhile has every
+        # tweet up to the filter checkpoint.
+        if self.refresher:
+            self.refresher.add(kept)
+        await self.filtered_writer.write(kept)
+
+    async def _filter_stage(self):
+        while True:
+            tweet = await self._queue.get()
+            if tweet is _CLOSE:
+                return
+            self.received += 1
+            kept = self._filter_new(tweet)
+            if kept is not None:
+                await self._keep(kept)
+
+
+async def run(args):
+    client = scraper.make_client(args)
+    if client is None:
+        return
+
+    for path in ([args.out] if not args.archive else []) + [args.filtered_out]:
+        if os.path.exists(path):
+            print(f"[INFO] Clearing previous tweets from {path}...")
+            os.remove(path)
+
+    store = TweetStore(args.store) if args.store else None
+    scheduler = KeywordScheduler(scraper.KEYWORDS, stats_path=args.keyword_stats, exploration=args.explore)
+    raw_writer = await scraper.make_raw_writer(args).start()
+    filtered_writer = await AsyncJsonlWriter(args.filtered_out, flush_every=args.flush_every,
+                                             flush_interval=args.flush_ms / 1000, fsync=args.fsync).start()
+    refresher = SummaryRefresher(args, args.summary_out, args.summary_every, args.summary_interval, store).start()
+    pipeline = StreamingPipeline(raw_writer, filtered_writer, make_dedup_index(args, streaming=True),
+                                 refresher, args.min_score, store=store).start()
+
+    started = time.perf_counter()
+    try:
+        with profile_stage('pipeline'):
+            await pipeline.catch_up()
+            if args.replay:
+                await scraper.run_replay(client, pipeline, store, args)
+            else:
+                await scraper.run_sessions(client, pipeline, store, scheduler, args)
+    except KeyboardInterrupt:
+        print("\n[INFO] Pipeline interrupted by user. Shutting down gracefully...")
+    except Exception as e:
+        print(f"\n[FATAL] An unexpected error occurred: {e}")
+    finally:
+        await pipeline.close()
+        await refresher.close()
+        await raw_writer.close()
+        await filtered_writer.close()
+        if store:
+            store.close()
+        elapsed = time.perf_counter() - started
+        record_metrics('pipeline', pipeline.received + pipeline.caught_up, pipeline.kept, args.min_score, elapsed)
+        print("\n--- Pipeline Complete ---")
+        print(f"Scraped:   {pipeline.received} new tweets -> '{args.archive or args.out}'")
+        print(f"Kept:      {pipeline.kept} unique, high-value tweets -> '{args.filtered_out}'")
+        print(f"Summaries: {refresher.summaries} -> '{args.summary_out}'")
+        export_metrics(args, 'pipeline')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape, filter and summarize in one process, updating the outputs live.")
+    scraper.add_scrape_arguments(parser)
+    parser.add_argument("--filtered-out", default=DEFAULT_FILTERED_FILE, help="Output file for useful tweets, appended as they are kept.")
+    parser.add_argument("--summary-out", default=DEFAULT_SUMMARY_FILE, help="Output text file for the summary.")
+    parser.add_argument("--min-score", type=int, default=SCORE_THRESHOLD, help="The minimum score for a tweet to be kept.")
+    parser.add_argument("--near-dup-distance", type=int, default=None, metavar="BITS", help="Also drop near-duplicates whose 64-bit SimHash differs by at most BITS bits (e.g. 3).")
+    parser.add_argument("--summary-every", type=int, default=DEFAULT_SUMMARY_EVERY, help="Refresh the summary once this many new tweets were kept.")
+    parser.add_argument("--summary-interval", type=float, default=DEFAULT_SUMMARY_INTERVAL, help="Refresh the summary at least this often (seconds) while new tweets are kept.")
+    summarizer.add_summary_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Status report of the data X-Scout keeps on disk.
+
+    uv run report.py
+    uv run report.py --store tweets.db --archive archive --run-report filter_report.json --json
+
+Shows the tweet store (tweets scored and kept, the created_at range, tweets
+per keyword and how far behind the filter and summarizer are), the raw
+archive, the keyword scheduler's best keywords, rate-limit block and retry
+queue, the output files and the run reports written with --report. Nothing
+is scraped, scored or summarized, so the report only loads the modules
+that read those files.
+"""
+import argparse
+import json
+import os
+import time
+
+from keyword_scheduler import DEFAULT_STATS_FILE, KeywordScheduler
+from tweet_archive import DEFAULT_ARCHIVE_DIR, TweetArchive
+from tweet_store import DEFAULT_STORE_FILE, TweetStore
+
+# The files `make run` produces.
+DEFAULT_FILES = ("twikit_tweets.jsonl", "filtered_tweets.jsonl", "summary.txt")
+
+
+def format_time(ts) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(ts)) if ts is not None else '-'
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} B" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def file_status(path: str) -> dict:
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return {'bytes': stat.st_size, 'modified': int(stat.st_mtime)}
+
+
+def read_run_report(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"[WARN] Could not read run report '{path}': {e}")
+        return None
+    return {'stage': report.get('stage'), 'started': int(report.get('started', 0)),
+            'duration_seconds': report.get('duration_seconds')}
+
+
+def collect(args) -> dict:
+    status = {'store': None, 'archive': None, 'keywords': None, 'files': {}, 'runs': {}}
+    if os.path.exists(args.store):
+        with TweetStore(args.store) as store:
+            status['store'] = store.stats()
+    if os.path.exists(os.path.join(args.archive, 'index.json')):
+        status['archive'] = TweetArchive(args.archive).stats()
+    if os.path.exists(args.keyword_stats):
+        scheduler = KeywordScheduler([], stats_path=args.keyword_stats)
+        status['keywords'] = {
+            'blocked_for_seconds': round(scheduler.wait_time()),
+            'retry_queue': scheduler.retry_queue,
+            'best': [{'keyword': keyword, 'useful_per_request': round(useful, 2),
+                      'new_per_request': round(new, 2), 'requests': requests}
+                     for keyword, useful, new, requests in scheduler.summary(args.top)],
+        }
+    for path in args.files:
+        status['files'][path] = file_status(path)
+    for path in args.run_report or ():
+        status['runs'][path] = read_run_report(path)
+    return status
+
+
+def print_status(status: dict, args):
+    store = status['store']
+    print(f"--- Tweet store ({args.store}) ---")
+    if store is None:
+        print("  not created yet")
+    else:
+        print(f"  {store['tweets']} tweets, {store['scored']} scored, {store['kept']} kept")
+        print(f"  created {format_time(store['oldest'])} .. {format_time(store['newest'])}")
+        for consumer, checkpoint in store['checkpoints'].items():
+            print(f"  {consumer}: {checkpoint['pending']} tweets not processed yet")
+        for keyword, count in list(store['keywords'].items())[:args.top]:
+            print(f"  {count:>8}  {keyword}")
+
+    archive = status['archive']
+    if archive is not None:
+        print(f"--- Archive ({args.archive}) ---")
+        print(f"  {archive['tweets']} tweets in {archive['segments']} segments ({format_bytes(archive['bytes'])})")
+        print(f"  created {format_time(archive['oldest'])} .. {format_time(archive['newest'])}")
+
+    keywords = status['keywords']
+    if keywords is not None:
+        print(f"--- Keywords ({args.keyword_stats}) ---")
+        if keywords['blocked_for_seconds']:
+            print(f"  rate limited for another {keywords['blocked_for_seconds']}s")
+        for keyword, entry in keywords['retry_queue'].items():
+            print(f"  retry queued ({entry['reason']}, {entry['attempts']} failures), "
+                  f"due {format_time(entry['not_before'])}  {keyword}")
+        for row in keywords['best']:
+            print(f"  {row['useful_per_request']:>6.1f} useful / {row['new_per_request']:.1f} new per request "
+                  f"({row['requests']} requests)  {row['keyword']}")
+
+    print("--- Files ---")
+    for path, info in status['files'].items():
+        if info is None:
+            print(f"  {path}: missing")
+        else:
+            print(f"  {path}: {format_bytes(info['bytes'])}, modified {format_time(info['modified'])}")
+
+    for path, run in status['runs'].items():
+        if run is not None:
+            print(f"--- Run report ({path}) ---")
+            print(f"  {run['stage']} started {format_time(run['started'])}, took {run['duration_seconds']}s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Show what the tweet store, archive and output files hold.")
+    parser.add_argument("--store", default=DEFAULT_STORE_FILE, help="Tweet store to describe.")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_DIR, help="Raw tweet archive directory to describe.")
+    parser.add_argument("--keyword-stats", default=DEFAULT_STATS_FILE, help="Keyword scheduler statistics file.")
+    parser.add_argument("--files", nargs="*", default=list(DEFAULT_FILES), help="Output files to list.")
+    parser.add_argument("--run-report", action="append", metavar="FILE", help="A JSON run report written with --report (repeatable).")
+    parser.add_argument("--top", type=int, default=10, help="Number of keywords to list.")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON.")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    status = collect(args)
+    if args.json:
+        print(json.dumps(status, indent=2))
+    else:
+        print_status(status, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Full-text search over the tweets in the tweet store.
+
+    uv run search_tweets.py "bridge exploit" --min-score 8 --since 7d
+    uv run search_tweets.py '"oracle manipulation" OR "governance attack" -airdrop' --kept --json
+
+Words and "quoted phrases" must all match, `word*` matches a prefix,
+`a OR b` matches either and `-word` excludes. Results are ranked by BM25
+unless --sort says otherwise.
+"""
+import argparse
+import sys
+import time
+
+from tweet_record import dumps
+from tweet_store import DEFAULT_STORE_FILE, SEARCH_SORTS, TweetStore
+from tweet_archive import parse_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search the text of every tweet in the tweet store.")
+    parser.add_argument("query", nargs="?", default=None, help="Words, \"phrases\", prefix*, OR and -excluded words.")
+    parser.add_argument("--store", default=DEFAULT_STORE_FILE, help="Tweet store to search (e.g. tweets.db).")
+    parser.add_argument("--keyword", default=None, help="Only tweets found by this search keyword.")
+    parser.add_argument("--min-score", type=int, default=None, help="Only tweets with at least this filter score.")
+    parser.add_argument("--kept", action="store_true", help="Only tweets the filter kept.")
+    parser.add_argument("--since", type=parse_time, default=None, help="Only tweets created at or after this time: 24h, 7d, a Unix timestamp or an ISO date.")
+    parser.add_argument("--until", type=parse_time, default=None, help="Only tweets created before this time (same formats as --since).")
+    parser.add_argument("--sort", choices=list(SEARCH_SORTS), default='rank', help="Result order (default: best match first).")
+    parser.add_argument("--limit", type=int, default=20, help="Number of results to show.")
+    parser.add_argument("--offset", type=int, default=0, help="Number of results to skip.")
+    parser.add_argument("--json", action="store_true", help="Print the matching tweets as JSONL.")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the search index from the stored tweets (and optimize it), then exit unless a query is given.")
+    args = parser.parse_args()
+    if not args.query and not args.rebuild:
+        parser.error("a query is required")
+
+    with TweetStore(args.store) as store:
+        if not store.searchable:
+            sys.exit(1)
+        if args.rebuild:
+            started = time.perf_counter()
+            store.rebuild_search_index()
+            store.optimize_search_index()
+            print(f"[SUCCESS] Search index rebuilt in {time.perf_counter() - started:.2f}s.", file=sys.stderr)
+            if not args.query:
+                return
+
+        started = time.perf_counter()
+        try:
+            total, tweets = store.search(args.query, keyword=args.keyword, min_score=args.min_score,
+                                         since=args.since, until=args.until, kept_only=args.kept,
+                                         sort=args.sort, limit=args.limit, offset=args.offset)
+        except ValueError as e:
+            parser.error(str(e))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if args.json:
+        for tweet in tweets:
+            print(dumps(tweet))
+        return
+
+    print(f"--- {total} matching tweets ({elapsed_ms:.1f} ms) ---")
+    for i, tweet in enumerate(tweets, start=args.offset + 1):
+        score = tweet.filter_score if tweet.filter_score is not None else '-'
+        print(f"{i}. (Score: {score}, {tweet.created_at}, {tweet.keyword_searched}) {' '.join((tweet.text or '').split())}")
+
+
+if __name__ == "__main__":
+    main()
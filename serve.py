@@ -0,0 +1,340 @@
+"""
+Local data server for viewer.html.
+
+Serves the viewer and the summary, plus a small JSON API over the filtered
+tweets so the page can request sorted, filtered pages instead of the whole
+file:
+
+  GET /api/tweets?offset=0&limit=50&sort=score|newest|oldest
+                 &keyword=...&min_score=N&since=UNIX&until=UNIX
+  GET /api/keywords
+  GET /api/search?q=...&offset=0&limit=50&sort=rank|score|newest|oldest
+                 &keyword=...&min_score=N&since=UNIX&until=UNIX&kept=1
+
+The JSONL file is indexed once (byte offset, length, score, timestamp and
+keyword of every line) and re-indexed when it changes on disk. A page is
+answered by seeking to the selected lines and splicing their raw bytes into
+the response, so tweets are never re-encoded. Responses carry an ETag
+derived from the file version and query, honour If-None-Match with 304 and
+are gzip-compressed when the client accepts it.
+
+With --store, /api/search runs ranked full-text queries against every tweet
+in the tweet store (see TweetStore.search), not just the filtered file.
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from array import array
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from tweet_record import dumps, loads
+from tweet_store import SEARCH_SORTS, TweetStore, parse_created_at
+
+DEFAULT_TWEETS_FILE = 'filtered_tweets.jsonl'
+DEFAULT_SUMMARY_FILE = 'summary.txt'
+DEFAULT_PORT = 8000
+MAX_PAGE_SIZE = 500
+GZIP_MIN_BYTES = 1024
+SORTS = ('score', 'newest', 'oldest')
+
+def _optional_int(query: dict, name: str):
+    return int(query[name]) if query.get(name) else None
+
+class TweetSnapshot:
+    """
+    Per-line metadata of one version of a JSONL tweet file. Never changed
+    after it is built, so requests can use it while a newer one is loaded.
+    """
+
+    def __init__(self, path: str, version, offsets, lengths, scores, created, keywords):
+        self.path = path
+        self.version = version
+        self.offsets = offsets
+        self.lengths = lengths
+        self.scores = scores
+        self.created = created
+        self.keywords = keywords
+        self.select = lru_cache(maxsize=64)(self._select)
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def _select(self, sort, keyword, min_score, since, until):
+        rows = range(len(self.offsets))
+        if sort == 'score':
+            # Highest score first, ties in file order (the filter's output order).
+            rows = sorted(rows, key=lambda i: -self.scores[i])
+        elif sort == 'newest':
+            rows = sorted(rows, key=lambda i: -self.created[i])
+        elif sort == 'oldest':
+            rows = sorted(rows, key=lambda i: self.created[i])
+        scores, created, keywords = self.scores, self.created, self.keywords
+        return array('l', (
+            i for i in rows
+            if (keyword is None or keywords[i] == keyword)
+            and (min_score is None or scores[i] >= min_score)
+            and (since is None or created[i] >= since)
+            and (until is None or created[i] < until)
+        ))
+
+    def read_lines(self, rows):
+        """
+        Raw JSON bytes of the given rows, or None if the file no longer is
+        the version this snapshot indexed.
+        """
+        if not rows:
+            return []
+        try:
+            with open(self.path, 'rb') as f:
+                if _file_version(os.fstat(f.fileno())) != self.version:
+                    return None
+                fd = f.fileno()
+                return [os.pread(fd, self.lengths[i], self.offsets[i]) for i in rows]
+        except FileNotFoundError:
+            return None
+
+    def keyword_counts(self) -> dict:
+        counts = {}
+        for keyword in self.keywords:
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+def _file_version(stat) -> str:
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+class TweetIndex:
+    """The current TweetSnapshot of a JSONL tweet file, rebuilt when the file changes."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.snapshot = self._load(self._stat_version())
+
+    def _stat_version(self):
+        try:
+            return _file_version(os.stat(self.path))
+        except FileNotFoundError:
+            return None
+
+    def _load(self, version) -> TweetSnapshot:
+        offsets = array('q')
+        lengths = array('l')
+        scores = array('l')
+        created = array('q')
+        keywords = []
+        if version is not None:
+            with open(self.path, 'rb') as f:
+                # Index what was opened, even if the file is replaced meanwhile.
+                version = _file_version(os.fstat(f.fileno()))
+                offset = 0
+                for line in f:
+                    length = len(line.rstrip(b'\r\n'))
+                    try:
+                        tweet = loads(line) if length else None
+                    except ValueError:
+                        tweet = None
+                    if isinstance(tweet, dict):
+                        offsets.append(offset)
+                        lengths.append(length)
+                        scores.append(int(tweet.get('filter_score') or 0))
+                        created.append(parse_created_at(tweet.get('created_at')) or 0)
+                        keywords.append(tweet.get('keyword_searched') or '')
+                    offset += len(line)
+        print(f"[INFO] Indexed {len(offsets)} tweets from '{self.path}'.")
+        return TweetSnapshot(self.path, version, offsets, lengths, scores, created, tuple(keywords))
+
+    def refresh(self) -> TweetSnapshot:
+        """Re-indexes the file if it changed since the last call. Returns the current snapshot."""
+        with self._lock:
+            version = self._stat_version()
+            if version != self.snapshot.version:
+                self.snapshot = self._load(version)
+            return self.snapshot
+
+class StoreSearch:
+    """Full-text search over a tweet store, with one SQLite connection per server thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self.searchable = self._store().searchable
+
+    def _store(self) -> TweetStore:
+        store = getattr(self._local, 'store', None)
+        if store is None:
+            store = self._local.store = TweetStore(self.path)
+        return store
+
+    def search(self, query, **filters):
+        return self._store().search(query, **filters)
+
+class ViewerHandler(BaseHTTPRequestHandler):
+    index: TweetIndex = None
+    search: StoreSearch = None
+    static_files: dict = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- Responses ---
+
+    def _send(self, status, body: bytes, content_type: str, etag: str = None):
+        if etag and etag in self.headers.get('If-None-Match', ''):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        gzipped = len(body) >= GZIP_MIN_BYTES and 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _send_json(self, obj, etag=None, status=200):
+        self._send(status, json.dumps(obj, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8', etag)
+
+    def _error(self, status, message):
+        self._send_json({'error': message}, status=status)
+
+    # --- Routes ---
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == '/api/tweets':
+                self.api_tweets(url.query, query)
+            elif url.path == '/api/keywords':
+                self.api_keywords()
+            elif url.path == '/api/search':
+                self.api_search(query)
+            else:
+                self.static(url.path)
+        except ValueError as e:
+            self._error(400, str(e))
+
+    def _etag(self, snapshot: TweetSnapshot, query_string: str) -> str:
+        digest = hashlib.blake2b(query_string.encode('utf-8'), digest_size=8).hexdigest()
+        return f'"{snapshot.version}-{digest}"'
+
+    def api_tweets(self, query_string, query):
+        sort = query.get('sort', 'score')
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+        offset = max(0, int(query.get('offset', 0)))
+        limit = min(MAX_PAGE_SIZE, max(1, int(query.get('limit', 50))))
+        filters = (sort, query.get('keyword') or None,
+                   _optional_int(query, 'min_score'), _optional_int(query, 'since'), _optional_int(query, 'until'))
+
+        # The rows, lines and ETag all come from one snapshot; if the file was
+        # replaced after it was taken, index the new file and try again.
+        for _ in range(3):
+            snapshot = self.index.refresh()
+            rows = snapshot.select(*filters)
+            lines = snapshot.read_lines(rows[offset:offset + limit])
+            if lines is not None:
+                break
+        else:
+            self._error(503, f"'{self.index.path}' keeps changing, try again.")
+            return
+        body = b''.join([
+            f'{{"total":{len(rows)},"offset":{offset},"limit":{limit},"tweets":['.encode(),
+            b','.join(lines),
+            b']}',
+        ])
+        self._send(200, body, 'application/json; charset=utf-8', self._etag(snapshot, query_string))
+
+    def api_keywords(self):
+        snapshot = self.index.refresh()
+        counts = snapshot.keyword_counts()
+        keywords = [{'keyword': k, 'count': c} for k, c in sorted(counts.items(), key=lambda kv: -kv[1]) if k]
+        searchable = bool(self.search and self.search.searchable)
+        self._send_json({'total': len(snapshot), 'keywords': keywords, 'search': searchable},
+                        self._etag(snapshot, f'keywords-{searchable}'))
+
+    def api_search(self, query):
+        if not (self.search and self.search.searchable):
+            self._error(404, "Search is not enabled. Start serve.py with --store tweets.db.")
+            return
+        sort = query.get('sort', 'rank')
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SEARCH_SORTS)}")
+        offset = max(0, int(query.get('offset', 0)))
+        limit = min(MAX_PAGE_SIZE, max(1, int(query.get('limit', 50))))
+
+        total, tweets = self.search.search(
+            query.get('q', ''), keyword=query.get('keyword') or None, min_score=_optional_int(query, 'min_score'),
+            since=_optional_int(query, 'since'), until=_optional_int(query, 'until'), kept_only=query.get('kept') == '1',
+            sort=sort, limit=limit, offset=offset,
+        )
+        body = ''.join([
+            f'{{"total":{total},"offset":{offset},"limit":{limit},"tweets":[',
+            ','.join(dumps(tweet) for tweet in tweets),
+            ']}',
+        ]).encode('utf-8')
+        # The store changes while the scraper runs, so search results carry no ETag.
+        self._send(200, body, 'application/json; charset=utf-8')
+
+    def static(self, path):
+        name = 'viewer.html' if path in ('/', '') else path.lstrip('/')
+        if name not in self.static_files:
+            self._error(404, f"Not found: {path}")
+            return
+        file_path, content_type = self.static_files[name]
+        try:
+            stat = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            self._error(404, f"'{file_path}' does not exist yet. Run 'make' first.")
+            return
+        self._send(200, body, content_type, f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"')
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve viewer.html with a paginated API over the filtered tweets.")
+    parser.add_argument("--tweets", default=DEFAULT_TWEETS_FILE, help="Filtered tweets JSONL file.")
+    parser.add_argument("--summary", default=DEFAULT_SUMMARY_FILE, help="Summary text file.")
+    parser.add_argument("--store", default=None, help="Tweet store (e.g. tweets.db) to enable full-text search over every collected tweet.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    args = parser.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    ViewerHandler.index = TweetIndex(args.tweets)
+    if args.store:
+        ViewerHandler.search = StoreSearch(args.store)
+    ViewerHandler.static_files = {
+        'viewer.html': (os.path.join(here, 'viewer.html'), 'text/html; charset=utf-8'),
+        'summary.txt': (args.summary, 'text/plain; charset=utf-8'),
+        'filtered_tweets.jsonl': (args.tweets, 'application/x-ndjson; charset=utf-8'),
+    }
+
+    server = ThreadingHTTPServer((args.host, args.port), ViewerHandler)
+    print(f"[INFO] Serving the viewer at http://{args.host}:{args.port}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[INFO] Server stopped.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,282 @@
 import os
-import json
 import argparse
-import google.generativeai as genai
-from dotenv import load_dotenv
+import errno
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from tweet_store import TweetStore
+from llm_backends import BACKENDS, get_backend
+from summary_cache import SummaryCache, DEFAULT_CACHE_DIR, make_key
+from topic_clusters import cluster_tweets, format_cluster, DEFAULT_THRESHOLD, DEFAULT_REPRESENTATIVES
+from tweet_record import TweetRecord
+from tweet_archive import TweetArchive, filter_window, parse_time
+from filter_tweets import SCORE_THRESHOLD, DigestSet, iter_useful_tweets
+from metrics import METRICS, SIZE_BUCKETS, add_metrics_arguments, configure as configure_metrics, export as export_metrics, profile_stage
 
 # --- CONFIGURATION ---
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
 DEFAULT_TWEETS_FILE = 'filtered_tweets.jsonl'
 DEFAULT_SUMMARY_FILE = 'summary.txt'
 
+# Map-reduce limits. Token counts are estimated at ~4 characters per token.
+DEFAULT_CHUNK_TOKENS = 24000
+DEFAULT_CONCURRENCY = 4
+TWEET_SEPARATOR = "\n\n---\n\n"
+
+SUMMARY_PROMPT = (
+    "As of {date}, you are a senior cybersecurity analyst specialized in both traditional security and web3/blockchain, reporting to user '{user}'.\n\n"
+    "Your primary directive is to produce a high-level intelligence briefing from the provided tweets. Before summarizing, you must first act as a critical filter. "
+    "Aggressively discard any tweets that appear to be marketing, spam, price speculation, or otherwise irrelevant to actionable security intelligence. Your summary must only be based on the remaining, high-value information.\n\n"
+    "Focus on: actionable intelligence, emerging threats, new vulnerabilities, and significant developer news across both traditional and web3 domains. "
+    "Explicitly include details about smart contract vulnerabilities, blockchain exploits, and web3 security tool developments.\n\n"
+    "Format the output using markdown bullet points (`*` or `-`) and use headers (`## Category`) to organize the information. Be direct, factual, and concise."
+    "{part_note}"
+    "\n\nHere are all the raw tweets to analyze and filter:\n\n{content}"
+)
+
+PART_NOTE = (
+    "\n\nThe tweets are split into several parts and this is one of them. Brief only this part; "
+    "the partial briefings will be merged afterwards, so keep every distinct item."
+)
+
+REDUCE_PROMPT = (
+    "As of {date}, you are a senior cybersecurity analyst specialized in both traditional security and web3/blockchain, reporting to user '{user}'.\n\n"
+    "Below are partial intelligence briefings, each written from a different part of the same day's tweets. "
+    "Merge them into a single briefing: combine items that describe the same event, drop exact repeats, and keep every distinct piece of actionable intelligence.\n\n"
+    "Format the output using markdown bullet points (`*` or `-`) and use headers (`## Category`) to organize the information. Be direct, factual, and concise."
+    "\n\nHere are the partial briefings:\n\n{content}"
+)
+
 # --- MAIN LOGIC ---
-def get_ai_summary(content: str):
-    """Uses the Google Generative AI API to summarize the provided text."""
-    if not API_KEY:
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+def is_chunk_boundary(text: str) -> bool:
+    """Content-defined cut point: true for about one text in sixteen."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=1).digest()[0] & 15 == 0
+
+def chunk_texts(texts, max_tokens: int):
+    """
+    Packs texts, in order, into groups of at most `max_tokens` (an oversized
+    text gets its own group). Once a group is half full it is also closed
+    after any boundary text, so inserting a tweet only changes the chunks
+    around it and the rest keep hitting the summary cache.
+    """
+    separator_tokens = estimate_tokens(TWEET_SEPARATOR)
+    chunks, current, used = [], [], 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if current and used + separator_tokens + cost > max_tokens:
+            chunks.append(current)
+            current, used = [], 0
+        used += cost + (separator_tokens if current else 0)
+        current.append(text)
+        if used * 2 >= max_tokens and is_chunk_boundary(text):
+            chunks.append(current)
+            current, used = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+def prompt_fields() -> dict:
+    return {
+        "date": datetime.now(timezone.utc).strftime("%Y-%m-%d"),
+        "user": os.getenv('USER', 'cosminmarian53'),
+    }
+
+def build_summary_prompt(texts, partial: bool = False) -> str:
+    part_note = PART_NOTE if partial else ""
+    return SUMMARY_PROMPT.format(part_note=part_note, content=TWEET_SEPARATOR.join(texts), **prompt_fields())
+
+def build_reduce_prompt(partials) -> str:
+    return REDUCE_PROMPT.format(content=TWEET_SEPARATOR.join(partials), **prompt_fields())
+
+def cache_key(kind: str, backend, texts, **extra) -> str:
+    """Key for one model answer. The date in the prompt is left out, so unchanged content hits across days."""
+    templates = {
+        'summary': (SUMMARY_PROMPT, PART_NOTE, REDUCE_PROMPT),
+        'full': (SUMMARY_PROMPT,),
+        'map': (SUMMARY_PROMPT, PART_NOTE),
+        'reduce': (REDUCE_PROMPT,),
+    }[kind]
+    return make_key(kind, templates, backend.name, backend.settings(), list(texts), extra)
+
+def run_prompts(backend, prompts, concurrency: int, keys=None, cache=None):
+    """
+    Runs the prompts on up to `concurrency` threads. Returns the answers in
+    order; raises on the first failure. Answers found in `cache` under `keys`
+    are reused, and every new answer is stored as soon as it arrives.
+    """
+    keys = keys or [None] * len(prompts)
+
+    def generate(prompt, key):
+        if cache and key:
+            cached = cache.get(key)
+            if cached is not None:
+                METRICS.inc('llm_cache_hits_total', backend=backend.name)
+                return cached
+            METRICS.inc('llm_cache_misses_total', backend=backend.name)
+        METRICS.observe('llm_prompt_chars', len(prompt), SIZE_BUCKETS, backend=backend.name)
+        started = time.perf_counter()
+        try:
+            answer = backend.generate(prompt)
+        except Exception:
+            METRICS.inc('llm_errors_total', backend=backend.name)
+            raise
+        finally:
+            METRICS.observe('llm_request_seconds', time.perf_counter() - started, backend=backend.name)
+        METRICS.inc('llm_requests_total', backend=backend.name)
+        METRICS.inc('llm_prompt_tokens_estimated_total', estimate_tokens(prompt), backend=backend.name)
+        if cache and key:
+            cache.put(key, answer)
+        return answer
+
+    if len(prompts) == 1:
+        return [generate(prompts[0], keys[0])]
+    pool = ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(prompts))))
+    try:
+        return list(pool.map(generate, prompts, keys))
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+def summarize_texts(texts, backend, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                    concurrency: int = DEFAULT_CONCURRENCY, cache: SummaryCache = None) -> str:
+    """
+    Map-reduce summary: tweets are packed into chunks of about `chunk_tokens`,
+    each chunk is briefed separately (up to `concurrency` requests at once),
+    and the partial briefings are merged until one is left. With a `cache`,
+    the whole summary and every chunk/merge answer are looked up first.
+    Raises on failure.
+    """
+    summary_key = cache_key('summary', backend, texts, chunk_tokens=chunk_tokens)
+    if cache:
+        cached = cache.get(summary_key)
+        if cached is not None:
+            print("[INFO] Tweets unchanged since a cached summary, reusing it.")
+            return cached
+
+    chunks = chunk_texts(texts, chunk_tokens)
+    METRICS.set('summary_entries', len(texts))
+    METRICS.set('summary_chunks', len(chunks))
+    if len(chunks) == 1:
+        print(f"[INFO] Contacting the '{backend.name}' backend for a full summary...")
+        summary, = run_prompts(backend, [build_summary_prompt(chunks[0])], concurrency,
+                               [cache_key('full', backend, chunks[0])], cache)
+    else:
+        print(f"[INFO] Summarizing {len(texts)} entries in {len(chunks)} chunks, {concurrency} at a time...")
+        prompts = [build_summary_prompt(chunk, partial=True) for chunk in chunks]
+        keys = [cache_key('map', backend, chunk) for chunk in chunks]
+        partials = run_prompts(backend, prompts, concurrency, keys, cache)
+
+        while len(partials) > 1:
+            groups = chunk_texts(partials, chunk_tokens)
+            if len(groups) == len(partials):
+                # Every briefing fills a chunk on its own; merge pairwise so we still make progress.
+                groups = [partials[i:i + 2] for i in range(0, len(partials), 2)]
+            print(f"[INFO] Merging {len(partials)} partial briefings into {len(groups)}...")
+            prompts = [build_reduce_prompt(group) for group in groups]
+            keys = [cache_key('reduce', backend, group) for group in groups]
+            partials = run_prompts(backend, prompts, concurrency, keys, cache)
+        summary = partials[0]
+
+    if cache:
+        cache.put(summary_key, summary)
+        stats = cache.stats()
+        print(f"[INFO] Summary cache: {stats['hits']} hits, {stats['misses']} misses.")
+    return summary
+
+def prompt_texts(tweets, args):
+    """The texts to summarize: one entry per topic cluster, or every tweet with --no-clusters."""
+    if args.no_clusters:
+        return [tweet['text'] for tweet in tweets]
+    clusters = cluster_tweets(tweets, threshold=args.cluster_threshold, representatives=args.representatives)
+    print(f"[INFO] Grouped {len(tweets)} tweets into {len(clusters)} topics.")
+    return [format_cluster(cluster) for cluster in clusters]
+
+def make_cache(args):
+    if args.no_cache:
+        return None
+    return SummaryCache(args.cache_dir, max_age_days=args.cache_max_age_days, max_bytes=args.cache_max_mb * 1024 * 1024)
+
+def make_backend(args):
+    """Returns the configured backend, or None (with a warning) if it cannot be used."""
+    if args.backend == "stub":
+        return get_backend("stub", latency=args.stub_latency)
+    # Load the API key from the .env file
+    from dotenv import load_dotenv
+    load_dotenv()
+    backend = get_backend(args.backend, api_key=os.getenv("GOOGLE_API_KEY"))
+    if not backend.available():
         print("[WARN] GOOGLE_API_KEY not found in .env file. Skipping summary.")
-        return "AI Summary disabled: GOOGLE_API_KEY is not set."
+        return None
+    return backend
 
-    print("[INFO] Contacting Google's Generative AI for a full summary...")
+def get_ai_summary(tweets, backend, args):
+    """Summarizes the tweets, returning an error message instead of raising."""
     try:
-        genai.configure(api_key=API_KEY)
-        
-        # UPDATED: Increased max_output_tokens to allow for longer summaries
-        generation_config = {"temperature": 0.5, "max_output_tokens": 4096} 
-        
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        ]
-
-        model = genai.GenerativeModel(
-            model_name="gemini-1.5-flash",
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-        current_date = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-        prompt = (
-            f"As of {current_date}, you are a senior cybersecurity analyst specialized in both traditional security and web3/blockchain, reporting to user '{os.getenv('USER', 'cosminmarian53')}'.\n\n"
-            "Your primary directive is to produce a high-level intelligence briefing from the provided tweets. Before summarizing, you must first act as a critical filter. "
-            "Aggressively discard any tweets that appear to be marketing, spam, price speculation, or otherwise irrelevant to actionable security intelligence. Your summary must only be based on the remaining, high-value information.\n\n"
-            "Focus on: actionable intelligence, emerging threats, new vulnerabilities, and significant developer news across both traditional and web3 domains. "
-            "Explicitly include details about smart contract vulnerabilities, blockchain exploits, and web3 security tool developments.\n\n"
-            "Format the output using markdown bullet points (`*` or `-`) and use headers (`## Category`) to organize the information. Be direct, factual, and concise."
-            f"\n\nHere are all the raw tweets to analyze and filter:\n\n{content}"
-        )
-        
-        response = model.generate_content(prompt)
-        return response.text
-        
+        return summarize_texts(prompt_texts(tweets, args), backend, args.chunk_tokens, args.concurrency, make_cache(args))
     except Exception as e:
-        print(f"[ERROR] Failed to get Google AI summary: {e}")
+        print(f"[ERROR] Failed to get AI summary: {e}")
         return f"Could not generate AI summary due to an error: {e}"
 
-def main():
-    parser = argparse.ArgumentParser(description="Summarize all tweets from a file using Google's Generative AI.")
-    parser.add_argument("--in", default=DEFAULT_TWEETS_FILE, dest="input_file", help="Input JSONL file of filtered tweets.")
-    parser.add_argument("--out", default=DEFAULT_SUMMARY_FILE, help="Output text file for the summary.")
-    args = parser.parse_args()
+def summarize_from_store(args):
+    """Summarizes only the kept tweets the filter has processed since the last summary."""
+    with TweetStore(args.store) as store:
+        since = store.checkpoint('summarizer')
+        until = store.checkpoint('filter')
+        tweets = [tweet for _, tweet in store.iter_kept(since, until)]
+
+        if not tweets:
+            print(f"[INFO] No new filtered tweets in '{args.store}' since the last summary. Keeping '{args.out}'.")
+            return
+
+        print(f"[INFO] Summarizing {len(tweets)} new tweets from '{args.store}'.")
+        backend = make_backend(args)
+        if not backend:
+            return
+
+        try:
+            summary = summarize_texts(prompt_texts(tweets, args), backend, args.chunk_tokens,
+                                      args.concurrency, make_cache(args))
+        except Exception as e:
+            # Leave the checkpoint alone so the same tweets are retried next run.
+            print(f"[ERROR] Failed to get AI summary: {e}")
+            return
+
+        with open(args.out, 'w', encoding='utf-8') as f_out:
+            f_out.write(summary)
+        with store.conn:
+            store.set_checkpoint('summarizer', until)
+
+    print(f"[SUCCESS] AI summary of new tweets saved to '{args.out}'.")
+
+def load_tweets(args) -> list:
+    """
+    The tweets to summarize, limited to --since/--until: the kept tweets in
+    --in, or with --archive the raw tweets of the matching archive segments,
+    filtered here (highest score first).
+    """
+    if args.archive:
+        if not os.path.isdir(args.archive):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), args.archive)
+        lines = TweetArchive(args.archive).iter_lines(args.since, args.until)
+        tweets = list(iter_useful_tweets(lines, args.min_score, DigestSet()))
+        tweets.sort(key=lambda tweet: tweet.filter_score, reverse=True)
+        return tweets
+    with open(args.input_file, 'r', encoding='utf-8') as f:
+        return [TweetRecord.from_json(line) for line in filter_window(f, args.since, args.until) if line.strip()]
+
+def summarize(args):
+    """Writes the summary of --in or --archive (or of the new tweets in --store) to --out."""
+    if args.store:
+        summarize_from_store(args)
+        return
 
+    source = f"archive '{args.archive}'" if args.archive else f"'{args.input_file}'"
     try:
-        with open(args.input_file, 'r', encoding='utf-8') as f:
-            tweets = [json.loads(line) for line in f]
-    except FileNotFoundError:
-        print(f"[WARN] No tweets file found at '{args.input_file}'. Skipping summary.")
+        tweets = load_tweets(args)
+    except FileNotFoundError as e:
+        print(f"[WARN] No tweets found at '{e.filename}'. Skipping summary.")
         with open(args.out, 'w', encoding='utf-8') as f_out:
             f_out.write("No tweets were found to summarize.")
         return
@@ -76,15 +287,60 @@ def main():
             f_out.write("No useful tweets were found to create a summary.")
         return
     
-    print(f"[INFO] Summarizing all {len(tweets)} tweets from '{args.input_file}'.")
-    full_text_content = "\n\n---\n\n".join([tweet['text'] for tweet in tweets])
-    
-    summary = get_ai_summary(full_text_content)
+    print(f"[INFO] Summarizing all {len(tweets)} tweets from {source}.")
+    backend = make_backend(args)
+    if backend:
+        summary = get_ai_summary(tweets, backend, args)
+    else:
+        summary = "AI Summary disabled: GOOGLE_API_KEY is not set."
     
     with open(args.out, 'w', encoding='utf-8') as f_out:
         f_out.write(summary)
         
-    print(f"[SUCCESS] Full Google AI summary saved to '{args.out}'.")
+    print(f"[SUCCESS] Full AI summary saved to '{args.out}'.")
+
+def add_summary_arguments(parser):
+    """The model, chunking, clustering and cache options, shared with the fused pipeline (pipeline.py)."""
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="gemini", help="Model backend. 'stub' runs offline for testing and benchmarks.")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS, help="Approximate tweet tokens per summarization request.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum summarization requests in flight at once.")
+    parser.add_argument("--stub-latency", type=float, default=0.5, help="Simulated seconds per request for the stub backend.")
+    parser.add_argument("--cluster-threshold", type=float, default=DEFAULT_THRESHOLD, help="Cosine similarity (TF-IDF) at which tweets are grouped into the same topic.")
+    parser.add_argument("--representatives", type=int, default=DEFAULT_REPRESENTATIVES, help="Tweets sent to the model per topic.")
+    parser.add_argument("--no-clusters", action="store_true", help="Send every tweet instead of grouping them by topic.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directory for cached model answers.")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the model, ignoring and not updating the cache.")
+    parser.add_argument("--cache-max-age-days", type=float, default=7, help="Cached answers older than this are not reused.")
+    parser.add_argument("--cache-max-mb", type=float, default=100, help="Evict least recently used answers once the cache is larger than this.")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Summarize all tweets from a file using Google's Generative AI.")
+    parser.add_argument("--in", default=DEFAULT_TWEETS_FILE, dest="input_file", help="Input JSONL file of filtered tweets.")
+    parser.add_argument("--out", default=DEFAULT_SUMMARY_FILE, help="Output text file for the summary.")
+    parser.add_argument("--store", default=None, help="Summarize only the tweets filtered since the last run from this tweet store (e.g. tweets.db).")
+    parser.add_argument("--archive", metavar="DIR", default=None, help="Filter and summarize raw tweets from this archive instead of --in.")
+    parser.add_argument("--min-score", type=int, default=SCORE_THRESHOLD, help="With --archive, the minimum filter score for a tweet to be summarized.")
+    parser.add_argument("--since", type=parse_time, default=None, help="Only tweets created at or after this time: 24h, 7d, a Unix timestamp or an ISO date.")
+    parser.add_argument("--until", type=parse_time, default=None, help="Only tweets created before this time (same formats as --since).")
+    add_summary_arguments(parser)
+    add_metrics_arguments(parser)
+    return parser
+
+def check_arguments(parser, args):
+    if args.store and (args.archive or args.since is not None or args.until is not None):
+        parser.error("--store can't be combined with --archive, --since or --until")
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    check_arguments(parser, args)
+    configure_metrics(args)
+
+    try:
+        with profile_stage('summarize'):
+            summarize(args)
+    finally:
+        export_metrics(args, 'summarize')
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
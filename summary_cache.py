@@ -0,0 +1,99 @@
+"""
+Content-addressed on-disk cache for model answers.
+
+An answer is stored under a hash of everything that determines it (prompt
+template, backend settings, the exact tweet texts), so reruns over the same
+content skip the model call and any change produces a new key. Each entry
+is one small JSON file. Entries older than `max_age_days` are dropped, and
+when the cache grows past `max_bytes` the least recently used entries go
+first. Only successful answers are stored.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+DEFAULT_CACHE_DIR = ".summary_cache"
+
+def make_key(*parts) -> str:
+    """Stable hash of JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=20).hexdigest()
+
+class SummaryCache:
+    def __init__(self, path: str = DEFAULT_CACHE_DIR, max_age_days: float = 7, max_bytes: int = 100 * 1024 * 1024):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+        self.evict()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key + ".json")
+
+    def get(self, key: str):
+        """Returns the cached text, or None."""
+        path = self._file(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        if time.time() - entry.get('created', 0) > self.max_age:
+            self.misses += 1
+            return None
+        # Bump the mtime so size-based eviction removes least recently used entries first.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry['text']
+
+    def put(self, key: str, text: str):
+        if not text:
+            return
+        path = self._file(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'created': time.time(), 'text': text}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        """Removes expired entries, then the least recently used ones until under max_bytes."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.path):
+            path = os.path.join(self.path, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # The mtime is never older than the entry, so an old mtime means it expired.
+            age = now - stat.st_mtime
+            if age > self.max_age or (name.endswith('.tmp') and age > 3600):
+                # Another summarizer run may have removed it since the listing.
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+            removed += 1
+        if removed:
+            print(f"[INFO] Evicted {removed} entries from the summary cache.")
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
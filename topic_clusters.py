@@ -0,0 +1,160 @@
+"""
+Groups filtered tweets into topics before summarization.
+
+Tweets are turned into sparse TF-IDF vectors (CSR arrays in NumPy) over the
+same normalized words the scorer uses, then clustered greedily: tweets are
+visited from the highest filter_score down, and each one joins the most
+similar existing cluster leader if the cosine similarity reaches the
+threshold, or starts a new cluster. Similarities against all leaders are
+computed for a block of tweets at a time with vectorized sparse products,
+so the cost grows with tweets x leader nonzeros rather than with the
+vocabulary size.
+
+The summarizer then sends a few representative tweets per cluster plus the
+cluster size and top score, so the prompt grows with the number of distinct
+topics instead of the number of tweets.
+
+NumPy is imported by the functions that use it, so importing the module
+for its defaults (the summarizer's command line) stays cheap.
+"""
+import math
+from collections import Counter
+
+from keyword_matcher import normalize_for_matching
+
+DEFAULT_THRESHOLD = 0.45
+DEFAULT_REPRESENTATIVES = 3
+DEFAULT_MAX_FEATURES = 20000
+_BLOCK = 64
+# URL fragments and retweet markers carry no topic information.
+_IGNORED_TOKENS = frozenset({b'http', b'https', b'co', b'www', b'amp', b'rt', b'via'})
+
+
+def _tokenize(text: str):
+    return [token for token in normalize_for_matching(text or '').split()
+            if len(token) > 1 and token not in _IGNORED_TOKENS]
+
+
+def tfidf_matrix(texts, max_features: int = DEFAULT_MAX_FEATURES, max_df: float = 0.5):
+    """
+    L2-normalized TF-IDF rows as CSR arrays (indptr, indices, data). Words
+    in a single tweet or in more than `max_df` of them are left out, and the
+    vocabulary keeps the `max_features` most common remaining words.
+    """
+    import numpy as np
+    token_lists = [_tokenize(text) for text in texts]
+    doc_freq = Counter()
+    for tokens in token_lists:
+        doc_freq.update(set(tokens))
+    limit = max(2, max_df * len(texts))
+    vocabulary = [token for token, df in doc_freq.most_common() if 2 <= df <= limit][:max_features]
+    columns = {token: i for i, token in enumerate(vocabulary)}
+    idf = np.array([math.log((1 + len(texts)) / (1 + doc_freq[token])) + 1 for token in vocabulary], dtype=np.float32)
+
+    indptr = [0]
+    indices, data = [], []
+    for tokens in token_lists:
+        counts = Counter(columns[token] for token in tokens if token in columns)
+        indices.extend(counts)
+        data.extend(counts.values())
+        indptr.append(len(indices))
+    indptr = np.array(indptr, dtype=np.int64)
+    indices = np.array(indices, dtype=np.int32)
+    data = np.array(data, dtype=np.float32)
+    if len(data):
+        data = (1 + np.log(data)) * idf[indices]
+        row_of = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        norms = np.sqrt(np.bincount(row_of, weights=data * data, minlength=len(texts)))
+        data /= norms[row_of].astype(np.float32)
+    return indptr, indices, data, len(vocabulary)
+
+
+def cluster_texts(texts, scores=None, threshold: float = DEFAULT_THRESHOLD,
+                  max_features: int = DEFAULT_MAX_FEATURES):
+    """
+    Returns clusters as lists of indexes into `texts`. Each cluster starts
+    with its leader (its highest-scoring tweet) and lists members in score
+    order; clusters are ordered by their leader's score.
+    """
+    n = len(texts)
+    if not n:
+        return []
+    scores = scores if scores is not None else [0] * n
+    import numpy as np
+    order = sorted(range(n), key=lambda i: -scores[i])
+    indptr, indices, data, width = tfidf_matrix(texts, max_features)
+
+    clusters = []
+    # Leader rows as CSR arrays, with row start offsets (the layout np.add.reduceat needs).
+    leader_ids = []
+    leader_indices = np.zeros(0, dtype=np.int32)
+    leader_data = np.zeros(0, dtype=np.float32)
+    leader_starts = np.zeros(0, dtype=np.int64)
+
+    for block_start in range(0, n, _BLOCK):
+        rows = order[block_start:block_start + _BLOCK]
+        dense = np.zeros((len(rows), width), dtype=np.float32)
+        for r, i in enumerate(rows):
+            dense[r, indices[indptr[i]:indptr[i + 1]]] = data[indptr[i]:indptr[i + 1]]
+
+        # Similarity to every existing leader: multiply the block's dense rows
+        # by each leader's nonzeros, then sum per leader.
+        if len(leader_ids):
+            to_leaders = np.add.reduceat(dense[:, leader_indices] * leader_data, leader_starts, axis=1)
+        else:
+            to_leaders = np.zeros((len(rows), 0), dtype=np.float32)
+        within_block = dense @ dense.T
+
+        new_leaders = []  # (row in block, cluster number)
+        for r, i in enumerate(rows):
+            best_cluster, best_sim = None, threshold
+            if to_leaders.shape[1]:
+                j = int(to_leaders[r].argmax())
+                if to_leaders[r, j] >= best_sim:
+                    best_cluster, best_sim = leader_ids[j], to_leaders[r, j]
+            for leader_row, cluster in new_leaders:
+                if within_block[r, leader_row] >= best_sim:
+                    best_cluster, best_sim = cluster, within_block[r, leader_row]
+            if best_cluster is not None:
+                clusters[best_cluster].append(i)
+                continue
+            clusters.append([i])
+            # Tweets without any vocabulary words stay on their own.
+            if indptr[i + 1] > indptr[i]:
+                new_leaders.append((r, len(clusters) - 1))
+
+        if new_leaders:
+            pieces = [rows[r] for r, _ in new_leaders]
+            starts = [len(leader_indices)]
+            for i in pieces[:-1]:
+                starts.append(starts[-1] + int(indptr[i + 1] - indptr[i]))
+            leader_starts = np.concatenate([leader_starts, np.array(starts, dtype=np.int64)])
+            leader_indices = np.concatenate([leader_indices] + [indices[indptr[i]:indptr[i + 1]] for i in pieces])
+            leader_data = np.concatenate([leader_data] + [data[indptr[i]:indptr[i + 1]] for i in pieces])
+            leader_ids.extend(cluster for _, cluster in new_leaders)
+    return clusters
+
+
+def cluster_tweets(tweets, threshold: float = DEFAULT_THRESHOLD, representatives: int = DEFAULT_REPRESENTATIVES):
+    """Returns [{'size', 'top_score', 'tweets'}] with up to `representatives` tweets per cluster."""
+    texts = [tweet.get('text') or '' for tweet in tweets]
+    scores = [tweet.get('filter_score') or 0 for tweet in tweets]
+    return [
+        {
+            'size': len(members),
+            'top_score': scores[members[0]],
+            'tweets': [tweets[i] for i in members[:representatives]],
+        }
+        for members in cluster_texts(texts, scores, threshold)
+    ]
+
+
+def format_cluster(cluster: dict) -> str:
+    """Prompt text for one cluster: a header with its size and top score, then the representatives."""
+    size, shown = cluster['size'], len(cluster['tweets'])
+    if size == 1:
+        header = f"[1 tweet, relevance score {cluster['top_score']}]"
+    else:
+        header = (f"[Topic discussed in {size} tweets (top relevance score {cluster['top_score']}), "
+                  f"{shown} representative tweet{'s' if shown != 1 else ''} below]")
+    return "\n\n".join([header] + [tweet.get('text') or '' for tweet in cluster['tweets']])
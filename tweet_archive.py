@@ -0,0 +1,322 @@
+"""
+Segmented, gzip-compressed archive of raw tweets.
+
+Instead of one ever-growing JSONL file, the scraper can write raw tweets
+into a directory of segments, one per `created_at` time bucket (an hour by
+default) and per writer process:
+
+    archive/
+      20261017T1400Z-4242-1.jsonl.gz
+      20261017T1500Z-4242-2.jsonl.gz
+      index.json
+
+When a segment is closed, its tweet count, min/max `created_at` (as Unix
+timestamps) and min/max tweet id go into the `index.json` sidecar. Readers
+use the index to open only the segments that overlap a requested time
+window, and stream-decompress them line by line. Lines are checked against
+the window only in segments that straddle its edges.
+
+A segment that was never indexed (the writer was killed) is indexed from
+whatever can still be decompressed the next time a writer opens the archive.
+Writers serialize their updates of `index.json` with a lock file.
+"""
+import glob
+import gzip
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single writer at a time
+    fcntl = None
+
+from tweet_record import dumps, loads
+from tweet_store import parse_created_at
+
+DEFAULT_ARCHIVE_DIR = "archive"
+DEFAULT_BUCKET_SECONDS = 3600
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+MAX_OPEN_SEGMENTS = 16
+SEGMENT_SUFFIX = ".jsonl.gz"
+_DURATION = re.compile(r'^(\d+(?:\.\d+)?)([smhdw])$')
+_UNIT_SECONDS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+
+def parse_time(value: str, now: float = None) -> int:
+    """
+    Parses a window bound: a duration ago ('90m', '24h', '7d', '2w'), a Unix
+    timestamp or an ISO 8601 date/time ('2026-10-17', '2026-10-17T08:00:00+00:00').
+    """
+    value = value.strip()
+    match = _DURATION.match(value)
+    if match:
+        now = time.time() if now is None else now
+        return int(now - float(match.group(1)) * _UNIT_SECONDS[match.group(2)])
+    if value.isdigit():
+        return int(value)
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except ValueError:
+        raise ValueError(f"invalid time '{value}' (use e.g. 24h, 7d, a Unix timestamp or an ISO date)") from None
+
+
+def _id_key(tweet_id):
+    return int(tweet_id) if isinstance(tweet_id, str) and tweet_id.isdigit() else tweet_id
+
+
+class SegmentStats:
+    """Running count and min/max created_at and id of the tweets in one segment."""
+
+    def __init__(self):
+        self.count = 0
+        self.min_ts = self.max_ts = None
+        self.min_id = self.max_id = None
+
+    def add(self, created_ts, tweet_id):
+        self.count += 1
+        if created_ts is not None:
+            self.min_ts = created_ts if self.min_ts is None else min(self.min_ts, created_ts)
+            self.max_ts = created_ts if self.max_ts is None else max(self.max_ts, created_ts)
+        if tweet_id is not None:
+            key = _id_key(tweet_id)
+            if self.min_id is None or key < _id_key(self.min_id):
+                self.min_id = tweet_id
+            if self.max_id is None or key > _id_key(self.max_id):
+                self.max_id = tweet_id
+
+    def entry(self, name: str, path: str) -> dict:
+        return {
+            'file': name, 'count': self.count,
+            'min_created_ts': self.min_ts, 'max_created_ts': self.max_ts,
+            'min_id': self.min_id, 'max_id': self.max_id,
+            'bytes': os.path.getsize(path),
+        }
+
+
+class TweetArchive:
+    """The segment directory and its index."""
+
+    def __init__(self, directory: str = DEFAULT_ARCHIVE_DIR, bucket_seconds: int = DEFAULT_BUCKET_SECONDS,
+                 compresslevel: int = 6):
+        self.directory = directory
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self.compresslevel = compresslevel
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.lock_path = os.path.join(directory, LOCK_FILE)
+
+    # --- Index ---
+
+    def load_index(self) -> list:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)['segments']
+        except FileNotFoundError:
+            return []
+
+    def _save_index(self, segments):
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'segments': segments}, f, indent=1)
+        os.replace(tmp_path, self.index_path)
+
+    def add_segment(self, entry: dict):
+        """
+        Adds (or replaces) one segment's entry. The index is re-read and
+        rewritten under an exclusive lock, so concurrent writers don't drop
+        each other's entries.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            segments = [s for s in self.load_index() if s['file'] != entry['file']]
+            segments.append(entry)
+            segments.sort(key=lambda s: s['file'])
+            self._save_index(segments)
+
+    def scan_segment(self, path: str) -> SegmentStats:
+        """Stats of a segment computed from its contents, stopping at a truncated end."""
+        stats = SegmentStats()
+        for line in self._read_lines(path):
+            try:
+                tweet = loads(line)
+            except ValueError:
+                continue
+            if isinstance(tweet, dict):
+                stats.add(parse_created_at(tweet.get('created_at')), tweet.get('id'))
+        return stats
+
+    def recover(self) -> int:
+        """Indexes segments left unindexed by a writer that is no longer running. Returns how many."""
+        indexed = {s['file'] for s in self.load_index()}
+        recovered = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, '*' + SEGMENT_SUFFIX))):
+            name = os.path.basename(path)
+            if name in indexed or _writer_alive(name):
+                continue
+            self.add_segment(self.scan_segment(path).entry(name, path))
+            recovered += 1
+            print(f"[WARN] Recovered unindexed archive segment '{name}'.")
+        return recovered
+
+    # --- Reading ---
+
+    def segments(self, since: int = None, until: int = None) -> list:
+        """Index entries of the segments that may hold tweets created in [since, until)."""
+        def overlaps(s):
+            if s['min_created_ts'] is None:
+                return True  # no parseable timestamps; let the line check decide
+            return ((since is None or s['max_created_ts'] >= since) and
+                    (until is None or s['min_created_ts'] < until))
+        return [s for s in self.load_index() if overlaps(s)]
+
+    def iter_lines(self, since: int = None, until: int = None):
+        """Yields the raw JSONL lines of tweets created in [since, until), segment by segment."""
+        for segment in self.segments(since, until):
+            lines = self._read_lines(os.path.join(self.directory, segment['file']))
+            inside = (segment['min_created_ts'] is not None
+                      and (since is None or segment['min_created_ts'] >= since)
+                      and (until is None or segment['max_created_ts'] < until))
+            yield from lines if inside else filter_window(lines, since, until)
+
+    def _read_lines(self, path: str):
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                yield from f
+        except FileNotFoundError:
+            print(f"[WARN] Archive segment '{os.path.basename(path)}' is in the index but missing; skipping it.")
+        except (EOFError, gzip.BadGzipFile, OSError) as e:
+            print(f"[WARN] Archive segment '{os.path.basename(path)}' ends early ({e}); skipping the rest.")
+
+    def stats(self) -> dict:
+        segments = self.load_index()
+        timestamps = [s[k] for s in segments for k in ('min_created_ts', 'max_created_ts') if s[k] is not None]
+        return {
+            'segments': len(segments),
+            'tweets': sum(s['count'] for s in segments),
+            'bytes': sum(s['bytes'] for s in segments),
+            'oldest': min(timestamps, default=None),
+            'newest': max(timestamps, default=None),
+        }
+
+
+def filter_window(lines, since: int = None, until: int = None):
+    """
+    Yields the lines whose created_at falls in [since, until). Lines that
+    cannot be decoded are passed through for the caller to report.
+    """
+    if since is None and until is None:
+        yield from lines
+        return
+    for line in lines:
+        try:
+            tweet = loads(line)
+        except ValueError:
+            yield line
+            continue
+        created_ts = parse_created_at(tweet.get('created_at')) if isinstance(tweet, dict) else None
+        if created_ts is None:
+            continue
+        if (since is None or created_ts >= since) and (until is None or created_ts < until):
+            yield line
+
+
+def _writer_alive(name: str) -> bool:
+    """Whether the process that writes segment `name` (pid in the name) is still running."""
+    match = re.match(r'^\d{8}T\d{4}Z-(\d+)-', name)
+    if not match:
+        return False
+    pid = int(match.group(1))
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SegmentWriter:
+    """
+    Appends each tweet to the segment of its `created_at` bucket (the current
+    time's bucket if it has none), keeping one open segment per bucket. A
+    segment is closed and added to the index once no tweet was written to it
+    for a bucket's length, when more than `max_open` are open (least recently
+    written first), or on close().
+    """
+
+    def __init__(self, archive: TweetArchive, fsync: bool = False, max_open: int = MAX_OPEN_SEGMENTS):
+        self.archive = archive
+        self.fsync = fsync
+        self.max_open = max(1, max_open)
+        self.segments_written = 0
+        self._open = {}  # bucket -> OpenSegment, least recently written first
+
+    def _bucket(self, ts: float) -> int:
+        return int(ts) // self.archive.bucket_seconds * self.archive.bucket_seconds
+
+    def _open_segment(self, bucket: int) -> 'OpenSegment':
+        os.makedirs(self.archive.directory, exist_ok=True)
+        self.segments_written += 1
+        stamp = time.strftime('%Y%m%dT%H%MZ', time.gmtime(bucket))
+        name = f"{stamp}-{os.getpid()}-{self.segments_written}{SEGMENT_SUFFIX}"
+        return OpenSegment(self.archive, name)
+
+    def write(self, batch):
+        now = time.time()
+        groups = {}
+        for tweet in batch:
+            created_ts = parse_created_at(tweet.get('created_at'))
+            bucket = self._bucket(created_ts if created_ts is not None else now)
+            groups.setdefault(bucket, []).append((tweet, created_ts))
+
+        for bucket, tweets in groups.items():
+            segment = self._open.pop(bucket, None) or self._open_segment(bucket)
+            self._open[bucket] = segment
+            segment.write(tweets, self.fsync, now)
+
+        idle = [bucket for bucket, segment in self._open.items()
+                if now - segment.last_write >= self.archive.bucket_seconds]
+        for bucket in idle:
+            self._open.pop(bucket).close()
+        while len(self._open) > self.max_open:
+            self._open.pop(next(iter(self._open))).close()
+
+    def close(self):
+        """Finishes every open segment and records them in the index."""
+        while self._open:
+            self._open.pop(next(iter(self._open))).close()
+
+
+class OpenSegment:
+    """One segment being written: its gzip stream and running stats."""
+
+    def __init__(self, archive: TweetArchive, name: str):
+        self.archive = archive
+        self.name = name
+        self.path = os.path.join(archive.directory, name)
+        self.last_write = time.time()
+        self._raw = open(self.path, 'wb')
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=archive.compresslevel)
+        self._stats = SegmentStats()
+
+    def write(self, tweets, fsync: bool, now: float):
+        """Appends (tweet, created_ts) pairs."""
+        self._gzip.write(''.join(dumps(tweet) + "\n" for tweet, _ in tweets).encode('utf-8'))
+        for tweet, created_ts in tweets:
+            self._stats.add(created_ts, tweet.get('id'))
+        self.last_write = now
+        if fsync:
+            self._gzip.flush()
+            os.fsync(self._raw.fileno())
+
+    def close(self):
+        self._gzip.close()
+        self._raw.close()
+        self.archive.add_segment(self._stats.entry(self.name, self.path))
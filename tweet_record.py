@@ -0,0 +1,207 @@
+"""
+Compact tweet record and JSON codec shared by the scraper, filter and summarizer.
+
+`TweetRecord` keeps the fields every stage reads (id, text, created_at,
+keyword_searched and filter_score) in `__slots__`. The remaining ("cold")
+fields, such as the user names and counters, are only decoded when they are
+accessed: a record read from JSONL keeps its raw line instead, and writing
+an unchanged record back out reuses that line (splicing `filter_score` onto
+it when needed) rather than re-encoding every field. Records also answer `record['text']` and
+`record.get(...)`, so code written against the old tweet dicts keeps working.
+
+`loads` decodes with orjson (a project dependency), falling back to the
+standard library when it is missing. `dumps` always encodes with the
+standard library's `json.dumps(..., ensure_ascii=False)` style, so the
+output bytes are the same either way.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The tweet schema: what format_tweet_data produces and the store keeps, in output order.
+FIELDS = (
+    'id', 'text', 'created_at', 'user_id', 'user_name', 'user_screen_name',
+    'retweet_count', 'favorite_count', 'lang', 'keyword_searched',
+)
+HOT_FIELDS = ('id', 'text', 'created_at', 'keyword_searched')
+COLD_FIELDS = tuple(field for field in FIELDS if field not in HOT_FIELDS)
+_SLOTS = HOT_FIELDS + ('filter_score',)
+
+# Marks a raw line without a filter_score key (as opposed to `"filter_score": null`).
+_MISSING = object()
+
+loads = orjson.loads if orjson is not None else json.loads
+
+
+def _dumps_plain(obj) -> str:
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def dumps(obj) -> str:
+    """One JSON line (without the newline) for a TweetRecord or any JSON-compatible object."""
+    if isinstance(obj, TweetRecord):
+        return obj.to_json()
+    return _dumps_plain(obj)
+
+
+class TweetRecord:
+    """
+    One tweet. Hot fields are attributes; every other field, including ones
+    outside the schema, is available through `record[name]`/`record.get()`.
+    Change fields with `record[name] = value` (or `replace()`), which keeps
+    the cached raw line consistent; only `filter_score` may be assigned as
+    an attribute directly.
+    """
+
+    __slots__ = _SLOTS + ('_raw', '_raw_score', '_cold')
+
+    def __init__(self, id=None, text=None, created_at=None, keyword_searched=None, filter_score=None, **cold):
+        self.id = id
+        self.text = text
+        self.created_at = created_at
+        self.keyword_searched = keyword_searched
+        self.filter_score = filter_score
+        self._raw = None
+        self._raw_score = None
+        self._cold = cold
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'TweetRecord':
+        cold = {key: value for key, value in data.items() if key not in _SLOTS}
+        return cls(data.get('id'), data.get('text'), data.get('created_at'),
+                   data.get('keyword_searched'), data.get('filter_score'), **cold)
+
+    @classmethod
+    def from_json(cls, line) -> 'TweetRecord':
+        """
+        Decodes one JSONL line (str or bytes). Raises json.JSONDecodeError
+        (orjson's error is a subclass) for malformed lines and ValueError
+        for lines that are not JSON objects.
+        """
+        data = loads(line)
+        if not isinstance(data, dict):
+            raise ValueError("a tweet line must be a JSON object")
+        record = cls.__new__(cls)
+        record.id = data.get('id')
+        record.text = data.get('text')
+        record.created_at = data.get('created_at')
+        record.keyword_searched = data.get('keyword_searched')
+        record.filter_score = data.get('filter_score')
+        record._raw_score = data.get('filter_score', _MISSING)
+        if data:
+            record._raw = line
+            record._cold = None
+        else:
+            record._raw = None
+            record._cold = {}
+        return record
+
+    def _cold_fields(self) -> dict:
+        if self._cold is None:
+            data = loads(self._raw)
+            self._cold = {key: value for key, value in data.items() if key not in _SLOTS}
+        return self._cold
+
+    # --- Mapping interface ---
+
+    def __getitem__(self, key):
+        if key in _SLOTS:
+            return getattr(self, key)
+        return self._cold_fields()[key]
+
+    def __setitem__(self, key, value):
+        if key == 'filter_score':
+            self.filter_score = value
+            return
+        cold = self._cold_fields()
+        # The raw line no longer matches the record.
+        self._raw = None
+        if key in _SLOTS:
+            setattr(self, key, value)
+        else:
+            cold[key] = value
+
+    def __contains__(self, key) -> bool:
+        if key in _SLOTS:
+            return key != 'filter_score' or self.filter_score is not None
+        return key in self._cold_fields()
+
+    def get(self, key, default=None):
+        if key in _SLOTS:
+            value = getattr(self, key)
+            return default if value is None and key == 'filter_score' else value
+        return self._cold_fields().get(key, default)
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self.to_dict())
+
+    def __repr__(self) -> str:
+        return f"TweetRecord(id={self.id!r}, score={self.filter_score!r}, text={(self.text or '')[:40]!r})"
+
+    # --- Conversion ---
+
+    def replace(self, **changes) -> 'TweetRecord':
+        """A copy with some fields changed; the original is left untouched."""
+        record = TweetRecord.__new__(TweetRecord)
+        for name in _SLOTS:
+            setattr(record, name, getattr(self, name))
+        record._raw = self._raw
+        record._raw_score = self._raw_score
+        record._cold = dict(self._cold) if self._cold is not None else None
+        for key, value in changes.items():
+            record[key] = value
+        return record
+
+    def to_dict(self) -> dict:
+        """A plain dict in schema order, with filter_score last when set."""
+        cold = self._cold_fields()
+        data = {'id': self.id, 'text': self.text, 'created_at': self.created_at}
+        for field in COLD_FIELDS:
+            if field in cold:
+                data[field] = cold[field]
+        data['keyword_searched'] = self.keyword_searched
+        for key, value in cold.items():
+            if key not in data:
+                data[key] = value
+        if self.filter_score is not None:
+            data['filter_score'] = self.filter_score
+        return data
+
+    def to_json(self) -> str:
+        raw = self._raw
+        unchanged = self.filter_score is None if self._raw_score is _MISSING else self.filter_score == self._raw_score
+        # The score can only be spliced onto a line that has no filter_score key yet.
+        if raw is None or not (unchanged or self._raw_score is _MISSING):
+            return _dumps_plain(self.to_dict())
+        if isinstance(raw, bytes):
+            raw = raw.decode('utf-8')
+        raw = raw.rstrip()
+        if unchanged:
+            return raw
+        # Match the line's own style: `{"id": ...` or the compact `{"id":...`.
+        colon = raw.find('":')
+        separator = ', "filter_score": ' if raw[colon + 2:colon + 3] == ' ' else ',"filter_score":'
+        return f"{raw[:-1]}{separator}{int(self.filter_score)}}}"
+
+
+def _cold_property(name):
+    def get(self):
+        return self._cold_fields().get(name)
+
+    def set(self, value):
+        self[name] = value
+
+    return property(get, set)
+
+
+for _name in COLD_FIELDS:
+    setattr(TweetRecord, _name, _cold_property(_name))
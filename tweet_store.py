@@ -0,0 +1,308 @@
+"""
+Persistent local tweet store shared by the scraper, filter and summarizer.
+
+Tweets are kept in a SQLite database (WAL mode) keyed by tweet id, so every
+run only downloads, scores and summarizes what is new. Each consumer (the
+filter, the summarizer) records the last row it processed in the
+`checkpoints` table and resumes from there on the next run.
+
+Tweet text is also indexed in an FTS5 table kept in sync by triggers, so
+`search()` answers ranked full-text queries without a separate indexing step.
+"""
+import re
+import sqlite3
+from datetime import datetime
+
+from tweet_record import FIELDS as TWEET_FIELDS, TweetRecord
+
+DEFAULT_STORE_FILE = "tweets.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    text TEXT,
+    created_at TEXT,
+    created_ts INTEGER,
+    user_id TEXT,
+    user_name TEXT,
+    user_screen_name TEXT,
+    retweet_count INTEGER,
+    favorite_count INTEGER,
+    lang TEXT,
+    keyword_searched TEXT,
+    filter_score INTEGER,
+    dedup_key INTEGER,
+    kept INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tweets_created_ts ON tweets(created_ts);
+CREATE INDEX IF NOT EXISTS idx_tweets_keyword ON tweets(keyword_searched, created_ts);
+CREATE INDEX IF NOT EXISTS idx_tweets_filter_score ON tweets(filter_score);
+CREATE INDEX IF NOT EXISTS idx_tweets_dedup_key ON tweets(dedup_key) WHERE kept = 1;
+CREATE TABLE IF NOT EXISTS checkpoints (
+    consumer TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL
+);
+"""
+
+# External-content FTS5 index over tweets.text (the text is stored once, in
+# `tweets`). The triggers keep it current as the scraper inserts rows.
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tweets_fts USING fts5(
+    text, content='tweets', content_rowid='seq', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS tweets_fts_insert AFTER INSERT ON tweets BEGIN
+    INSERT INTO tweets_fts(rowid, text) VALUES (new.seq, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS tweets_fts_delete AFTER DELETE ON tweets BEGIN
+    INSERT INTO tweets_fts(tweets_fts, rowid, text) VALUES ('delete', old.seq, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS tweets_fts_update AFTER UPDATE OF text ON tweets BEGIN
+    INSERT INTO tweets_fts(tweets_fts, rowid, text) VALUES ('delete', old.seq, old.text);
+    INSERT INTO tweets_fts(rowid, text) VALUES (new.seq, new.text);
+END;
+"""
+
+SEARCH_SORTS = {
+    'rank': "rank, t.seq",
+    'score': "t.filter_score IS NULL, t.filter_score DESC, rank",
+    'newest': "t.created_ts DESC, t.seq DESC",
+    'oldest': "t.created_ts, t.seq",
+}
+_QUERY_TOKEN = re.compile(r'(-?)"([^"]*)"?|(-?)(\S+)')
+
+def fts_query(query: str) -> str:
+    """
+    Translates a search box query into FTS5 syntax. Words and "quoted
+    phrases" must all match, `word*` matches a prefix, `a OR b` matches
+    either and `-word` excludes. Words are matched as FTS5 strings, so
+    punctuation such as '0-day' or 'zk-proofs' needs no escaping.
+    """
+    groups, excluded = [], []
+    join_next = False
+    for match in _QUERY_TOKEN.finditer(query):
+        if match.group(2) is not None:
+            negated, text, prefix = match.group(1), match.group(2), False
+        else:
+            negated, text = match.group(3), match.group(4)
+            if text == 'OR' and not negated:
+                join_next = bool(groups)
+                continue
+            prefix = text.endswith('*')
+            text = text.rstrip('*')
+        if not re.search(r'\w', text):
+            continue
+        term = '"' + text.replace('"', '""') + '"' + ('*' if prefix else '')
+        if negated:
+            excluded.append(term)
+        elif join_next:
+            groups[-1].append(term)
+        else:
+            groups.append([term])
+        join_next = False
+    if not groups:
+        raise ValueError("the search needs at least one word or phrase that is not excluded")
+    expression = ' AND '.join(g[0] if len(g) == 1 else '(' + ' OR '.join(g) + ')' for g in groups)
+    return expression + ''.join(f' NOT {term}' for term in excluded)
+
+def parse_created_at(value):
+    """Converts twikit's 'Wed Oct 10 20:19:24 +0000 2018' (or ISO 8601) to a Unix timestamp."""
+    if not value:
+        return None
+    for fmt in ('%a %b %d %H:%M:%S %z %Y', None):
+        try:
+            parsed = datetime.strptime(value, fmt) if fmt else datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            continue
+        return int(parsed.timestamp())
+    return None
+
+class TweetStore:
+    """Thin wrapper around the SQLite tweet database."""
+
+    def __init__(self, path: str = DEFAULT_STORE_FILE):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.searchable = self._init_search()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Scraper side ---
+
+    def known_ids(self, ids, keyword: str = None) -> set:
+        """Returns the subset of `ids` that is already stored (for `keyword`, if given)."""
+        ids = [str(i) for i in ids]
+        if not ids:
+            return set()
+        placeholders = ','.join('?' * len(ids))
+        query = f"SELECT id FROM tweets WHERE id IN ({placeholders})"
+        if keyword is not None:
+            query += " AND keyword_searched = ?"
+            ids.append(keyword)
+        return {row[0] for row in self.conn.execute(query, ids)}
+
+    def latest_created_ts(self, keyword: str):
+        """Timestamp of the newest tweet stored for `keyword`, or None."""
+        row = self.conn.execute(
+            "SELECT MAX(created_ts) FROM tweets WHERE keyword_searched = ?", (keyword,)
+        ).fetchone()
+        return row[0]
+
+    def has(self, tweet_id) -> bool:
+        return bool(self.known_ids([tweet_id]))
+
+    def add_tweets(self, tweets) -> int:
+        """Inserts tweets (TweetRecords or dicts), ignoring ids that are already stored. Returns the number added."""
+        rows = [
+            tuple(t.get(field) for field in TWEET_FIELDS) + (parse_created_at(t.get('created_at')),)
+            for t in tweets
+        ]
+        columns = ', '.join(TWEET_FIELDS) + ', created_ts'
+        placeholders = ', '.join('?' * (len(TWEET_FIELDS) + 1))
+        # rowcount, not total_changes: the latter also counts the full-text
+        # index triggers' writes.
+        with self.conn:
+            cursor = self.conn.executemany(f"INSERT OR IGNORE INTO tweets ({columns}) VALUES ({placeholders})", rows)
+            return max(cursor.rowcount, 0)
+
+    # --- Full-text search ---
+
+    def _init_search(self) -> bool:
+        """Creates the FTS5 index (filling it from existing rows the first time). False if FTS5 is missing."""
+        existed = self.conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tweets_fts'").fetchone()
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            print(f"[WARN] Full-text search is unavailable, this SQLite build lacks FTS5 ({e}).")
+            return False
+        if not existed:
+            self.rebuild_search_index()
+        return True
+
+    def rebuild_search_index(self):
+        """Re-indexes the text of every stored tweet."""
+        with self.conn:
+            self.conn.execute("INSERT INTO tweets_fts(tweets_fts) VALUES ('rebuild')")
+
+    def optimize_search_index(self):
+        """Merges the index segments; worth running after large imports."""
+        with self.conn:
+            self.conn.execute("INSERT INTO tweets_fts(tweets_fts) VALUES ('optimize')")
+
+    def search(self, query: str, keyword: str = None, min_score: int = None, since: int = None,
+               until: int = None, kept_only: bool = False, sort: str = 'rank', limit: int = 20, offset: int = 0):
+        """
+        Ranked full-text search (BM25) over every stored tweet, optionally
+        limited to a keyword, a minimum filter score, a created_at window
+        [since, until) and tweets the filter kept. Returns (total, [TweetRecord]).
+        """
+        if not self.searchable:
+            raise ValueError("full-text search is unavailable in this SQLite build")
+        if sort not in SEARCH_SORTS:
+            raise ValueError(f"sort must be one of {', '.join(SEARCH_SORTS)}")
+        conditions, params = ["tweets_fts MATCH ?"], [fts_query(query)]
+        for condition, value in (("t.keyword_searched = ?", keyword), ("t.filter_score >= ?", min_score),
+                                 ("t.created_ts >= ?", since), ("t.created_ts < ?", until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        if kept_only:
+            conditions.append("t.kept = 1")
+        # CROSS JOIN keeps the FTS index as the outer loop; otherwise SQLite may
+        # walk a whole column index and run the MATCH once per row.
+        source = f"FROM tweets_fts CROSS JOIN tweets t ON t.seq = tweets_fts.rowid WHERE {' AND '.join(conditions)}"
+
+        total = self.conn.execute(f"SELECT COUNT(*) {source}", params).fetchone()[0]
+        rows = self.conn.execute(
+            f"SELECT t.filter_score, {', '.join('t.' + field for field in TWEET_FIELDS)} {source} "
+            f"ORDER BY {SEARCH_SORTS[sort]} LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        )
+        return total, [
+            TweetRecord(filter_score=row['filter_score'], **{field: row[field] for field in TWEET_FIELDS})
+            for row in rows
+        ]
+
+    # --- Checkpoints ---
+
+    def checkpoint(self, consumer: str) -> int:
+        row = self.conn.execute("SELECT last_seq FROM checkpoints WHERE consumer = ?", (consumer,)).fetchone()
+        return row[0] if row else 0
+
+    def set_checkpoint(self, consumer: str, last_seq: int):
+        """Records progress. Like the other update methods, the caller commits (`with store.conn:`)."""
+        self.conn.execute(
+            "INSERT INTO checkpoints (consumer, last_seq) VALUES (?, ?) "
+            "ON CONFLICT(consumer) DO UPDATE SET last_seq = excluded.last_seq",
+            (consumer, last_seq),
+        )
+
+    # --- Status ---
+
+    def stats(self) -> dict:
+        """Row counts, the created_at range, tweets per keyword and each consumer's backlog."""
+        total, last_seq = self.conn.execute("SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM tweets").fetchone()
+        oldest, newest = self.conn.execute("SELECT MIN(created_ts), MAX(created_ts) FROM tweets").fetchone()
+        consumers = {}
+        for consumer, seq in self.conn.execute("SELECT consumer, last_seq FROM checkpoints ORDER BY consumer").fetchall():
+            pending = self.conn.execute("SELECT COUNT(*) FROM tweets WHERE seq > ?", (seq,)).fetchone()[0]
+            consumers[consumer] = {'last_seq': seq, 'pending': pending}
+        return {
+            'tweets': total,
+            'last_seq': last_seq,
+            'scored': self.conn.execute("SELECT COUNT(*) FROM tweets WHERE filter_score IS NOT NULL").fetchone()[0],
+            'kept': self.conn.execute("SELECT COUNT(*) FROM tweets WHERE kept = 1").fetchone()[0],
+            'oldest': oldest,
+            'newest': newest,
+            'keywords': dict(self.conn.execute(
+                "SELECT keyword_searched, COUNT(*) FROM tweets GROUP BY keyword_searched ORDER BY COUNT(*) DESC"
+            ).fetchall()),
+            'checkpoints': consumers,
+        }
+
+    # --- Filter side ---
+
+    def iter_since(self, last_seq: int):
+        """Yields (seq, TweetRecord) for every row added after `last_seq`, oldest first."""
+        rows = self.conn.cursor().execute(
+            f"SELECT seq, {', '.join(TWEET_FIELDS)} FROM tweets WHERE seq > ? ORDER BY seq", (last_seq,)
+        )
+        for row in rows:
+            yield row['seq'], TweetRecord(**{field: row[field] for field in TWEET_FIELDS})
+
+    def seq_of(self, tweet_id):
+        """The row number of a stored tweet, or None."""
+        row = self.conn.execute("SELECT seq FROM tweets WHERE id = ?", (str(tweet_id),)).fetchone()
+        return row[0] if row else None
+
+    def is_kept_duplicate(self, dedup_key: int) -> bool:
+        row = self.conn.execute("SELECT 1 FROM tweets WHERE kept = 1 AND dedup_key = ? LIMIT 1", (dedup_key,)).fetchone()
+        return row is not None
+
+    def set_filter_result(self, seq: int, score, dedup_key, kept: bool):
+        self.conn.execute(
+            "UPDATE tweets SET filter_score = ?, dedup_key = ?, kept = ? WHERE seq = ?",
+            (score, dedup_key, int(kept), seq),
+        )
+
+    def iter_kept(self, since_seq: int = 0, until_seq: int = None):
+        """Yields kept tweets ordered by filter_score (highest first), ties oldest first."""
+        query = f"SELECT seq, filter_score, {', '.join(TWEET_FIELDS)} FROM tweets WHERE kept = 1 AND seq > ?"
+        params = [since_seq]
+        if until_seq is not None:
+            query += " AND seq <= ?"
+            params.append(until_seq)
+        query += " ORDER BY filter_score DESC, seq"
+        for row in self.conn.execute(query, params):
+            yield row['seq'], TweetRecord(filter_score=row['filter_score'], **{field: row[field] for field in TWEET_FIELDS})
@@ -0,0 +1,156 @@
+"""
+Single entry point for every X-Scout command.
+
+    uv run xscout.py filter --store tweets.db --out filtered_tweets.jsonl
+    uv run xscout.py report
+    uv run xscout.py scrape --help
+    uv run xscout.py check-imports
+
+Each command's module is imported only when that command runs, so a filter
+or a report never starts by loading twikit, asyncio, NumPy or the Gemini
+client.
+Everything after the command name goes to the module's own argument parser.
+
+`check-imports` imports each command with a budget in a fresh interpreter
+and fails if it takes longer than its budget or loads one of the heavy
+dependencies, listing the slowest modules it loaded.
+"""
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import types
+
+# name: (module, description, import budget in milliseconds or None)
+COMMANDS = {
+    'setup': ('get_cookies', "Log in with a browser once and save the session cookies to .env.", None),
+    'scrape': ('main', "Search Twitter for the keywords and write the raw tweets.", None),
+    'filter': ('filter_tweets', "Score, deduplicate and rank the scraped tweets.", 50),
+    'summarize': ('summarizer', "Summarize the filtered tweets with the LLM backend.", None),
+    'pipeline': ('pipeline', "Scrape, filter and summarize in one process.", None),
+    'daemon': ('daemon', "Keep scraping with a hot-reloaded config and scheduled jobs.", None),
+    'serve': ('serve', "Serve viewer.html and the tweet API.", None),
+    'search': ('search_tweets', "Full-text search over the tweet store.", None),
+    'report': ('report', "Show what the tweet store, archive and output files hold.", 50),
+    'bench': ('bench', "Run the offline benchmark suite.", None),
+}
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Dependencies that lightweight commands must not load.
+HEAVY_MODULES = ('twikit', 'httpx', 'numpy', 'asyncio', 'google.generativeai', 'dotenv', 'playwright')
+
+# Run in a fresh interpreter by check-imports: imports one command and prints
+# the time it took and the heavy modules it loaded.
+_MEASURE = """
+import json, sys, time
+started = time.perf_counter()
+import xscout
+xscout.load({name!r})
+elapsed = time.perf_counter() - started
+heavy = [m for m in xscout.HEAVY_MODULES if m in sys.modules]
+print(json.dumps({{'ms': elapsed * 1000, 'heavy': heavy}}))
+"""
+
+
+def load(name: str) -> types.ModuleType:
+    """Imports the module behind a command."""
+    return importlib.import_module(COMMANDS[name][0])
+
+
+def run(name: str, argv: list):
+    """Runs a command's main() with `argv` as its command line."""
+    module = load(name)
+    sys.argv = [f"xscout.py {name}", *argv]
+    result = module.main()
+    if isinstance(result, types.CoroutineType):
+        import asyncio
+        asyncio.run(result)
+
+
+# --- Import budget ---
+
+def measure_import(name: str, repeat: int) -> dict:
+    """Best-of-`repeat` import time of a command, each in a fresh interpreter."""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", _MEASURE.format(name=name)], capture_output=True,
+                                text=True, check=True, cwd=_HERE).stdout
+        result = json.loads(output)
+        if best is None or result['ms'] < best['ms']:
+            best = result
+    return best
+
+
+def slowest_modules(name: str, limit: int = 5) -> list:
+    """(self time in ms, module) of the modules a command loads that take the most time on their own."""
+    code = f"import xscout; xscout.load({name!r})"
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True,
+                            text=True, check=True, cwd=_HERE).stderr
+    # Only what is imported after xscout itself, not the interpreter's own startup.
+    lines = stderr.splitlines()
+    start = next((i for i, line in enumerate(lines) if line.endswith('| xscout')), 0) + 1
+    rows = []
+    for line in lines[start:]:
+        self_us, _, module = line.removeprefix("import time:").split("|")
+        rows.append((int(self_us) / 1000, module.strip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def check_imports(argv: list) -> int:
+    parser = argparse.ArgumentParser(prog="xscout.py check-imports",
+                                     description="Check that lightweight commands start within their import budget.")
+    parser.add_argument("commands", nargs="*", help="Commands to check (default: every command with a budget).")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Budget for every checked command, overriding the defaults.")
+    parser.add_argument("--repeat", type=int, default=5, help="Imports per command; the fastest one counts.")
+    args = parser.parse_args(argv)
+    names = args.commands or [name for name, (_, _, budget) in COMMANDS.items() if budget is not None]
+    unknown = [name for name in names if name not in COMMANDS]
+    if unknown:
+        parser.error(f"unknown command(s): {', '.join(unknown)}")
+
+    failed = 0
+    for name in names:
+        budget = args.budget_ms if args.budget_ms is not None else COMMANDS[name][2]
+        result = measure_import(name, max(1, args.repeat))
+        over = budget is not None and result['ms'] > budget
+        budget_text = f" (budget {budget:.0f} ms)" if budget is not None else ""
+        if result['heavy'] and budget is not None:
+            print(f"[ERROR] '{name}' loads {', '.join(result['heavy'])}.")
+            over = True
+        if over:
+            failed += 1
+            print(f"[ERROR] '{name}' imports in {result['ms']:.1f} ms{budget_text}. Slowest modules:")
+            for ms, module in slowest_modules(name):
+                print(f"          {ms:6.1f} ms  {module}")
+        else:
+            print(f"[SUCCESS] '{name}' imports in {result['ms']:.1f} ms{budget_text}.")
+    return 1 if failed else 0
+
+
+def build_parser():
+    commands = "\n".join(f"  {name:<14}{description}" for name, (_, description, _) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="xscout.py",
+        description="X-Scout: scrape, filter and summarize security tweets.",
+        epilog=f"commands:\n{commands}\n  {'check-imports':<14}Check the import-time budget of the lightweight commands.\n\n"
+               "Run 'xscout.py COMMAND --help' for a command's options.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", metavar="COMMAND", choices=[*COMMANDS, 'check-imports'], help="One of the commands below.")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.command == 'check-imports':
+        sys.exit(check_imports(args.args))
+    run(args.command, args.args)
+
+
+if __name__ == "__main__":
+    main()